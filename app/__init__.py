@@ -5,6 +5,10 @@ def create_app():
     app = Flask(__name__)
     app.config.from_object(Config)
 
+    # 启动时把数据库升级到最新版本
+    from app.migrations import migrate
+    migrate(app.config['DATABASE_PATH'])
+
     from app.routes.main_routes import main_bp
     from app.routes.ai_routes import ai_bp
     from app.routes.screen_routes import screen_bp
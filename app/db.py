@@ -0,0 +1,185 @@
+import os
+import time
+import sqlite3
+import threading
+
+# 连接建立时统一设置的 PRAGMA
+# foreign_keys 保持关闭：现有删除逻辑（删除采集数据保留深度结果、删除模型保留任务记录等）依赖不强制外键
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',          # 写入不阻塞读取，深度采集长事务期间看板照常查询
+    'synchronous': 'NORMAL',        # WAL 下 NORMAL 只在检查点时 fsync，断电最多丢最近的事务
+    'cache_size': -16000,           # 每个连接约 16MB 页缓存（负数单位为 KB）
+    'mmap_size': 256 * 1024 * 1024,
+    'busy_timeout': 5000,           # 写锁冲突时等待 5 秒而不是立即报 database is locked
+    'temp_store': 'MEMORY',
+    'foreign_keys': 'OFF',
+}
+
+
+class PooledConnection:
+    """借出的连接：用法与 sqlite3.Connection 相同，close() 时归还连接池而不是真正关闭"""
+    def __init__(self, pool, conn):
+        self.__dict__['_pool'] = pool
+        self.__dict__['_conn'] = conn
+
+    def _raw(self):
+        conn = self.__dict__['_conn']
+        if conn is None:
+            raise sqlite3.ProgrammingError('Cannot operate on a closed database.')
+        return conn
+
+    def __getattr__(self, name):
+        return getattr(self._raw(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._raw(), name, value)
+
+    def __enter__(self):
+        self._raw().__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        return self._raw().__exit__(*exc)
+
+    def close(self):
+        conn = self.__dict__['_conn']
+        if conn is not None:
+            self.__dict__['_conn'] = None
+            self._pool.release(conn)
+
+    def __del__(self):
+        # 忘记 close 的连接在回收时归还
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class ConnectionPool:
+    """SQLite 连接池
+
+    连接以 check_same_thread=False 打开，由借出的线程（或协程）独占使用，
+    归还时回滚未提交的事务后放回空闲列表。连接数达到 max_size 时借出方等待，
+    超过 timeout 秒抛出 sqlite3.OperationalError。PRAGMA 只在新建连接时设置一次。
+    """
+    def __init__(self, db_path, max_size=32, timeout=30, pragmas=None):
+        self.db_path = db_path
+        self.max_size = max_size
+        self.timeout = timeout
+        self.pragmas = dict(DEFAULT_PRAGMAS, **(pragmas or {}))
+        self._idle = []
+        self._size = 0
+        self._cond = threading.Condition()
+        # 统计
+        self.checkouts = 0
+        self.created = 0
+        self.waits = 0
+        self.wait_total_ms = 0.0
+        self.wait_max_ms = 0.0
+        self.timeouts = 0
+
+    def _create(self):
+        conn = sqlite3.connect(self.db_path, timeout=self.pragmas['busy_timeout'] / 1000, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        for name, value in self.pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def connect(self):
+        """借出一个连接（PooledConnection）"""
+        start = time.perf_counter()
+        waited = False
+        with self._cond:
+            while not self._idle and self._size >= self.max_size:
+                waited = True
+                remaining = self.timeout - (time.perf_counter() - start)
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise sqlite3.OperationalError(f'数据库连接池已耗尽（{self.max_size} 个连接均在使用中）')
+                self._cond.wait(remaining)
+            conn = self._idle.pop() if self._idle else None
+            if conn is None:
+                self._size += 1
+            self.checkouts += 1
+            if waited:
+                wait_ms = (time.perf_counter() - start) * 1000
+                self.waits += 1
+                self.wait_total_ms += wait_ms
+                self.wait_max_ms = max(self.wait_max_ms, wait_ms)
+        if conn is None:
+            try:
+                conn = self._create()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self.created += 1
+        return PooledConnection(self, conn)
+
+    def release(self, conn):
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            conn.row_factory = sqlite3.Row
+        except sqlite3.Error:
+            # 连接已损坏，直接丢弃
+            conn.close()
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            return
+        with self._cond:
+            self._idle.append(conn)
+            self._cond.notify()
+
+    def close(self):
+        """关闭所有空闲连接（借出中的连接归还时仍放回池中）"""
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+        for conn in idle:
+            conn.close()
+
+    def stats(self):
+        with self._cond:
+            return {
+                'db_path': self.db_path,
+                'size': self._size,
+                'max_size': self.max_size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle),
+                'checkouts': self.checkouts,
+                'created': self.created,
+                'waits': self.waits,
+                'wait_avg_ms': round(self.wait_total_ms / self.waits, 2) if self.waits else 0,
+                'wait_max_ms': round(self.wait_max_ms, 2),
+                'timeouts': self.timeouts
+            }
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path, **kwargs):
+    """按数据库文件共享的连接池（同一文件的不同写法指向同一个池）"""
+    key = os.path.realpath(db_path)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = ConnectionPool(key, **kwargs)
+            _pools[key] = pool
+        return pool
+
+
+def get_connection(db_path):
+    """从共享连接池借出连接，用完 close() 归还"""
+    return get_pool(db_path).connect()
+
+
+def pool_stats():
+    with _pools_lock:
+        pools = list(_pools.values())
+    return [pool.stats() for pool in pools]
@@ -0,0 +1,518 @@
+"""数据库版本化迁移
+
+迁移按版本号顺序执行，已执行的版本记录在 schema_version 表。每个迁移在一个
+事务内完成，且本身可重复执行（建表建索引带 IF NOT EXISTS、加字段前先检查），
+因此对旧脚本或旧版本服务已手工升级过的库同样适用。
+
+应用启动时自动执行；也可以在命令行执行：
+    python -m app.migrations              # 升级到最新版本
+    python -m app.migrations --status     # 查看已执行的迁移
+    python -m app.migrations --check      # 检查热点查询的执行计划是否命中索引
+"""
+import os
+import sys
+import argparse
+import threading
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app.db import get_connection
+from app.services.simhash import SimHashIndex, simhash, to_signed
+from app.services.fulltext import INDEXES as FULLTEXT_INDEXES, fts5_available
+
+DEFAULT_DB_PATH = os.path.join(os.path.abspath(os.path.dirname(__file__)), '..', 'data.db')
+
+
+def _columns(conn, table):
+    return [row[1] for row in conn.execute(f'PRAGMA table_info({table})').fetchall()]
+
+
+def _add_columns(conn, table, columns):
+    """按 [(字段名, 类型定义)] 补齐缺少的字段"""
+    existing = _columns(conn, table)
+    for name, decl in columns:
+        if name not in existing:
+            conn.execute(f'ALTER TABLE {table} ADD COLUMN {name} {decl}')
+
+
+def m001_baseline(conn):
+    """基础表结构（原 init_db.py、migrate_deep_data.py 及各服务启动时的补字段逻辑）"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            password TEXT NOT NULL
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS system_stats (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            metric_name TEXT UNIQUE NOT NULL,
+            metric_value TEXT NOT NULL,
+            update_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS chart_acquisition (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            day TEXT NOT NULL,
+            value INTEGER NOT NULL
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS chart_sentiment (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            value INTEGER NOT NULL,
+            color TEXT NOT NULL
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS crawlers (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            type TEXT NOT NULL,
+            script_path TEXT,
+            config TEXT,
+            description TEXT,
+            status TEXT DEFAULT '可用',
+            last_run TIMESTAMP,
+            create_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    # 爬虫数据表
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS collected_data (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            url TEXT NOT NULL UNIQUE,
+            description TEXT,
+            source TEXT,
+            collect_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            deep_status INTEGER DEFAULT 0 -- 0: 未采集, 1: 正在采集, 2: 采集成功, 3: 采集失败
+        )
+    ''')
+    _add_columns(conn, 'collected_data', [('deep_status', 'INTEGER DEFAULT 0')])
+    # 深度采集数据表
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS deep_collected_data (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            source_id INTEGER UNIQUE,
+            url TEXT NOT NULL,
+            title TEXT,
+            content TEXT,
+            summary TEXT,
+            structured_data TEXT, -- JSON format
+            etag TEXT, -- 上次抓取的 ETag，用于条件请求
+            last_modified TEXT, -- 上次抓取的 Last-Modified
+            content_hash TEXT, -- 上次抓取的响应体 sha256
+            simhash INTEGER, -- 正文 SimHash 指纹（有符号 64 位）
+            duplicate_of INTEGER, -- 近似重复时指向首发文章的 source_id
+            schema_version INTEGER DEFAULT 0, -- 提炼时使用的提示词版本，用于批量重新提炼
+            collect_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (source_id) REFERENCES collected_data (id)
+        )
+    ''')
+    _add_columns(conn, 'deep_collected_data', [
+        ('etag', 'TEXT'), ('last_modified', 'TEXT'), ('content_hash', 'TEXT'),
+        ('simhash', 'INTEGER'), ('duplicate_of', 'INTEGER'),
+        # 升级前的结果记为版本 0，批量重新提炼时会被选中
+        ('schema_version', 'INTEGER DEFAULT 0')
+    ])
+    # AI 模型管理表
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS ai_models (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            api_url TEXT NOT NULL,
+            api_key TEXT NOT NULL,
+            model_name TEXT NOT NULL,
+            system_prompt TEXT DEFAULT '你是一个专业的政企信息分析助手。',
+            max_input_tokens INTEGER DEFAULT 3000, -- 深度采集单次调用送入的正文 token 上限
+            cjk_token_ratio REAL DEFAULT 0.6, -- 本地估算：每个汉字约合多少 token
+            is_active INTEGER DEFAULT 1,
+            create_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    _add_columns(conn, 'ai_models', [('max_input_tokens', 'INTEGER DEFAULT 3000'),
+                                     ('cjk_token_ratio', 'REAL DEFAULT 0.6')])
+    # Token 消耗记录表
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS token_usage (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            model_id INTEGER,
+            prompt_tokens INTEGER DEFAULT 0,
+            completion_tokens INTEGER DEFAULT 0,
+            total_tokens INTEGER DEFAULT 0,
+            task_type TEXT,
+            cache_hit INTEGER DEFAULT 0, -- 1: 命中提炼缓存，未实际调用模型
+            saved_tokens INTEGER DEFAULT 0, -- 缓存命中时节省的 token 数
+            log_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (model_id) REFERENCES ai_models (id)
+        )
+    ''')
+    _add_columns(conn, 'token_usage', [('cache_hit', 'INTEGER DEFAULT 0'), ('saved_tokens', 'INTEGER DEFAULT 0')])
+    # AI 分析会话与消息
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS analysis_conversations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT DEFAULT '新会话',
+            model_id INTEGER,
+            create_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (model_id) REFERENCES ai_models (id)
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS analysis_messages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            conversation_id INTEGER,
+            role TEXT NOT NULL, -- 'user' or 'assistant'
+            content TEXT NOT NULL,
+            raw_content TEXT, -- 存储带标签的原始文本以便重新渲染
+            create_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (conversation_id) REFERENCES analysis_conversations (id) ON DELETE CASCADE
+        )
+    ''')
+    # 近似去重的分段指纹索引
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS simhash_index (
+            band INTEGER NOT NULL,
+            band_value INTEGER NOT NULL,
+            source_id INTEGER NOT NULL,
+            PRIMARY KEY (band, band_value, source_id)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_simhash_index_source ON simhash_index (source_id)')
+    # 大模型提炼结果缓存
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS llm_cache (
+            cache_key TEXT PRIMARY KEY, -- sha256(正文 + 模型 + 提示词版本)
+            model_id INTEGER,
+            result TEXT NOT NULL,
+            prompt_tokens INTEGER DEFAULT 0,
+            completion_tokens INTEGER DEFAULT 0,
+            total_tokens INTEGER DEFAULT 0,
+            size_bytes INTEGER DEFAULT 0,
+            hit_count INTEGER DEFAULT 0,
+            create_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_hit_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    # 后台采集任务
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS crawl_jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            crawler_id INTEGER,
+            keyword TEXT,
+            limit_count INTEGER DEFAULT 10,
+            status TEXT DEFAULT 'pending', -- pending / running / success / failed
+            progress INTEGER DEFAULT 0,
+            result_count INTEGER DEFAULT 0,
+            error TEXT,
+            create_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            start_time TIMESTAMP,
+            finish_time TIMESTAMP,
+            FOREIGN KEY (crawler_id) REFERENCES crawlers (id)
+        )
+    ''')
+    # 后台深度采集任务及逐条断点
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS deep_crawl_jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            model_id INTEGER,
+            batch INTEGER DEFAULT 0, -- 1: 启用多篇合并提炼
+            status TEXT DEFAULT 'pending', -- pending / running / success / failed
+            total INTEGER DEFAULT 0,
+            done_count INTEGER DEFAULT 0,
+            success_count INTEGER DEFAULT 0,
+            unchanged_count INTEGER DEFAULT 0,
+            fail_count INTEGER DEFAULT 0,
+            error TEXT,
+            create_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            start_time TIMESTAMP,
+            finish_time TIMESTAMP,
+            FOREIGN KEY (model_id) REFERENCES ai_models (id)
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS deep_crawl_job_items (
+            job_id INTEGER NOT NULL,
+            source_id INTEGER NOT NULL,
+            status TEXT DEFAULT 'pending', -- pending / done / failed
+            result TEXT, -- success / cached / unchanged / failed
+            update_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (job_id, source_id),
+            FOREIGN KEY (job_id) REFERENCES deep_crawl_jobs (id)
+        )
+    ''')
+    # 批量重新提炼任务，last_id 为主键游标断点
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS reextract_jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            model_id INTEGER,
+            target_version INTEGER,
+            batch INTEGER DEFAULT 0,
+            workers INTEGER DEFAULT 4,
+            status TEXT DEFAULT 'pending',
+            total INTEGER DEFAULT 0,
+            done_count INTEGER DEFAULT 0,
+            fail_count INTEGER DEFAULT 0,
+            last_id INTEGER DEFAULT 0,
+            estimated_tokens INTEGER DEFAULT 0,
+            error TEXT,
+            create_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            start_time TIMESTAMP,
+            finish_time TIMESTAMP,
+            FOREIGN KEY (model_id) REFERENCES ai_models (id)
+        )
+    ''')
+
+
+def m002_default_crawlers(conn):
+    """内置爬虫（原 init_db.py 与 update_crawlers_db.py）"""
+    crawlers = [
+        ('百度搜索爬虫', 'baidu', None, None),
+        ('百度新闻爬虫', 'baidu_news', 'dist/baidusearch/search_cli.py', '专门用于采集百度新闻数据的爬虫'),
+        ('360搜索爬虫', '360_search', 'dist/baidusearch/search_cli.py', '使用360搜索引擎进行的通用采集')
+    ]
+    for name, ctype, path, desc in crawlers:
+        if not conn.execute('SELECT id FROM crawlers WHERE name = ?', (name,)).fetchone():
+            conn.execute('''
+                INSERT INTO crawlers (name, type, script_path, description, status)
+                VALUES (?, ?, ?, ?, '可用')
+            ''', (name, ctype, path, desc))
+
+
+def m003_backfill_simhash(conn, batch_size=500):
+    """为加入近似去重前已提炼的文章补算指纹并写入索引"""
+    index = SimHashIndex()
+    last_id = 0
+    while True:
+        rows = conn.execute('''
+            SELECT id, source_id, content FROM deep_collected_data
+            WHERE id > ? AND simhash IS NULL AND duplicate_of IS NULL AND source_id IS NOT NULL
+            ORDER BY id LIMIT ?
+        ''', (last_id, batch_size)).fetchall()
+        if not rows:
+            return
+        for row in rows:
+            fingerprint = simhash(row['content'])
+            # 正文过短记 0 表示已处理（不参与匹配）
+            conn.execute('UPDATE deep_collected_data SET simhash = ? WHERE id = ?',
+                         (to_signed(fingerprint) if fingerprint is not None else 0, row['id']))
+            if fingerprint is not None:
+                index.add(conn, row['source_id'], fingerprint)
+        last_id = rows[-1]['id']
+
+
+def m004_hot_query_indexes(conn):
+    """看板、列表、大屏与 token 统计查询用到的（覆盖）索引"""
+    # 列表按采集时间倒序分页、按日期区间计数
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_collected_data_collect_time ON collected_data (collect_time)')
+    # 来源分布 GROUP BY source
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_collected_data_source ON collected_data (source)')
+    # 深度采集量计数与大屏深度排行（deep_status = 2 ORDER BY collect_time DESC）
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_collected_data_deep_status '
+                 'ON collected_data (deep_status, collect_time)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_deep_collected_data_collect_time '
+                 'ON deep_collected_data (collect_time)')
+    # 模型累计 token（按 model_id 聚合 total_tokens）
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_token_usage_model ON token_usage (model_id, total_tokens)')
+    # 深度采集缓存命中统计（task_type 前缀匹配）
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_token_usage_task '
+                 'ON token_usage (task_type, cache_hit, saved_tokens)')
+    # 会话历史消息
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_analysis_messages_conversation '
+                 'ON analysis_messages (conversation_id, create_time)')
+
+
+def m005_fulltext_search(conn):
+    """采集数据与深度数据的 FTS5（trigram）全文索引及同步触发器，并导入已有数据
+
+    SQLite 不支持 FTS5 trigram 时跳过，检索继续使用 LIKE；升级 SQLite 后可执行
+    python -m app.services.fulltext rebuild 补建。
+    """
+    if not fts5_available(conn):
+        print("SQLite 不支持 FTS5 trigram 分词，跳过全文索引")
+        return
+    for index in FULLTEXT_INDEXES.values():
+        index.create(conn)
+        index.rebuild(conn)
+
+
+def m006_extract_model(conn):
+    """深度数据记录提炼所用的模型，切换模型后批量重新提炼可据此挑出需要处理的行
+
+    已有行的模型未知（NULL），任何模型的重新提炼任务都会把它们计入待处理。
+    """
+    _add_columns(conn, 'deep_collected_data', [('extract_model_id', 'INTEGER')])
+
+
+def m007_deep_job_event_seq(conn):
+    """深度采集任务的事件序号下限：服务重启续跑时事件序号从这里继续，
+    带着旧 Last-Event-ID 重连的客户端不会因序号重新从 1 开始而收不到后续进度"""
+    _add_columns(conn, 'deep_crawl_jobs', [('event_seq', 'INTEGER DEFAULT 0')])
+
+
+MIGRATIONS = [
+    (1, 'baseline', m001_baseline),
+    (2, 'default_crawlers', m002_default_crawlers),
+    (3, 'backfill_simhash', m003_backfill_simhash),
+    (4, 'hot_query_indexes', m004_hot_query_indexes),
+    (5, 'fulltext_search', m005_fulltext_search),
+    (6, 'extract_model', m006_extract_model),
+    (7, 'deep_job_event_seq', m007_deep_job_event_seq),
+]
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+# (名称, 查询, 参数, 应命中的索引)：与各处热点查询保持一致
+PLAN_CHECKS = [
+    ('看板/大屏 按日期区间计数',
+     "SELECT COUNT(*) FROM collected_data WHERE collect_time >= ? AND collect_time < ?",
+     ('2024-01-01', '2024-01-02'), 'idx_collected_data_collect_time'),
+    ('看板 最近 7 天采集趋势',
+     "SELECT substr(collect_time, 1, 10) AS day, COUNT(*) AS count FROM collected_data "
+     "WHERE collect_time >= ? GROUP BY day",
+     ('2024-01-01',), 'idx_collected_data_collect_time'),
+    ('看板/大屏 来源分布',
+     "SELECT source, COUNT(*) AS count FROM collected_data GROUP BY source",
+     (), 'idx_collected_data_source'),
+    ('大屏 深度采集量',
+     "SELECT COUNT(*) AS count FROM collected_data WHERE deep_status = 2",
+     (), 'idx_collected_data_deep_status'),
+    ('大屏 深度采集排行',
+     "SELECT c.title, c.source, d.summary, c.collect_time FROM collected_data c "
+     "JOIN deep_collected_data d ON c.id = d.source_id WHERE c.deep_status = 2 "
+     "ORDER BY c.collect_time DESC LIMIT 5",
+     (), 'idx_collected_data_deep_status'),
+    ('采集数据列表',
+     "SELECT c.*, d.id AS deep_data_id FROM collected_data c "
+     "LEFT JOIN deep_collected_data d ON c.id = d.source_id ORDER BY c.collect_time DESC LIMIT ? OFFSET ?",
+     (10, 0), 'idx_collected_data_collect_time'),
+    ('深度数据列表',
+     "SELECT d.*, c.title AS source_title FROM deep_collected_data d "
+     "LEFT JOIN collected_data c ON d.source_id = c.id ORDER BY d.collect_time DESC LIMIT ? OFFSET ?",
+     (10, 0), 'idx_deep_collected_data_collect_time'),
+    ('模型累计 token',
+     "SELECT m.*, IFNULL(SUM(u.total_tokens), 0) AS used_tokens FROM ai_models m "
+     "LEFT JOIN token_usage u ON m.id = u.model_id GROUP BY m.id ORDER BY m.create_time DESC",
+     (), 'idx_token_usage_model'),
+    ('深度采集缓存统计',
+     "SELECT COUNT(*) AS calls, IFNULL(SUM(cache_hit), 0) AS hits, IFNULL(SUM(saved_tokens), 0) AS saved_tokens "
+     "FROM token_usage WHERE task_type GLOB '深度采集*'",
+     (), 'idx_token_usage_task'),
+    ('会话历史消息',
+     "SELECT * FROM analysis_messages WHERE conversation_id = ? ORDER BY create_time ASC",
+     (1,), 'idx_analysis_messages_conversation'),
+]
+
+
+def _ensure_version_table(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+
+def current_version(conn):
+    _ensure_version_table(conn)
+    return conn.execute('SELECT IFNULL(MAX(version), 0) FROM schema_version').fetchone()[0]
+
+
+_migrated = set()
+_migrate_lock = threading.Lock()
+
+
+def migrate(db_path=DEFAULT_DB_PATH, target=None, verbose=False):
+    """把数据库升级到 target（默认最新）版本，返回本次执行的版本号列表
+
+    每个迁移在 BEGIN IMMEDIATE 事务内执行，多个进程同时启动时只有一个会真正执行。
+    同一进程内已升级到最新的库直接跳过。
+    """
+    key = os.path.realpath(db_path)
+    if target is None and key in _migrated:
+        return []
+    applied = []
+    with _migrate_lock:
+        conn = get_connection(db_path)
+        try:
+            _ensure_version_table(conn)
+            conn.commit()
+            for version, name, func in MIGRATIONS:
+                if target is not None and version > target:
+                    break
+                conn.execute('BEGIN IMMEDIATE')
+                try:
+                    # 拿到写锁后再确认一次，避免与其他进程重复执行
+                    if conn.execute('SELECT 1 FROM schema_version WHERE version = ?', (version,)).fetchone():
+                        conn.rollback()
+                        continue
+                    func(conn)
+                    conn.execute('INSERT INTO schema_version (version, name) VALUES (?, ?)', (version, name))
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+                applied.append(version)
+                if verbose:
+                    print(f"Applied migration {version:03d}_{name}")
+        finally:
+            conn.close()
+        if target is None:
+            _migrated.add(key)
+    return applied
+
+
+def check_query_plans(db_path=DEFAULT_DB_PATH):
+    """检查热点查询的执行计划，返回 [{'name', 'index', 'ok', 'plan'}]"""
+    results = []
+    conn = get_connection(db_path)
+    try:
+        for name, sql, params, index in PLAN_CHECKS:
+            plan = [row['detail'] for row in conn.execute(f'EXPLAIN QUERY PLAN {sql}', params).fetchall()]
+            results.append({'name': name, 'index': index, 'ok': any(index in line for line in plan), 'plan': plan})
+    finally:
+        conn.close()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='数据库迁移')
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help='数据库文件路径')
+    parser.add_argument('--target', type=int, help='升级到指定版本（默认最新）')
+    parser.add_argument('--status', action='store_true', help='查看已执行的迁移')
+    parser.add_argument('--check', action='store_true', help='检查热点查询是否命中索引')
+    args = parser.parse_args(argv)
+
+    if args.status:
+        conn = get_connection(args.db)
+        try:
+            done = {row['version']: row['applied_time'] for row in conn.execute('SELECT * FROM schema_version')} \
+                if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'schema_version'").fetchone() else {}
+        finally:
+            conn.close()
+        for version, name, _ in MIGRATIONS:
+            print(f"{version:03d}_{name:<24} {done.get(version) or '未执行'}")
+        return 0
+
+    applied = migrate(args.db, target=args.target, verbose=True)
+    if not applied:
+        print("数据库已是最新版本")
+
+    if args.check:
+        failed = 0
+        for result in check_query_plans(args.db):
+            mark = 'OK  ' if result['ok'] else 'MISS'
+            print(f"[{mark}] {result['name']} -> {result['index']}")
+            if not result['ok']:
+                failed += 1
+                for line in result['plan']:
+                    print(f"         {line}")
+        return 1 if failed else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
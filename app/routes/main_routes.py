@@ -1,19 +1,19 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session, Response, jsonify
-import sqlite3
 import os
 import psutil
 import datetime
 import json
 import time
 import random
+import threading
+from app.db import get_connection, pool_stats
+from app.services.pagination import clamp_limit
 
 main_bp = Blueprint('main', __name__)
 
 def get_db_connection():
     db_path = os.path.join(os.path.abspath(os.path.dirname(__file__)), '..', '..', 'data.db')
-    conn = sqlite3.connect(db_path)
-    conn.row_factory = sqlite3.Row
-    return conn
+    return get_connection(db_path)
 
 @main_bp.route('/')
 def index():
@@ -42,10 +42,15 @@ def login():
 from app.services.spider_service import SpiderService
 from app.services.ai_service import AIService
 from app.services.deep_crawl_service import DeepCrawlService
+from app.services.job_service import JobService, DeepCrawlJobService, ReextractJobService
 
 _spider_service = None
 _ai_service = None
 _deep_crawl_service = None
+_job_service = None
+_deep_job_service = None
+_deep_job_lock = threading.Lock()
+_reextract_job_service = None
 
 def get_spider_service():
     global _spider_service
@@ -68,6 +73,36 @@ def get_deep_crawl_service():
         _deep_crawl_service = DeepCrawlService(db_path)
     return _deep_crawl_service
 
+def get_job_service():
+    global _job_service
+    if _job_service is None:
+        db_path = os.path.join(os.path.abspath(os.path.dirname(__file__)), '..', '..', 'data.db')
+        _job_service = JobService(db_path, get_spider_service())
+    return _job_service
+
+def get_deep_job_service():
+    global _deep_job_service
+    # 创建时会续跑未完成的任务，加锁避免并发的首批请求重复续跑
+    with _deep_job_lock:
+        if _deep_job_service is None:
+            db_path = os.path.join(os.path.abspath(os.path.dirname(__file__)), '..', '..', 'data.db')
+            _deep_job_service = DeepCrawlJobService(db_path, get_deep_crawl_service())
+    return _deep_job_service
+
+def get_reextract_job_service():
+    global _reextract_job_service
+    with _deep_job_lock:
+        if _reextract_job_service is None:
+            db_path = os.path.join(os.path.abspath(os.path.dirname(__file__)), '..', '..', 'data.db')
+            _reextract_job_service = ReextractJobService(db_path, get_deep_crawl_service())
+    return _reextract_job_service
+
+@main_bp.before_app_request
+def resume_deep_jobs():
+    """服务重启后的首个请求即初始化深度采集与重新提炼任务服务，续跑中断的任务"""
+    get_deep_job_service()
+    get_reextract_job_service()
+
 @main_bp.route('/dashboard')
 def dashboard():
     if 'user_id' not in session:
@@ -97,14 +132,16 @@ def dashboard():
     }
     
     # 2. 动态生成数据采集趋势 (最近7天)
+    # 按采集时间区间一次查出 7 天的计数（走 collect_time 索引）
     acquisition_data = {'days': [], 'values': []}
+    start_date = (datetime.datetime.now() - datetime.timedelta(days=6)).strftime('%Y-%m-%d')
+    day_counts = {row['day']: row['count'] for row in conn.execute(
+        "SELECT substr(collect_time, 1, 10) AS day, COUNT(*) AS count FROM collected_data "
+        "WHERE collect_time >= ? GROUP BY day", (start_date,))}
     for i in range(6, -1, -1):
         target_date = datetime.datetime.now() - datetime.timedelta(days=i)
-        day_label = target_date.strftime('%m-%d')
-        query_date = target_date.strftime('%Y-%m-%d')
-        count = conn.execute("SELECT COUNT(*) FROM collected_data WHERE collect_time LIKE ?", (f"{query_date}%",)).fetchone()[0]
-        acquisition_data['days'].append(day_label)
-        acquisition_data['values'].append(count)
+        acquisition_data['days'].append(target_date.strftime('%m-%d'))
+        acquisition_data['values'].append(day_counts.get(target_date.strftime('%Y-%m-%d'), 0))
     
     # 3. 动态生成数据来源分布 (饼图)
     source_rows = conn.execute("SELECT source, COUNT(*) as count FROM collected_data GROUP BY source").fetchall()
@@ -130,6 +167,7 @@ def dashboard():
             })
 
     total_tokens = sum(m.get('used_tokens', 0) for m in ai_models)
+    cache_stats = get_deep_crawl_service().get_cache_stats()
     spider_service = get_spider_service()
     crawlers = spider_service.get_all_crawlers()
     collected_data, _ = spider_service.get_collected_data(page=1, per_page=10)
@@ -143,23 +181,67 @@ def dashboard():
                           collected_data=collected_data,
                           total_count=total_data_count,
                           ai_models=ai_models,
-                          total_tokens=total_tokens)
+                          total_tokens=total_tokens,
+                          cache_stats=cache_stats)
 
 @main_bp.route('/crawler/run/<int:crawler_id>', methods=['POST'])
 def run_crawler(crawler_id):
+    """提交后台采集任务，立即返回任务 id，进度通过 /crawler/jobs/<id> 查询"""
     if 'user_id' not in session:
         return {"error": "Unauthorized"}, 401
     
     keyword = request.json.get('keyword', 'AI舆情')
     limit = request.json.get('limit', 10)
     
-    spider_service = get_spider_service()
     try:
-        count = spider_service.run_baidu_spider(crawler_id, keyword, limit=limit)
-        return {"message": f"成功采集 {count} 条数据", "count": count}, 200
+        job_id = get_job_service().submit_crawl(crawler_id, keyword, limit=limit)
+        return {"message": "采集任务已提交", "job_id": job_id}, 202
     except Exception as e:
         return {"error": str(e)}, 500
 
+@main_bp.route('/crawler/jobs', methods=['GET', 'POST'])
+def crawl_jobs():
+    if 'user_id' not in session:
+        return {"error": "Unauthorized"}, 401
+    
+    job_service = get_job_service()
+    if request.method == 'GET':
+        limit = request.args.get('limit', 20, type=int)
+        return jsonify(job_service.list_jobs(limit=limit))
+    
+    data = request.json or {}
+    crawler_id = data.get('crawler_id')
+    if not crawler_id:
+        return {"error": "Missing crawler_id"}, 400
+    try:
+        job_id = job_service.submit_crawl(crawler_id, data.get('keyword', 'AI舆情'), limit=data.get('limit', 10))
+        return {"message": "采集任务已提交", "job_id": job_id}, 202
+    except Exception as e:
+        return {"error": str(e)}, 500
+
+@main_bp.route('/crawler/jobs/<int:job_id>')
+def crawl_job_status(job_id):
+    if 'user_id' not in session:
+        return {"error": "Unauthorized"}, 401
+    
+    job = get_job_service().get_job(job_id)
+    if not job:
+        return {"error": "Job not found"}, 404
+    return job, 200
+
+@main_bp.route('/crawler/jobs/<int:job_id>/stream')
+def crawl_job_stream(job_id):
+    """任务进度 SSE，断线重连时浏览器会带上 Last-Event-ID，从断点继续推送"""
+    if 'user_id' not in session:
+        return {"error": "Unauthorized"}, 401
+    
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id') or 0
+    try:
+        last_event_id = int(last_event_id)
+    except ValueError:
+        last_event_id = 0
+    return Response(get_job_service().stream_job(job_id, last_event_id), mimetype='text/event-stream')
+
 @main_bp.route('/api/system_stats')
 def get_system_stats():
     """获取真实系统资源监控数据"""
@@ -187,37 +269,94 @@ def get_system_stats():
     except Exception as e:
         return {"error": str(e)}, 500
 
+@main_bp.route('/api/http_stats')
+def get_http_stats():
+    """共享 HTTP 客户端的连接复用、流量与延迟统计"""
+    if 'user_id' not in session:
+        return {"error": "Unauthorized"}, 401
+
+    from dist.baidusearch.http_client import get_http_client
+    return get_http_client().get_stats(), 200
+
+@main_bp.route('/api/db_stats')
+def get_db_stats():
+    """数据库连接池的借出次数、等待次数与等待时间"""
+    if 'user_id' not in session:
+        return {"error": "Unauthorized"}, 401
+
+    return jsonify(pool_stats())
+
+@main_bp.route('/api/archive_stats')
+def get_archive_stats():
+    """原始网页归档的磁盘占用、压缩率与去重情况"""
+    if 'user_id' not in session:
+        return {"error": "Unauthorized"}, 401
+
+    return get_deep_crawl_service().get_archive_stats(), 200
+
+@main_bp.route('/api/domain_stats')
+def get_domain_stats():
+    """深度采集各站点的并发上限、熔断状态与累计耗时（耗时最多的站点在前）"""
+    if 'user_id' not in session:
+        return {"error": "Unauthorized"}, 401
+
+    return jsonify(get_deep_crawl_service().get_domain_stats())
+
+def _crawler_engine(crawler):
+    """根据爬虫名称或类型确定采集引擎"""
+    if '新闻' in crawler['name'] or crawler['type'] == 'baidu_news':
+        return 'baidu_news'
+    elif '360' in crawler['name'] or crawler['type'] == '360_search':
+        return '360'
+    return 'baidu'
+
 @main_bp.route('/crawler/stream')
 def stream_crawler():
     if 'user_id' not in session:
         return {"error": "Unauthorized"}, 401
     
     crawler_id = request.args.get('id', type=int)
+    # ids=1,2,3 时多引擎并发检索，合并为一条去重后的 SSE 流
+    crawler_ids = [int(cid) for cid in request.args.get('ids', '').split(',') if cid.strip().isdigit()]
+    if not crawler_ids and crawler_id:
+        crawler_ids = [crawler_id]
     keyword = request.args.get('keyword', 'AI舆情')
     limit = request.args.get('limit', 10, type=int)
 
     def generate():
-        spider_service = get_spider_service()
         conn = get_db_connection()
-        crawler = conn.execute('SELECT name, type FROM crawlers WHERE id = ?', (crawler_id,)).fetchone()
+        crawlers = []
+        for cid in crawler_ids:
+            crawler = conn.execute('SELECT name, type, config FROM crawlers WHERE id = ?', (cid,)).fetchone()
+            if crawler:
+                crawlers.append(crawler)
         conn.close()
         
-        if not crawler:
+        if not crawlers:
             yield f"data: {json.dumps({'error': 'Crawler not found'})}\n\n"
             return
 
-        from dist.baidusearch.search_cli import BaiduSpider, BaiduNewsSpider, SoSpider
+        from dist.baidusearch.search_cli import build_spider
+        from dist.baidusearch.fanout import fanout_search
         
-        # 根据名称或类型选择爬虫类
-        if '新闻' in crawler['name'] or crawler['type'] == 'baidu_news':
-            spider = BaiduNewsSpider()
-        elif '360' in crawler['name'] or crawler['type'] == '360_search':
-            spider = SoSpider()
-        else:
-            spider = BaiduSpider()
+        # 引擎 -> 爬虫 config 列（限速等配置）
+        engines = {}
+        for crawler in crawlers:
+            engines.setdefault(_crawler_engine(crawler), crawler['config'])
         
         try:
-            for item in spider.search(keyword, limit=limit):
+            spiders = {e: build_spider(e, cfg) for e, cfg in engines.items()}
+            if len(spiders) > 1:
+                results = fanout_search(spiders, keyword, limit=limit)
+            else:
+                results = next(iter(spiders.values())).search(keyword, limit=limit)
+            for item in results:
+                if 'error' in item:
+                    # 单个引擎失败不影响其余引擎，按引擎推送错误事件后继续
+                    error = {'engine': item.get('engine', next(iter(spiders))), 'status': 'error',
+                             'message': item['error']}
+                    yield f"data: {json.dumps(error)}\n\n"
+                    continue
                 # Send each item as a JSON string in SSE format
                 yield f"data: {json.dumps(item)}\n\n"
             
@@ -236,40 +375,9 @@ def save_data():
     if not items:
         return {"error": "No items to save"}, 400
     
-    conn = get_db_connection()
-    new_added = 0
-    updated = 0
+    spider_service = get_spider_service()
     try:
-        for item in items:
-            # 检查 URL 是否已存在
-            existing = conn.execute('SELECT id FROM collected_data WHERE url = ?', (item['url'],)).fetchone()
-            if existing:
-                conn.execute('''
-                    UPDATE collected_data 
-                    SET title = ?, description = ?, collect_time = CURRENT_TIMESTAMP
-                    WHERE id = ?
-                ''', (item['title'], item['description'], existing['id']))
-                updated += 1
-            else:
-                conn.execute('''
-                    INSERT INTO collected_data (title, url, description, source)
-                    VALUES (?, ?, ?, ?)
-                ''', (item['title'], item['url'], item['description'], item['source']))
-                new_added += 1
-        
-        # 仅针对新增条数更新系统统计量
-        if new_added > 0:
-            current_stats = conn.execute('SELECT metric_value FROM system_stats WHERE metric_name = ?', ('total_data',)).fetchone()
-            if current_stats:
-                try:
-                    current_val = int(current_stats['metric_value'].replace(',', ''))
-                    new_val = current_val + new_added
-                    formatted_val = "{:,}".format(new_val)
-                    conn.execute('UPDATE system_stats SET metric_value = ? WHERE metric_name = ?', (formatted_val, 'total_data'))
-                except:
-                    pass
-            
-        conn.commit()
+        new_added, updated = spider_service.save_items(items)
         return {
             "message": f"保存完成！新增 {new_added} 条，更新 {updated} 条。",
             "added": new_added,
@@ -277,8 +385,6 @@ def save_data():
         }, 200
     except Exception as e:
         return {"error": str(e)}, 500
-    finally:
-        conn.close()
 
 @main_bp.route('/crawler/add', methods=['POST'])
 def add_new_crawler():
@@ -312,7 +418,21 @@ def list_data():
     per_page = request.args.get('per_page', 10, type=int)
     
     spider_service = get_spider_service()
-    data, total = spider_service.get_collected_data(keyword=keyword, page=page, per_page=per_page)
+    # 带 cursor 参数（首页传空串）时使用游标分页，否则按页码分页
+    if 'cursor' in request.args:
+        try:
+            result = spider_service.get_collected_data_by_cursor(
+                keyword=keyword, cursor=request.args.get('cursor') or None,
+                limit=clamp_limit(request.args.get('limit', per_page, type=int)),
+                count=request.args.get('count', 'estimate'))
+        except ValueError as e:
+            return {"error": str(e)}, 400
+        return result, 200
+    try:
+        data, total = spider_service.get_collected_data(keyword=keyword, page=page, per_page=per_page,
+                                                        count=request.args.get('count', 'cached'))
+    except ValueError as e:
+        return {"error": str(e)}, 400
     return {"data": data, "total": total, "page": page, "per_page": per_page}, 200
 
 @main_bp.route('/data/delete/<int:data_id>', methods=['POST'])
@@ -356,7 +476,9 @@ def add_model():
             data['api_url'], 
             data['api_key'], 
             data['model_name'], 
-            data.get('system_prompt', '你是一个专业的政企信息分析助手。')
+            data.get('system_prompt', '你是一个专业的政企信息分析助手。'),
+            int(data.get('max_input_tokens') or 3000),
+            float(data.get('cjk_token_ratio') or 0.6)
         )
         return {"message": "模型配置添加成功"}, 200
     except Exception as e:
@@ -374,13 +496,16 @@ def update_model_config():
     api_key = data.get('api_key')
     model_name = data.get('model_name')
     system_prompt = data.get('system_prompt')
+    max_input_tokens = int(data['max_input_tokens']) if data.get('max_input_tokens') else None
+    cjk_token_ratio = float(data['cjk_token_ratio']) if data.get('cjk_token_ratio') else None
     
     if not model_id or not name:
         return {"error": "Missing required fields"}, 400
         
     ai_service = get_ai_service()
     try:
-        ai_service.update_model(model_id, name, api_url, api_key, model_name, system_prompt)
+        ai_service.update_model(model_id, name, api_url, api_key, model_name, system_prompt,
+                                max_input_tokens, cjk_token_ratio)
         return {"message": "模型配置已更新"}, 200
     except Exception as e:
         return {"error": str(e)}, 500
@@ -434,25 +559,144 @@ def model_chat_stream():
     )
 
 # 深度采集相关路由
+def _parse_deep_event_id(value):
+    """深度采集任务的 SSE 事件 id 形如 "<任务id>:<序号>"，返回 (job_id, seq)"""
+    try:
+        job_id, seq = (value or '').split(':', 1)
+        return int(job_id), int(seq)
+    except ValueError:
+        return None, 0
+
 @main_bp.route('/data/deep_crawl')
 def deep_crawl_task():
+    """提交深度采集任务并推送进度；断线重连时按 Last-Event-ID 重新接入原任务，不会重复提交"""
     if 'user_id' not in session:
         return {"error": "Unauthorized"}, 401
     
+    deep_jobs = get_deep_job_service()
+    job_id, last_seq = _parse_deep_event_id(request.headers.get('Last-Event-ID'))
+    if job_id and deep_jobs.get_job(job_id):
+        return Response(deep_jobs.stream_job(job_id, last_seq), mimetype='text/event-stream')
+    
     source_ids_str = request.args.get('ids', '')
     model_id = request.args.get('model_id')
+    # batch=1 时多篇短文章合并为一次大模型调用
+    batch = request.args.get('batch') == '1'
     
     if not source_ids_str or not model_id:
         return {"error": "Missing parameters"}, 400
     
     source_ids = [int(sid) for sid in source_ids_str.split(',') if sid]
-    deep_service = get_deep_crawl_service()
+    job_id = deep_jobs.submit(source_ids, int(model_id), batch=batch)
     
     return Response(
-        deep_service.run_deep_crawl_task(source_ids, int(model_id)),
+        deep_jobs.stream_job(job_id),
         mimetype='text/event-stream'
     )
 
+@main_bp.route('/data/deep_crawl/jobs', methods=['GET', 'POST'])
+def deep_crawl_jobs():
+    if 'user_id' not in session:
+        return {"error": "Unauthorized"}, 401
+    
+    deep_jobs = get_deep_job_service()
+    if request.method == 'GET':
+        limit = request.args.get('limit', 20, type=int)
+        return jsonify(deep_jobs.list_jobs(limit=limit))
+    
+    data = request.json or {}
+    source_ids = data.get('ids') or []
+    model_id = data.get('model_id')
+    if not source_ids or not model_id:
+        return {"error": "Missing parameters"}, 400
+    try:
+        job_id = deep_jobs.submit([int(sid) for sid in source_ids], int(model_id), batch=bool(data.get('batch')))
+        return {"message": "深度采集任务已提交", "job_id": job_id}, 202
+    except Exception as e:
+        return {"error": str(e)}, 500
+
+@main_bp.route('/data/deep_crawl/jobs/<int:job_id>')
+def deep_crawl_job_status(job_id):
+    if 'user_id' not in session:
+        return {"error": "Unauthorized"}, 401
+    
+    job = get_deep_job_service().get_job(job_id)
+    if not job:
+        return {"error": "Job not found"}, 404
+    return job, 200
+
+@main_bp.route('/data/deep_crawl/jobs/<int:job_id>/stream')
+def deep_crawl_job_stream(job_id):
+    """重新接入进行中的深度采集任务，从 Last-Event-ID 之后补发错过的进度"""
+    if 'user_id' not in session:
+        return {"error": "Unauthorized"}, 401
+    
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id') or ''
+    _, last_seq = _parse_deep_event_id(last_event_id if ':' in last_event_id else f'{job_id}:{last_event_id or 0}')
+    return Response(get_deep_job_service().stream_job(job_id, last_seq), mimetype='text/event-stream')
+
+@main_bp.route('/data/deep_crawl/jobs/<int:job_id>/resume', methods=['POST'])
+def deep_crawl_job_resume(job_id):
+    if 'user_id' not in session:
+        return {"error": "Unauthorized"}, 401
+    
+    if not get_deep_job_service().resume(job_id):
+        return {"error": "只能续跑已失败的任务"}, 400
+    return {"message": "任务已重新排队", "job_id": job_id}, 202
+
+@main_bp.route('/data/reextract', methods=['GET', 'POST'])
+def reextract():
+    """用当前提示词版本批量重新提炼已存储的深度数据；dry_run 只估算行数与 token 消耗"""
+    if 'user_id' not in session:
+        return {"error": "Unauthorized"}, 401
+    
+    reextract_jobs = get_reextract_job_service()
+    if request.method == 'GET':
+        limit = request.args.get('limit', 20, type=int)
+        return jsonify(reextract_jobs.list_jobs(limit=limit))
+    
+    data = request.json or {}
+    model_id = data.get('model_id')
+    if not model_id:
+        return {"error": "Missing parameters"}, 400
+    target_version = data.get('target_version')
+    target_version = int(target_version) if target_version else None
+    try:
+        if data.get('dry_run'):
+            model = get_deep_crawl_service().get_ai_model(int(model_id))
+            if not model:
+                return {"error": "未找到可用的 AI 模型"}, 400
+            return get_deep_crawl_service().estimate_reextract(model, target_version), 200
+        job_id, estimate = reextract_jobs.submit(int(model_id), target_version, batch=bool(data.get('batch')),
+                                                 workers=int(data.get('workers') or 4))
+        return {"message": "重新提炼任务已提交", "job_id": job_id, "estimate": estimate}, 202
+    except ValueError as e:
+        return {"error": str(e)}, 400
+    except Exception as e:
+        return {"error": str(e)}, 500
+
+@main_bp.route('/data/reextract/<int:job_id>')
+def reextract_job_status(job_id):
+    if 'user_id' not in session:
+        return {"error": "Unauthorized"}, 401
+    
+    job = get_reextract_job_service().get_job(job_id)
+    if not job:
+        return {"error": "Job not found"}, 404
+    return job, 200
+
+@main_bp.route('/data/reextract/<int:job_id>/stream')
+def reextract_job_stream(job_id):
+    if 'user_id' not in session:
+        return {"error": "Unauthorized"}, 401
+    
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id') or 0
+    try:
+        last_seq = int(last_event_id)
+    except ValueError:
+        last_seq = 0
+    return Response(get_reextract_job_service().stream_job(job_id, last_seq), mimetype='text/event-stream')
+
 @main_bp.route('/deep_data/list')
 def list_deep_data():
     if 'user_id' not in session:
@@ -463,7 +707,21 @@ def list_deep_data():
     per_page = request.args.get('per_page', 10, type=int)
     
     deep_service = get_deep_crawl_service()
-    data, total = deep_service.get_deep_data(keyword=keyword, page=page, per_page=per_page)
+    # 带 cursor 参数（首页传空串）时使用游标分页，否则按页码分页
+    if 'cursor' in request.args:
+        try:
+            result = deep_service.get_deep_data_by_cursor(
+                keyword=keyword, cursor=request.args.get('cursor') or None,
+                limit=clamp_limit(request.args.get('limit', per_page, type=int)),
+                count=request.args.get('count', 'estimate'))
+        except ValueError as e:
+            return {"error": str(e)}, 400
+        return result, 200
+    try:
+        data, total = deep_service.get_deep_data(keyword=keyword, page=page, per_page=per_page,
+                                                 count=request.args.get('count', 'cached'))
+    except ValueError as e:
+        return {"error": str(e)}, 400
     return {"data": data, "total": total, "page": page, "per_page": per_page}, 200
 
 @main_bp.route('/deep_data/delete/<int:data_id>', methods=['POST'])
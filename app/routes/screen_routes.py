@@ -1,15 +1,13 @@
 from flask import Blueprint, render_template, jsonify
-import sqlite3
 import os
 from datetime import datetime, timedelta
+from app.db import get_connection
 
 screen_bp = Blueprint('screen', __name__)
 
 def get_db_connection():
     db_path = os.path.join(os.path.abspath(os.path.dirname(__file__)), '..', '..', 'data.db')
-    conn = sqlite3.connect(db_path)
-    conn.row_factory = sqlite3.Row
-    return conn
+    return get_connection(db_path)
 
 @screen_bp.route('/screen')
 def data_screen():
@@ -24,19 +22,19 @@ def screen_overview():
     # 今日采集量
     today_count = conn.execute('''
         SELECT COUNT(*) as count FROM collected_data 
-        WHERE DATE(collect_time) = DATE('now')
+        WHERE collect_time >= DATE('now') AND collect_time < DATE('now', '+1 day')
     ''').fetchone()['count']
     
     # 本周采集量
     week_count = conn.execute('''
         SELECT COUNT(*) as count FROM collected_data 
-        WHERE DATE(collect_time) >= DATE('now', 'weekday 0', '-7 days')
+        WHERE collect_time >= DATE('now', 'weekday 0', '-7 days')
     ''').fetchone()['count']
     
     # 本月采集量
     month_count = conn.execute('''
         SELECT COUNT(*) as count FROM collected_data 
-        WHERE DATE(collect_time) >= DATE('now', 'start of month')
+        WHERE collect_time >= DATE('now', 'start of month')
     ''').fetchone()['count']
     
     # 总采集量
@@ -78,7 +76,7 @@ def screen_trend():
             DATE(collect_time) as date,
             COUNT(*) as count
         FROM collected_data
-        WHERE DATE(collect_time) >= DATE('now', '-7 days')
+        WHERE collect_time >= DATE('now', '-7 days')
         GROUP BY DATE(collect_time)
         ORDER BY date
     ''').fetchall()
@@ -95,7 +93,7 @@ def screen_keywords():
     # 获取最近的标题，简单统计高频词
     titles = conn.execute('''
         SELECT title FROM collected_data 
-        WHERE DATE(collect_time) >= DATE('now', '-7 days')
+        WHERE collect_time >= DATE('now', '-7 days')
         LIMIT 200
     ''').fetchall()
     
@@ -1,15 +1,15 @@
-import sqlite3
 import os
-from openai import OpenAI
+from app.db import get_connection
+from app.migrations import migrate
+from app.services.llm_clients import get_llm_clients
 
 class AIService:
     def __init__(self, db_path='data.db'):
         self.db_path = db_path
+        migrate(db_path)
 
     def _get_connection(self):
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        return conn
+        return get_connection(self.db_path)
 
     def get_all_models(self):
         conn = self._get_connection()
@@ -28,24 +28,25 @@ class AIService:
         finally:
             conn.close()
 
-    def add_model(self, name, api_url, api_key, model_name, system_prompt):
+    def add_model(self, name, api_url, api_key, model_name, system_prompt, max_input_tokens=3000, cjk_token_ratio=0.6):
         conn = self._get_connection()
         try:
             conn.execute('''
-                INSERT INTO ai_models (name, api_url, api_key, model_name, system_prompt)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (name, api_url, api_key, model_name, system_prompt))
+                INSERT INTO ai_models (name, api_url, api_key, model_name, system_prompt, max_input_tokens, cjk_token_ratio)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (name, api_url, api_key, model_name, system_prompt, max_input_tokens, cjk_token_ratio))
             conn.commit()
         finally:
             conn.close()
 
     def get_model_by_id(self, model_id):
-        conn = self._get_connection()
-        try:
-            model = conn.execute('SELECT * FROM ai_models WHERE id = ?', (model_id,)).fetchone()
-            return dict(model) if model else None
-        finally:
-            conn.close()
+        if not model_id:
+            return None
+        return get_llm_clients(self.db_path).get_model(model_id)
+
+    def _get_client(self, model):
+        """复用该模型的共享客户端（连接池跨请求保持）"""
+        return get_llm_clients(self.db_path).get_client(model)
 
     def log_token_usage(self, model_id, prompt_tokens, completion_tokens, task_type):
         conn = self._get_connection()
@@ -65,7 +66,7 @@ class AIService:
         if not model:
             return {"error": "Model not found"}
         try:
-            client = OpenAI(api_key=model['api_key'], base_url=model['api_url'])
+            client = self._get_client(model)
             response = client.chat.completions.create(
                 model=model['model_name'],
                 messages=[
@@ -95,7 +96,7 @@ class AIService:
             return
 
         try:
-            client = OpenAI(api_key=model['api_key'], base_url=model['api_url'])
+            client = self._get_client(model)
             response = client.chat.completions.create(
                 model=model['model_name'],
                 messages=[
@@ -139,17 +140,20 @@ class AIService:
         except Exception as e:
             yield f"data: {{\"error\": \"{str(e)}\"}}\n\n"
 
-    def update_model(self, model_id, name, api_url, api_key, model_name, system_prompt):
+    def update_model(self, model_id, name, api_url, api_key, model_name, system_prompt, max_input_tokens=None, cjk_token_ratio=None):
         conn = self._get_connection()
         try:
+            # 预算字段未传时保持原值
             conn.execute('''
                 UPDATE ai_models 
-                SET name = ?, api_url = ?, api_key = ?, model_name = ?, system_prompt = ?
+                SET name = ?, api_url = ?, api_key = ?, model_name = ?, system_prompt = ?,
+                    max_input_tokens = COALESCE(?, max_input_tokens), cjk_token_ratio = COALESCE(?, cjk_token_ratio)
                 WHERE id = ?
-            ''', (name, api_url, api_key, model_name, system_prompt, model_id))
+            ''', (name, api_url, api_key, model_name, system_prompt, max_input_tokens, cjk_token_ratio, model_id))
             conn.commit()
         finally:
             conn.close()
+        get_llm_clients(self.db_path).invalidate(model_id)
 
     def delete_model(self, model_id):
         conn = self._get_connection()
@@ -159,6 +163,7 @@ class AIService:
             conn.commit()
         finally:
             conn.close()
+        get_llm_clients(self.db_path).invalidate(model_id)
 
     def _execute_sql(self, sql):
         """执行 SQL 并返回结果列表 (仅限查询)"""
@@ -238,7 +243,7 @@ class AIService:
             print(f"[AI Service] Starting chat_analysis_stream for conversation_id={conversation_id}")
             print(f"[AI Service] User message: {message[:100]}...")
             
-            client = OpenAI(api_key=model['api_key'], base_url=model['api_url'])
+            client = self._get_client(model)
             
             messages = [
                 {"role": "system", "content": db_context},
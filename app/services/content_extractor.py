@@ -0,0 +1,210 @@
+import os
+import re
+import sys
+import codecs
+
+from requests.compat import chardet
+
+try:
+    from lxml import etree
+except ImportError:
+    etree = None
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from dist.baidusearch.parsers import get_parser
+
+# 单个页面最多下载的字节数，超出部分丢弃
+DEFAULT_MAX_BYTES = 2 * 1024 * 1024
+# 编码嗅探只看开头这么多字节
+SNIFF_BYTES = 64 * 1024
+
+_META_CHARSET_RE = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([\w.:-]+)', re.I)
+_HEADER_CHARSET_RE = re.compile(r'charset\s*=\s*["\']?\s*([\w.:-]+)', re.I)
+
+# 这些编码按其超集解码，避免个别生僻字乱码
+_SUPERSETS = {'gb2312': 'gb18030', 'gbk': 'gb18030', 'ascii': 'utf-8', 'iso-8859-1': 'cp1252'}
+
+# 整体丢弃的标签
+_DROP_TAGS = ('script', 'style', 'noscript', 'iframe', 'form', 'nav', 'footer', 'header', 'aside', 'select', 'button')
+# class / id 命中这些词的节点视为导航、版权、推荐等模板内容
+_BOILERPLATE_RE = re.compile(
+    r'nav|menu|footer|header|sidebar|breadcrumb|copyright|comment|share|related|recommend|advert|banner|toolbar|login',
+    re.I)
+# 参与打分的候选容器
+_BLOCK_TAGS = ('div', 'article', 'section', 'main', 'td', 'body')
+# 文本段落节点
+_PARAGRAPH_TAGS = ('p', 'pre', 'blockquote', 'li', 'h1', 'h2', 'h3', 'td', 'div')
+# 低于该长度的段落不计分
+MIN_PARAGRAPH_CHARS = 20
+
+
+def read_capped(resp, max_bytes=DEFAULT_MAX_BYTES, chunk_size=16 * 1024):
+    """流式读取响应体，超过 max_bytes 即停止并关闭连接，返回 (bytes, 是否截断)"""
+    chunks = []
+    size = 0
+    truncated = False
+    try:
+        for chunk in resp.iter_content(chunk_size=chunk_size):
+            if not chunk:
+                continue
+            chunks.append(chunk)
+            size += len(chunk)
+            if size >= max_bytes:
+                truncated = size > max_bytes
+                break
+    finally:
+        resp.close()
+    return b''.join(chunks)[:max_bytes], truncated
+
+
+def _normalize_encoding(name):
+    if not name:
+        return None
+    try:
+        name = codecs.lookup(name.strip().lower()).name
+    except LookupError:
+        return None
+    return _SUPERSETS.get(name, name)
+
+
+def detect_encoding(body, content_type=None):
+    """依次按 响应头 charset、BOM、页面 meta、UTF-8 试解码、统计嗅探 判断编码"""
+    if content_type:
+        match = _HEADER_CHARSET_RE.search(content_type)
+        encoding = _normalize_encoding(match.group(1)) if match else None
+        if encoding:
+            return encoding
+    if body.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    head = body[:4096]
+    match = _META_CHARSET_RE.search(head)
+    encoding = _normalize_encoding(match.group(1).decode('ascii', 'ignore')) if match else None
+    if encoding:
+        return encoding
+    sample = body[:SNIFF_BYTES]
+    try:
+        sample.decode('utf-8')
+        return 'utf-8'
+    except UnicodeDecodeError as e:
+        # 截断位置正好落在多字节字符中间也算 UTF-8
+        if e.start >= len(sample) - 3 and len(body) > len(sample):
+            return 'utf-8'
+    return _normalize_encoding(chardet.detect(sample).get('encoding')) or 'utf-8'
+
+
+def decode_html(body, content_type=None):
+    return body.decode(detect_encoding(body, content_type), errors='replace')
+
+
+def _text_of(node):
+    return ' '.join(t.strip() for t in node.itertext() if t.strip())
+
+
+def _link_text_len(node):
+    return sum(len(_text_of(a)) for a in node.iter('a'))
+
+
+def _drop(node):
+    """删除节点但保留其后的尾随文本（尾随文本属于父节点）"""
+    parent = node.getparent()
+    if parent is None:
+        return
+    tail = node.tail
+    previous = node.getprevious()
+    if tail:
+        if previous is not None:
+            previous.tail = (previous.tail or '') + tail
+        else:
+            parent.text = (parent.text or '') + tail
+    parent.remove(node)
+
+
+def _strip_boilerplate(root):
+    for node in list(root.iter(*_DROP_TAGS)):
+        _drop(node)
+    for node in list(root.iter(*_BLOCK_TAGS, 'ul', 'ol', 'p', 'span')):
+        if node.tag == 'body' or node.getparent() is None:
+            continue
+        marker = f"{node.get('class', '')} {node.get('id', '')}"
+        if marker.strip() and _BOILERPLATE_RE.search(marker):
+            _drop(node)
+
+
+def _score_candidates(root):
+    """文本密度打分：每个段落按 文字长度 × (1 - 链接占比) 计分，计入父节点，半数计入祖父节点"""
+    scores = {}
+    for node in root.iter(*_PARAGRAPH_TAGS):
+        # 只给直接持有文字的段落计分，避免外层 div 重复计入整棵子树
+        own_text = (node.text or '').strip() + ''.join((child.tail or '').strip() for child in node)
+        if len(own_text) < MIN_PARAGRAPH_CHARS and node.tag not in ('p', 'pre', 'blockquote'):
+            continue
+        text = _text_of(node)
+        if len(text) < MIN_PARAGRAPH_CHARS:
+            continue
+        link_density = _link_text_len(node) / len(text)
+        score = len(text) * (1 - link_density) + text.count('，') + text.count(',')
+        parent = node.getparent()
+        if parent is None:
+            continue
+        scores[parent] = scores.get(parent, 0) + score
+        grandparent = parent.getparent()
+        if grandparent is not None:
+            scores[grandparent] = scores.get(grandparent, 0) + score / 2
+    return scores
+
+
+_LINE_BREAK_TAGS = frozenset(('p', 'div', 'br', 'li', 'tr', 'pre', 'blockquote', 'section', 'article',
+                              'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'table', 'ul', 'ol', 'dd', 'dt'))
+
+
+def _render(node, out):
+    block = node.tag in _LINE_BREAK_TAGS
+    if block:
+        out.append('\n')
+    if node.text:
+        out.append(node.text)
+    for child in node:
+        _render(child, out)
+        if child.tail:
+            out.append(child.tail)
+    if block:
+        out.append('\n')
+
+
+def _block_lines(node):
+    """按块级节点分行输出正文，行内标签（链接、加粗等）不断行"""
+    out = []
+    _render(node, out)
+    return [' '.join(line.split()) for line in ''.join(out).split('\n') if line.strip()]
+
+
+def extract_main_text(html, max_chars=None):
+    """提取正文：去掉导航、页脚等模板内容后，按文本密度选出得分最高的容器
+
+    页面结构无法识别时退回为全页纯文本。
+    """
+    if not html:
+        return ''
+    if etree is None:
+        text = get_parser().extract_text(html)
+        return text[:max_chars] if max_chars else text
+
+    if isinstance(html, bytes):
+        html = decode_html(html)
+    parser = etree.HTMLParser(encoding='utf-8', remove_comments=True, remove_pis=True, no_network=True)
+    root = etree.fromstring(html.encode('utf-8', errors='replace'), parser)
+    if root is None:
+        return ''
+    _strip_boilerplate(root)
+    scores = _score_candidates(root)
+
+    text = ''
+    if scores:
+        best = max(scores, key=scores.get)
+        # 最高分容器的链接占比过高说明选中的是列表页导航，丢弃
+        best_text = _text_of(best)
+        if best_text and _link_text_len(best) / len(best_text) < 0.5:
+            text = '\n'.join(_block_lines(best)) or best_text
+    if not text:
+        text = get_parser().extract_text(html)
+    return text[:max_chars] if max_chars else text
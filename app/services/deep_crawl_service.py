@@ -1,54 +1,162 @@
-import sqlite3
 import json
+import hashlib
 import os
-import requests
-from bs4 import BeautifulSoup
+import sys
 from datetime import datetime
-from openai import OpenAI
+from concurrent.futures import ThreadPoolExecutor
 import time
+from urllib.parse import urlsplit
+
+import requests
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from dist.baidusearch.http_client import get_http_client
+from app.db import get_connection
+from app.migrations import migrate
+from app.services.fulltext import DEEP_INDEX
+from app.services.pagination import keyset_page, count_rows, invalidate_counts
+from app.services.deep_pipeline import Stage, StagedPipeline, Requeue
+from app.services.domain_scheduler import get_domain_scheduler, DomainBlocked, DomainTimeout
+from app.services.llm_cache import LLMCache
+from app.services.token_budget import TokenBudget
+from app.services.llm_clients import get_llm_clients
+from app.services.simhash import SimHashIndex, simhash, to_signed
+from app.services.html_archive import get_default_archive
+from app.services.content_extractor import read_capped, decode_html, extract_main_text
 
 class DeepCrawlService:
+    # 各阶段并发数与批量提交大小
+    FETCH_WORKERS = 8
+    PARSE_WORKERS = 2
+    LLM_WORKERS = 4
+    QUEUE_SIZE = 16
+    WRITE_BATCH = 10
+    # 单次抓取超时（秒），客户端不重试
+    FETCH_TIMEOUT = 15
+    # 单页最多下载的字节数；正文最多保留的字符数（超出模型预算的部分分块提炼）
+    MAX_DOWNLOAD_BYTES = 2 * 1024 * 1024
+    MAX_TEXT_CHARS = 60000
+    # 抓取到的原始网页写入归档，供离线重新清洗/提炼
+    ARCHIVE_ENABLED = True
+    # 入库保存的正文字符数（近似去重的指纹也基于这部分正文计算）
+    CONTENT_CHARS = 2000
+    # SimHash 汉明距离不超过该值视为近似重复
+    SIMHASH_DISTANCE = 3
+    # 长文分块提炼：最多块数与分块并发数
+    MAX_CHUNKS = 12
+    CHUNK_WORKERS = 4
+    # 批量提炼：正文估算不超过 BATCH_ITEM_TOKENS 的短文章合并为一次调用，
+    # 每次调用的正文总量不超过 BATCH_TOKEN_BUDGET，篇数不超过 BATCH_MAX_ITEMS
+    BATCH_ITEM_TOKENS = 800
+    BATCH_TOKEN_BUDGET = 3000
+    BATCH_MAX_ITEMS = 8
+    BATCH_LINGER = 0.5
+    # 提炼指令（AI_PROMPT）修改后需递增，使旧的缓存结果失效
+    # 结果按该版本号记入 deep_collected_data.schema_version（提炼模型记入 extract_model_id），
+    # 批量重新提炼只处理版本更旧或由其他模型提炼的行
+    PROMPT_VERSION = 2
+
     def __init__(self, db_path):
         self.db_path = db_path
+        self.llm_cache = LLMCache(db_path)
+        self.chunk_executor = ThreadPoolExecutor(max_workers=self.CHUNK_WORKERS, thread_name_prefix='deep-chunk')
+        self.simhash_index = SimHashIndex(self.SIMHASH_DISTANCE)
+        self.archive = get_default_archive() if self.ARCHIVE_ENABLED else None
+        self.domains = get_domain_scheduler()
+        migrate(db_path)
 
     def _get_connection(self):
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        return conn
+        return get_connection(self.db_path)
 
     def get_ai_model(self, model_id=None):
-        conn = self._get_connection()
         if model_id:
-            model = conn.execute('SELECT * FROM ai_models WHERE id = ?', (model_id,)).fetchone()
-        else:
-            model = conn.execute('SELECT * FROM ai_models WHERE is_active = 1 LIMIT 1').fetchone()
+            return get_llm_clients(self.db_path).get_model(model_id)
+        conn = self._get_connection()
+        model = conn.execute('SELECT * FROM ai_models WHERE is_active = 1 LIMIT 1').fetchone()
         conn.close()
         return dict(model) if model else None
 
-    def get_deep_data(self, keyword=None, page=1, per_page=10):
+    def get_cache_stats(self):
+        """深度采集提炼缓存的命中率与节省的 token 数"""
         conn = self._get_connection()
-        where_clause = ""
-        params = []
-        if keyword:
-            where_clause = " WHERE d.title LIKE ? OR d.content LIKE ? OR d.url LIKE ?"
-            like_val = f"%{keyword}%"
-            params.extend([like_val, like_val, like_val])
-        
-        count_query = f"SELECT COUNT(*) FROM deep_collected_data d {where_clause}"
-        total = conn.execute(count_query, params).fetchone()[0]
-        
-        query = f"""
-            SELECT d.*, c.title as source_title 
-            FROM deep_collected_data d 
-            LEFT JOIN collected_data c ON d.source_id = c.id 
-            {where_clause}
-            ORDER BY d.collect_time DESC LIMIT ? OFFSET ?
-        """
-        params.extend([per_page, (page - 1) * per_page])
-        
-        rows = conn.execute(query, params).fetchall()
-        conn.close()
-        return [dict(row) for row in rows], total
+        try:
+            return self.llm_cache.stats(conn)
+        finally:
+            conn.close()
+
+    def get_archive_stats(self):
+        return self.archive.stats() if self.archive else {}
+
+    def get_domain_stats(self):
+        return self.domains.stats()
+
+    @staticmethod
+    def _deep_filter(conn, keyword, fulltext):
+        """返回 (where, params, matched, exact)：筛选条件、全文检索命中少时已数出的总数与索引计数函数"""
+        if not keyword:
+            return [], [], None, None
+        if fulltext:
+            where, params, matched = DEEP_INDEX.time_filter(conn, keyword, 'd.id')
+            return [where], params, matched, lambda: DEEP_INDEX.count(conn, keyword)
+        like_val = f"%{keyword}%"
+        return ["(d.title LIKE ? OR d.content LIKE ? OR d.url LIKE ?)"], [like_val, like_val, like_val], None, None
+
+    def get_deep_data(self, keyword=None, page=1, per_page=10, count='cached'):
+        """按页码分页（兼容接口）；关键词可走全文索引时按相关度排序并附带高亮摘要"""
+        conn = self._get_connection()
+        try:
+            fulltext = DEEP_INDEX.usable(keyword) and DEEP_INDEX.exists(conn)
+            where, params, matched, exact = self._deep_filter(conn, keyword, fulltext)
+            total, _ = count_rows(conn, 'deep_collected_data', 'd', where, params, count,
+                                  cache_key=keyword or None, known=matched, exact=exact)
+            if fulltext:
+                ids = DEEP_INDEX.ranked_ids(conn, keyword, per_page, (page - 1) * per_page, matched)
+                if not ids:
+                    return [], total
+                rows = conn.execute(f"""
+                    SELECT d.*, c.title as source_title
+                    FROM deep_collected_data d
+                    LEFT JOIN collected_data c ON d.source_id = c.id
+                    WHERE d.id IN ({','.join(['?'] * len(ids))})
+                """, ids).fetchall()
+                by_id = {row['id']: dict(row) for row in rows}
+                snippets = DEEP_INDEX.snippets(conn, keyword, ids)
+                return [dict(by_id[i], snippet=snippets.get(i)) for i in ids if i in by_id], total
+
+            where_clause = f" WHERE {where[0]}" if where else ""
+            query = f"""
+                SELECT d.*, c.title as source_title
+                FROM deep_collected_data d
+                LEFT JOIN collected_data c ON d.source_id = c.id
+                {where_clause}
+                ORDER BY d.collect_time DESC, d.id DESC LIMIT ? OFFSET ?
+            """
+            rows = conn.execute(query, params + [per_page, (page - 1) * per_page]).fetchall()
+            return [dict(row) for row in rows], total
+        finally:
+            conn.close()
+
+    def get_deep_data_by_cursor(self, keyword=None, cursor=None, limit=10, count='estimate'):
+        """游标分页：按 (采集时间, id) 倒序，返回 {"data", "next_cursor", "prev_cursor", "total", "total_mode"}"""
+        conn = self._get_connection()
+        try:
+            fulltext = DEEP_INDEX.usable(keyword) and DEEP_INDEX.exists(conn)
+            where, params, matched, exact = self._deep_filter(conn, keyword, fulltext)
+            rows, next_cursor, prev_cursor = keyset_page(conn, """
+                SELECT d.*, c.title as source_title
+                FROM deep_collected_data d
+                LEFT JOIN collected_data c ON d.source_id = c.id
+            """, where, params, 'd.collect_time', 'd.id', cursor, limit)
+            if fulltext:
+                snippets = DEEP_INDEX.snippets(conn, keyword, [row['id'] for row in rows])
+                for row in rows:
+                    row['snippet'] = snippets.get(row['id'])
+            total, total_mode = count_rows(conn, 'deep_collected_data', 'd', where, params, count,
+                                           cache_key=keyword or None, known=matched, exact=exact)
+        finally:
+            conn.close()
+        return {"data": rows, "next_cursor": next_cursor, "prev_cursor": prev_cursor,
+                "total": total, "total_mode": total_mode}
 
     def delete_deep_data(self, data_id):
         conn = self._get_connection()
@@ -57,8 +165,10 @@ class DeepCrawlService:
             source_id = row['source_id']
             conn.execute('DELETE FROM deep_collected_data WHERE id = ?', (data_id,))
             conn.execute('UPDATE collected_data SET deep_status = 0 WHERE id = ?', (source_id,))
+            self.simhash_index.remove(conn, [source_id])
         conn.commit()
         conn.close()
+        invalidate_counts('deep_collected_data')
 
     def batch_delete_deep_data(self, ids):
         if not ids: return
@@ -72,9 +182,11 @@ class DeepCrawlService:
         if source_ids:
             s_placeholders = ','.join(['?'] * len(source_ids))
             conn.execute(f'UPDATE collected_data SET deep_status = 0 WHERE id IN ({s_placeholders})', source_ids)
+            self.simhash_index.remove(conn, source_ids)
             
         conn.commit()
         conn.close()
+        invalidate_counts('deep_collected_data')
 
     def update_deep_data(self, data_id, title, content, summary, structured_data):
         conn = self._get_connection()
@@ -86,51 +198,8 @@ class DeepCrawlService:
         conn.commit()
         conn.close()
 
-    def run_deep_crawl_task(self, source_ids, model_id):
-        """生成器，用于 SSE 输出进度"""
-        model = self.get_ai_model(model_id)
-        if not model:
-            yield f"data: {json.dumps({'error': '未找到可用的 AI 模型'})}\n\n"
-            return
-
-        total = len(source_ids)
-        success_count = 0
-        fail_count = 0
-
-        conn = self._get_connection()
-        
-        for i, sid in enumerate(source_ids):
-            # 获取源数据
-            source = conn.execute('SELECT * FROM collected_data WHERE id = ?', (sid,)).fetchone()
-            if not source:
-                continue
-            
-            url = source['url']
-            progress = int((i / total) * 100)
-            
-            yield f"data: {json.dumps({'status': 'processing', 'current': i+1, 'total': total, 'progress': progress, 'title': source['title']})}\n\n"
-            
-            # 更新状态为“正在采集”
-            conn.execute('UPDATE collected_data SET deep_status = 1 WHERE id = ?', (sid,))
-            conn.commit()
-
-            try:
-                # 深度采集阶段 1: 网页爬取 (CrawlAI 核心思路：极速获取干净 Markdown/Text)
-                # 由于环境限制，我们使用 requests + bs4 模拟 CrawlAI 的获取过程
-                headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'}
-                req_resp = requests.get(url, headers=headers, timeout=15)
-                req_resp.encoding = req_resp.apparent_encoding
-                soup = BeautifulSoup(req_resp.text, 'html.parser')
-                
-                # 简单清洗
-                for s in soup(['script', 'style']): s.decompose()
-                main_text = soup.get_text(separator='\n', strip=True)
-                # 截断太长的文本防止 token 溢出
-                clean_text = main_text[:4000] 
-
-                # 深度采集阶段 2: AI 智能解析与提炼
-                client = OpenAI(api_key=model['api_key'], base_url=model['api_url'])
-                ai_prompt = f"""
+    # 深度采集的提炼指令
+    AI_PROMPT = """
                 你是一个资深的数据分析专家。请根据以下网页内容，提取核心信息。
                 要求输出 JSON 格式，包含以下字段：
                 - title: 文章标题
@@ -142,56 +211,618 @@ class DeepCrawlService:
                 网页内容：
                 {clean_text}
                 """
-                
-                ai_resp = client.chat.completions.create(
-                    model=model['model_name'],
-                    messages=[
-                        {"role": "system", "content": "你是一个专业的数据处理助手，只输出 JSON。"},
-                        {"role": "user", "content": ai_prompt}
-                    ],
-                    response_format={"type": "json_object"} if "DeepSeek" in model['model_name'] or "gpt-4" in model['model_name'] else None
-                )
-                
-                analysis_str = ai_resp.choices[0].message.content
-                analysis = json.loads(analysis_str)
-                
-                # 保存到深度采集表
-                # 使用 REPLACE INTO 或检查是否存在
+
+    # 批量提炼指令：多篇文章按 source_id 标注，结果以 source_id 对应
+    AI_BATCH_PROMPT = """
+                你是一个资深的数据分析专家。下面有 {count} 篇网页内容，每篇以 [source_id=编号] 开头。
+                请逐篇提取核心信息，输出 JSON 对象，格式为 {{"results": [...]}}，
+                数组中每篇文章一项，包含以下字段：
+                - source_id: 文章编号（与输入一致）
+                - title: 文章标题
+                - summary: 50字以内的核心摘要
+                - key_points: 列表，包含3-5个关键点
+                - category: 信息分类（如：政策、新闻、招标、公告等）
+                - sentiment: 情感倾向（正面/中性/负面）
+
+                {articles}
+                """
+
+    # 长文分块提炼：先逐块提取要点，再汇总为整篇结果
+    AI_CHUNK_PROMPT = """
+                你是一个资深的数据分析专家。以下是一篇长文章的第 {index}/{count} 部分。
+                请提取这一部分的核心信息，输出 JSON 格式，包含以下字段：
+                - title: 若这一部分包含文章标题则给出，否则为空字符串
+                - summary: 100字以内的本部分摘要
+                - key_points: 列表，包含1-5个关键点
+
+                网页内容：
+                {chunk}
+                """
+
+    AI_REDUCE_PROMPT = """
+                你是一个资深的数据分析专家。以下是一篇长文章按顺序分块提取的要点（JSON 列表）。
+                请汇总为整篇文章的分析结果，输出 JSON 格式，包含以下字段：
+                - title: 文章标题
+                - summary: 50字以内的核心摘要
+                - key_points: 列表，包含3-5个关键点
+                - category: 信息分类（如：政策、新闻、招标、公告等）
+                - sentiment: 情感倾向（正面/中性/负面）
+
+                分块要点：
+                {partials}
+                """
+
+    def fetch_stage(self, item):
+        """深度采集阶段 1: 网页爬取 (CrawlAI 核心思路：极速获取干净 Markdown/Text)
+
+        按站点调度：站点并发已满或处于熔断冷却期时抛出 Requeue，条目稍后重新排队，
+        不让一个慢站点占满所有抓取线程。
+        """
+        host = (urlsplit(item['url']).hostname or item['url']).lower()
+        self.domains.acquire(host)
+        start = time.perf_counter()
+        outcome = 'error'
+        try:
+            item = self._fetch(item)
+            outcome = 'ok'
+            return item
+        except (requests.Timeout, requests.ConnectionError) as e:
+            # 客户端不重试，由站点调度器退避后重排（计入重排次数，超过后记为失败）
+            outcome = 'timeout'
+            raise DomainTimeout(self.domains.retry_delay(host, item.get('requeues', 0)), str(e)) from e
+        except Requeue:
+            outcome = 'blocked'
+            raise
+        finally:
+            self.domains.release(host, (time.perf_counter() - start) * 1000, outcome)
+
+    def _fetch(self, item):
+        """已采集过的 URL 带上 If-None-Match / If-Modified-Since 发起条件请求，
+        返回 304 或响应体哈希与上次一致时标记为未变化，跳过后续解析与提炼。
+        """
+        # 由于环境限制，我们使用 requests 模拟 CrawlAI 的获取过程
+        headers = {}
+        if item.get('etag'):
+            headers['If-None-Match'] = item['etag']
+        if item.get('last_modified'):
+            headers['If-Modified-Since'] = item['last_modified']
+        http = get_http_client()
+        # 不在客户端内重试：超时或连接失败立即交给站点调度器计数、减并发或熔断，
+        # 条目由流水线稍后重排，避免一个慢站点在名额内耗上几倍超时
+        req_resp = http.get(item['url'], engine='deep', headers=headers, timeout=self.FETCH_TIMEOUT,
+                            stream=True, retries=0)
+        if req_resp.status_code == 304:
+            req_resp.close()
+            item['unchanged'] = True
+            item['done'] = True
+            return item
+        if req_resp.status_code in (403, 429):
+            # 被限流或拒绝：计入站点熔断，条目稍后重试
+            req_resp.close()
+            retry_after = req_resp.headers.get('Retry-After', '')
+            delay = int(retry_after) if retry_after.isdigit() else self.domains.retry_delay(urlsplit(item['url']).hostname)
+            raise DomainBlocked(delay, f'HTTP {req_resp.status_code}')
+
+        # 流式读取，超过上限即断开，不把超大页面整个读进内存
+        body, item['truncated'] = read_capped(req_resp, self.MAX_DOWNLOAD_BYTES)
+        http.stats.add_bytes(len(body))
+        item['etag'] = req_resp.headers.get('ETag')
+        item['last_modified'] = req_resp.headers.get('Last-Modified')
+        content_hash = hashlib.sha256(body).hexdigest()
+        if item.get('content_hash') == content_hash:
+            item['unchanged'] = True
+            item['done'] = True
+            return item
+        item['content_hash'] = content_hash
+
+        content_type = req_resp.headers.get('Content-Type')
+        if self.archive:
+            try:
+                self.archive.put(body, url=item['url'], source_id=item['source_id'],
+                                 content_type=content_type, content_hash=content_hash)
+            except Exception as e:
+                print(f"Archive failed for {item['url']}: {e}")
+        item['html'] = decode_html(body, content_type)
+        return item
+
+    def archive_fetch_stage(self, item):
+        """离线重处理：从归档读取最近一次抓取的原始网页，不访问网络"""
+        record = self.archive.latest(source_id=item['source_id']) or self.archive.latest(url=item['url'])
+        if not record:
+            # 从未归档过的页面跳过，保留已有结果与状态，不记为失败
+            item['not_archived'] = True
+            item['done'] = True
+            return item
+        item['content_hash'] = record['content_hash']
+        item['html'] = decode_html(record['body'], record['content_type'])
+        return item
+
+    def parse_stage(self, item):
+        """深度采集阶段 2: 提取正文（去掉导航、页脚等模板内容）"""
+        # 字符上限只防异常超大页面，token 预算由提炼阶段按模型配置控制
+        item['clean_text'] = extract_main_text(item.pop('html'), max_chars=self.MAX_TEXT_CHARS)
+        return item
+
+    def dedup_stage(self, item):
+        """近似去重：正文指纹与已提炼文章相近时直接沿用其提炼结果，不再调用大模型"""
+        fingerprint = simhash(item['clean_text'][:self.CONTENT_CHARS])
+        item['simhash'] = fingerprint
+        if fingerprint is None:
+            return item
+        conn = self._get_connection()
+        try:
+            match = self.simhash_index.find(conn, fingerprint, exclude_source_id=item['source_id'])
+            if not match:
+                return item
+            row = conn.execute('SELECT structured_data FROM deep_collected_data WHERE source_id = ?',
+                               (match[0],)).fetchone()
+        finally:
+            conn.close()
+        if row and row['structured_data']:
+            item['analysis'] = json.loads(row['structured_data'])
+            item['duplicate_of'] = match[0]
+            item['done'] = True
+        return item
+
+    def cache_stage(self, item, model):
+        """命中提炼缓存时直接复用结果，跳过大模型调用"""
+        item['cache_key'] = self.llm_cache.make_key(item['clean_text'], model, self.PROMPT_VERSION)
+        cached = self.llm_cache.get(item['cache_key'])
+        if cached:
+            item['analysis'], item['saved_tokens'] = cached
+            item['cache_hit'] = True
+            item['done'] = True
+        return item
+
+    def llm_stage(self, item, model):
+        """深度采集阶段 3: AI 智能解析与提炼
+
+        正文在模型 token 预算内时单次调用；超出时分块并发提炼后再汇总。
+        """
+        budget = TokenBudget.from_model(model)
+        if budget.fits(item['clean_text']):
+            content, usage = self._chat_json(model, self.AI_PROMPT.format(clean_text=item['clean_text']))
+            item['analysis'] = json.loads(content)
+            if usage:
+                item['usage'] = self._add_usage(item.get('usage'), usage)
+            return item
+        return self._map_reduce(item, model, budget)
+
+    def _map_reduce(self, item, model, budget):
+        chunks = budget.split(item['clean_text'])[:self.MAX_CHUNKS]
+        count = len(chunks)
+
+        def summarize(index, chunk):
+            content, usage = self._chat_json(
+                model, self.AI_CHUNK_PROMPT.format(index=index, count=count, chunk=chunk))
+            return json.loads(content), usage
+
+        futures = [self.chunk_executor.submit(summarize, idx + 1, chunk) for idx, chunk in enumerate(chunks)]
+        partials = []
+        for future in futures:
+            partial, usage = future.result()
+            partials.append(partial)
+            if usage:
+                item['usage'] = self._add_usage(item.get('usage'), usage)
+
+        content, usage = self._chat_json(
+            model, self.AI_REDUCE_PROMPT.format(partials=json.dumps(partials, ensure_ascii=False)))
+        item['analysis'] = json.loads(content)
+        item['chunks'] = count
+        if usage:
+            item['usage'] = self._add_usage(item.get('usage'), usage)
+        return item
+
+    def _chat_json(self, model, prompt):
+        """调用大模型并返回 (回复内容, token 用量元组或 None)"""
+        client = get_llm_clients(self.db_path).get_client(model)
+        ai_resp = client.chat.completions.create(
+            model=model['model_name'],
+            messages=[
+                {"role": "system", "content": "你是一个专业的数据处理助手，只输出 JSON。"},
+                {"role": "user", "content": prompt}
+            ],
+            response_format={"type": "json_object"} if "DeepSeek" in model['model_name'] or "gpt-4" in model['model_name'] else None
+        )
+        usage = None
+        if hasattr(ai_resp, 'usage') and ai_resp.usage:
+            usage = (ai_resp.usage.prompt_tokens, ai_resp.usage.completion_tokens, ai_resp.usage.total_tokens)
+        return ai_resp.choices[0].message.content, usage
+
+    @staticmethod
+    def _add_usage(a, b):
+        if not a:
+            return b
+        return tuple(x + y for x, y in zip(a, b))
+
+    @staticmethod
+    def _split_usage(usage, weights):
+        """按各篇正文的估算 token 数把一次批量调用的用量分摊到各篇，保证总和不变"""
+        total_weight = sum(weights) or len(weights)
+        shares = [[] for _ in weights]
+        for value in usage:
+            allotted = 0
+            for idx, w in enumerate(weights):
+                if idx == len(weights) - 1:
+                    part = value - allotted
+                else:
+                    part = value * (w or 1) // total_weight
+                allotted += part
+                shares[idx].append(part)
+        return [tuple(share) for share in shares]
+
+    @staticmethod
+    def _valid_analysis(result):
+        return (isinstance(result, dict) and isinstance(result.get('summary'), str)
+                and isinstance(result.get('key_points', []), list))
+
+    def llm_batch_stage(self, items, model):
+        """批量提炼：多篇短文章合并为一次调用，结果按 source_id 校验后拆回各篇
+
+        超长文章、只凑到一篇、或批量结果缺失/格式不对的文章，回退为单篇调用。
+        """
+        short = [item for item in items if item['est_tokens'] <= self.BATCH_ITEM_TOKENS]
+        # 超长文章走单篇路径（必要时分块提炼）
+        single = [item for item in items if item['est_tokens'] > self.BATCH_ITEM_TOKENS]
+        if len(short) < 2:
+            single.extend(short)
+            short = []
+
+        if short:
+            articles = '\n\n'.join(f"[source_id={item['source_id']}]\n{item['clean_text']}" for item in short)
+            try:
+                content, usage = self._chat_json(model, self.AI_BATCH_PROMPT.format(count=len(short), articles=articles))
+                results = json.loads(content)
+                if isinstance(results, dict):
+                    results = results.get('results')
+                by_id = {}
+                for result in results if isinstance(results, list) else []:
+                    if self._valid_analysis(result):
+                        try:
+                            by_id[int(result.pop('source_id'))] = result
+                        except (KeyError, TypeError, ValueError):
+                            continue
+            except Exception as e:
+                print(f"Batch extraction failed, falling back to single calls: {e}")
+                usage, by_id = None, {}
+
+            # 批量调用已产生的用量按正文长度分摊到批内每篇（含需要回退的文章）
+            if usage:
+                for item, share in zip(short, self._split_usage(usage, [item['est_tokens'] for item in short])):
+                    item['usage'] = share
+            for item in short:
+                if item['source_id'] in by_id:
+                    item['analysis'] = by_id[item['source_id']]
+                    item['batched'] = True
+                else:
+                    single.append(item)
+
+        for item in single:
+            try:
+                self.llm_stage(item, model)
+            except Exception as e:
+                item['error'] = e
+                item['failed_stage'] = 'llm'
+        return items
+
+
+    def build_pipeline(self, model, batch=False, offline=False):
+        if batch:
+            budget = TokenBudget.from_model(model)
+            llm = Stage('llm', lambda items: self.llm_batch_stage(items, model), self.LLM_WORKERS,
+                        batch_size=self.BATCH_MAX_ITEMS, weight=lambda item: self._estimate_item(item, budget),
+                        max_weight=min(self.BATCH_TOKEN_BUDGET, budget.max_input_tokens), linger=self.BATCH_LINGER)
+        else:
+            llm = Stage('llm', lambda item: self.llm_stage(item, model), self.LLM_WORKERS)
+        return StagedPipeline([
+            Stage('fetch', self.archive_fetch_stage if offline else self.fetch_stage, self.FETCH_WORKERS),
+            Stage('parse', self.parse_stage, self.PARSE_WORKERS),
+            Stage('dedup', self.dedup_stage, self.PARSE_WORKERS),
+            Stage('cache', lambda item: self.cache_stage(item, model), self.PARSE_WORKERS),
+            llm
+        ], queue_size=self.QUEUE_SIZE)
+
+    @staticmethod
+    def _estimate_item(item, budget):
+        if 'est_tokens' not in item:
+            item['est_tokens'] = budget.estimate(item['clean_text'])
+        return item['est_tokens']
+
+    def _write_result(self, conn, item, model):
+        """写入单条结果（由唯一的写入方调用，提交由调用方批量完成）"""
+        sid = item['source_id']
+        if item.get('not_archived'):
+            conn.execute('UPDATE collected_data SET deep_status = ? WHERE id = ?', (item['deep_status'], sid))
+            return True
+
+        if item.get('error'):
+            print(f"Deep crawl failed for {item['url']}: {item['error']}")
+            conn.execute('UPDATE collected_data SET deep_status = 3 WHERE id = ?', (sid,))
+            return False
+
+        if item.get('unchanged'):
+            # 页面未变化：保留已有提炼结果，只刷新校验字段
+            conn.execute('''
+                UPDATE deep_collected_data
+                SET etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified)
+                WHERE source_id = ?
+            ''', (item.get('etag'), item.get('last_modified'), sid))
+            conn.execute('UPDATE collected_data SET deep_status = 2 WHERE id = ?', (sid,))
+            return True
+
+        analysis = item['analysis']
+        fingerprint = item.get('simhash')
+        # 保存到深度采集表
+        conn.execute('''
+            INSERT INTO deep_collected_data (source_id, url, title, content, summary, structured_data,
+                                             etag, last_modified, content_hash, simhash, duplicate_of, schema_version,
+                                             extract_model_id)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(source_id) DO UPDATE SET
+            title=excluded.title,
+            content=excluded.content,
+            summary=excluded.summary,
+            structured_data=excluded.structured_data,
+            etag=excluded.etag,
+            last_modified=excluded.last_modified,
+            content_hash=excluded.content_hash,
+            simhash=excluded.simhash,
+            duplicate_of=excluded.duplicate_of,
+            schema_version=excluded.schema_version,
+            extract_model_id=excluded.extract_model_id,
+            collect_time=CURRENT_TIMESTAMP
+        ''', (
+            sid, item['url'],
+            analysis.get('title', item['title']),
+            item['clean_text'][:self.CONTENT_CHARS],  # 保持内容精简
+            analysis.get('summary', ''),
+            json.dumps(analysis, ensure_ascii=False),
+            item.get('etag'), item.get('last_modified'), item.get('content_hash'),
+            to_signed(fingerprint) if fingerprint is not None else 0,
+            item.get('duplicate_of'),
+            self.PROMPT_VERSION,
+            model['id']
+        ))
+
+        # 只有首发文章进入指纹索引，重复文章通过 duplicate_of 指向首发
+        self.simhash_index.remove(conn, [sid])
+        if fingerprint is not None and not item.get('duplicate_of'):
+            self.simhash_index.add(conn, sid, fingerprint)
+
+        # 记录 Token 消耗：近似重复不产生调用；缓存命中记为零消耗，否则写入实际用量并缓存结果
+        if item.get('cache_hit'):
+            self.llm_cache.record_hit(conn, item['cache_key'], model['id'], item.get('saved_tokens', 0))
+        elif not item.get('duplicate_of'):
+            if item.get('usage'):
                 conn.execute('''
-                    INSERT INTO deep_collected_data (source_id, url, title, content, summary, structured_data)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                    ON CONFLICT(source_id) DO UPDATE SET
-                    title=excluded.title,
-                    content=excluded.content,
-                    summary=excluded.summary,
-                    structured_data=excluded.structured_data,
-                    collect_time=CURRENT_TIMESTAMP
-                ''', (
-                    sid, url, 
-                    analysis.get('title', source['title']), 
-                    clean_text[:2000],  # 保持内容精简
-                    analysis.get('summary', ''),
-                    json.dumps(analysis, ensure_ascii=False)
-                ))
-                
-                # 记录 Token 消耗
-                if hasattr(ai_resp, 'usage') and ai_resp.usage:
-                    # 我们需要一个 AIService 的实例来记录，这里简单直接写
-                    conn.execute('''
-                        INSERT INTO token_usage (model_id, prompt_tokens, completion_tokens, total_tokens, task_type)
-                        VALUES (?, ?, ?, ?, ?)
-                    ''', (model['id'], ai_resp.usage.prompt_tokens, ai_resp.usage.completion_tokens, ai_resp.usage.total_tokens, "深度采集分析"))
-
-                # 更新状态为“成功”
-                conn.execute('UPDATE collected_data SET deep_status = 2 WHERE id = ?', (sid,))
+                    INSERT INTO token_usage (model_id, prompt_tokens, completion_tokens, total_tokens, task_type)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', (model['id'], *item['usage'], "深度采集分析(批量)" if item.get('batched') else "深度采集分析"))
+            self.llm_cache.put(conn, item['cache_key'], model['id'], analysis, item.get('usage'))
+
+        # 更新状态为“成功”
+        conn.execute('UPDATE collected_data SET deep_status = 2 WHERE id = ?', (sid,))
+        return True
+
+    @staticmethod
+    def result_of(item, ok):
+        """单条结果的类型：failed / not_archived / unchanged / duplicate / cached / success"""
+        if item.get('not_archived'):
+            return 'not_archived'
+        if not ok:
+            return 'failed'
+        if item.get('unchanged'):
+            return 'unchanged'
+        if item.get('duplicate_of'):
+            return 'duplicate'
+        return 'cached' if item.get('cache_hit') else 'success'
+
+    def iter_deep_crawl(self, source_ids, model, batch=False, checkpoint=None, offline=False):
+        """执行深度采集，逐条产出 {'source_id', 'title', 'result'}
+
+        抓取、清洗、大模型提炼三个阶段各自并发，阶段之间通过有界队列衔接；
+        当前线程作为唯一写入方，按批提交结果。checkpoint(conn, source_id, result)
+        在写入结果的同一事务内调用，供任务记录断点，保证断点与结果同时落库。
+        batch=True 时启用多篇短文章合并提炼；offline=True 时从原始网页归档读取，不访问网络，
+        没有归档的条目产出 not_archived 并恢复原有状态。
+        """
+        conn = self._get_connection()
+        try:
+            # 获取源数据，连同上次深度采集的校验字段（用于条件请求）
+            items = []
+            missing = []
+            for sid in source_ids:
+                source = conn.execute('''
+                    SELECT c.id, c.url, c.title, c.deep_status, d.etag, d.last_modified, d.content_hash
+                    FROM collected_data c LEFT JOIN deep_collected_data d ON d.source_id = c.id
+                    WHERE c.id = ?
+                ''', (sid,)).fetchone()
+                if source:
+                    items.append({'source_id': source['id'], 'url': source['url'], 'title': source['title'],
+                                  'etag': source['etag'], 'last_modified': source['last_modified'],
+                                  'content_hash': source['content_hash'], 'deep_status': source['deep_status']})
+                else:
+                    missing.append(sid)
+
+            # 源数据已被删除的条目直接记为失败
+            for sid in missing:
+                if checkpoint:
+                    checkpoint(conn, sid, 'failed')
                 conn.commit()
-                success_count += 1
-                
-            except Exception as e:
-                print(f"Deep crawl failed for {url}: {e}")
-                conn.execute('UPDATE collected_data SET deep_status = 3 WHERE id = ?', (sid,))
+                yield {'source_id': sid, 'title': None, 'result': 'failed'}
+
+            # 更新状态为“正在采集”
+            if items:
+                placeholders = ','.join(['?'] * len(items))
+                conn.execute(f'UPDATE collected_data SET deep_status = 1 WHERE id IN ({placeholders})',
+                             [item['source_id'] for item in items])
                 conn.commit()
-                fail_count += 1
 
-        conn.close()
-        yield f"data: {json.dumps({'status': 'completed', 'success': success_count, 'fail': fail_count, 'total': total})}\n\n"
+            pending_writes = 0
+            for item in self.build_pipeline(model, batch=batch, offline=offline).run(items, idle_timeout=0.5):
+                if item is None:
+                    # 空闲时把已写入的结果及时提交
+                    if pending_writes:
+                        conn.commit()
+                        pending_writes = 0
+                    continue
+
+                result = self.result_of(item, self._write_result(conn, item, model))
+                if checkpoint:
+                    checkpoint(conn, item['source_id'], result)
+                pending_writes += 1
+                if pending_writes >= self.WRITE_BATCH:
+                    conn.commit()
+                    pending_writes = 0
+                yield {'source_id': item['source_id'], 'title': item['title'], 'result': result}
+
+            conn.commit()
+            invalidate_counts('deep_collected_data')
+            self.llm_cache.evict(conn)
+        finally:
+            conn.close()
+
+    # 批量重新提炼：每批行数与预估的单次回复 token 数
+    REEXTRACT_BATCH = 200
+    EST_COMPLETION_TOKENS = 300
+
+    def _reextract_target(self, target_version):
+        """请求的目标版本：默认当前 PROMPT_VERSION，不能高于它（还没有那个版本的提示词）"""
+        if target_version is None:
+            return self.PROMPT_VERSION
+        if target_version > self.PROMPT_VERSION:
+            raise ValueError(f'目标版本 {target_version} 高于当前提示词版本 {self.PROMPT_VERSION}')
+        return target_version
+
+    def iter_reextract_batches(self, target_version, model_id, after_id=0):
+        """按主键游标分批读取需要重新提炼的首发结果：版本低于 target_version，或不是由 model_id 提炼的
+        （近似重复行随首发一起更新）"""
+        while True:
+            conn = self._get_connection()
+            try:
+                rows = conn.execute('''
+                    SELECT id, source_id, url, title, content FROM deep_collected_data
+                    WHERE id > ? AND duplicate_of IS NULL
+                      AND (IFNULL(schema_version, 0) < ? OR extract_model_id IS NOT ?)
+                    ORDER BY id LIMIT ?
+                ''', (after_id, target_version, model_id, self.REEXTRACT_BATCH)).fetchall()
+            finally:
+                conn.close()
+            if not rows:
+                return
+            after_id = rows[-1]['id']
+            yield [dict(row) for row in rows]
+
+    def estimate_reextract(self, model, target_version=None):
+        """试运行：不调用模型，按本地 token 估算统计需要重新提炼的行数与预计消耗"""
+        target_version = self._reextract_target(target_version)
+        budget = TokenBudget.from_model(model)
+        overhead = budget.estimate(self.AI_PROMPT.format(clean_text=''))
+        result = {'rows': 0, 'cached': 0, 'chunked': 0, 'prompt_tokens': 0, 'completion_tokens': 0}
+        for rows in self.iter_reextract_batches(target_version, model['id']):
+            for row in rows:
+                text = row['content'] or ''
+                result['rows'] += 1
+                if self.llm_cache.get(self.llm_cache.make_key(text, model, self.PROMPT_VERSION)):
+                    result['cached'] += 1
+                    continue
+                if budget.fits(text):
+                    result['prompt_tokens'] += overhead + budget.estimate(text)
+                    result['completion_tokens'] += self.EST_COMPLETION_TOKENS
+                else:
+                    # 分块：每块一次调用，另加一次汇总调用
+                    chunks = min(len(budget.split(text)), self.MAX_CHUNKS)
+                    result['chunked'] += 1
+                    result['prompt_tokens'] += budget.estimate(text) + overhead * (chunks + 1) + \
+                        self.EST_COMPLETION_TOKENS * chunks
+                    result['completion_tokens'] += self.EST_COMPLETION_TOKENS * (chunks + 1)
+        result['total_tokens'] = result['prompt_tokens'] + result['completion_tokens']
+        result['target_version'] = target_version
+        return result
+
+    def build_reextract_pipeline(self, model, batch=False, workers=None):
+        """重新提炼只需缓存与大模型两个阶段，正文取自已入库内容"""
+        workers = workers or self.LLM_WORKERS
+        if batch:
+            budget = TokenBudget.from_model(model)
+            llm = Stage('llm', lambda items: self.llm_batch_stage(items, model), workers,
+                        batch_size=self.BATCH_MAX_ITEMS, weight=lambda item: self._estimate_item(item, budget),
+                        max_weight=min(self.BATCH_TOKEN_BUDGET, budget.max_input_tokens), linger=self.BATCH_LINGER)
+        else:
+            llm = Stage('llm', lambda item: self.llm_stage(item, model), workers)
+        return StagedPipeline([
+            Stage('cache', lambda item: self.cache_stage(item, model), self.PARSE_WORKERS),
+            llm
+        ], queue_size=self.QUEUE_SIZE)
+
+    def _write_reextract(self, conn, item, model):
+        """写入重新提炼结果，并同步到指向该行的近似重复行"""
+        if item.get('error'):
+            print(f"Re-extraction failed for {item['url']}: {item['error']}")
+            return False
+        analysis = item['analysis']
+        structured = json.dumps(analysis, ensure_ascii=False)
+        conn.execute('''
+            UPDATE deep_collected_data
+            SET title = ?, summary = ?, structured_data = ?, schema_version = ?, extract_model_id = ?
+            WHERE id = ?
+        ''', (analysis.get('title', item['title']), analysis.get('summary', ''), structured,
+              self.PROMPT_VERSION, model['id'], item['row_id']))
+        conn.execute('''
+            UPDATE deep_collected_data SET summary = ?, structured_data = ?, schema_version = ?, extract_model_id = ?
+            WHERE duplicate_of = ?
+        ''', (analysis.get('summary', ''), structured, self.PROMPT_VERSION, model['id'], item['source_id']))
+
+        if item.get('cache_hit'):
+            self.llm_cache.record_hit(conn, item['cache_key'], model['id'], item.get('saved_tokens', 0))
+        else:
+            if item.get('usage'):
+                conn.execute('''
+                    INSERT INTO token_usage (model_id, prompt_tokens, completion_tokens, total_tokens, task_type)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', (model['id'], *item['usage'], "深度采集重新提炼"))
+            self.llm_cache.put(conn, item['cache_key'], model['id'], analysis, item.get('usage'))
+        return True
+
+    def iter_reextract(self, model, target_version=None, after_id=0, batch=False, workers=None, checkpoint=None):
+        """批量重新提炼版本低于 target_version（默认当前 PROMPT_VERSION）或由其他模型提炼的行，
+        逐条产出 {'id', 'title', 'result', 'usage'}
+
+        每条结果写入后立即提交（耗时在大模型调用上，逐条提交的代价可以忽略），不在等待大模型期间占用写锁；
+        提交前在同一事务内调用 checkpoint(conn, last_id, results) 记录断点：批内未完成时
+        last_id 为本批起点（已更新的行记录了新的版本号与模型，续跑时自然跳过），整批完成后为本批最后一行。
+        没有正文的行记为失败，同时记上版本号与模型，之后不再重复挑出。
+        target_version 高于当前 PROMPT_VERSION 时抛出 ValueError。
+        """
+        target_version = self._reextract_target(target_version)
+        for rows in self.iter_reextract_batches(target_version, model['id'], after_id):
+            items = [{'row_id': row['id'], 'source_id': row['source_id'], 'url': row['url'],
+                      'title': row['title'], 'clean_text': row['content']} for row in rows if row['content']]
+            empty = [row for row in rows if not row['content']]
+            conn = self._get_connection()
+            try:
+                # 没有正文的行无法重新提炼
+                if empty:
+                    conn.executemany('''
+                        UPDATE deep_collected_data SET schema_version = ?, extract_model_id = ? WHERE id = ?
+                    ''', [(self.PROMPT_VERSION, model['id'], row['id']) for row in empty])
+                    if checkpoint:
+                        checkpoint(conn, after_id, ['failed'] * len(empty))
+                    conn.commit()
+                for row in empty:
+                    yield {'id': row['id'], 'title': row['title'], 'result': 'failed', 'usage': None}
+
+                for item in self.build_reextract_pipeline(model, batch=batch, workers=workers).run(items):
+                    ok = self._write_reextract(conn, item, model)
+                    result = 'failed' if not ok else ('cached' if item.get('cache_hit') else 'success')
+                    if checkpoint:
+                        checkpoint(conn, after_id, [result])
+                    conn.commit()
+                    yield {'id': item['row_id'], 'title': item['title'], 'result': result,
+                           'usage': item.get('usage')}
+                after_id = rows[-1]['id']
+                if checkpoint:
+                    checkpoint(conn, after_id, [])
+                conn.commit()
+            finally:
+                conn.close()
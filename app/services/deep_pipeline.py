@@ -0,0 +1,192 @@
+import time
+import heapq
+import queue
+import itertools
+import threading
+
+
+class Requeue(Exception):
+    """阶段函数抛出此异常表示条目暂时无法处理，delay 秒后重新排回本阶段
+
+    counted 为 True 的重排计入 Stage.max_requeues，超过次数后记为失败。
+    """
+    counted = True
+
+    def __init__(self, delay, reason=''):
+        super().__init__(reason)
+        self.delay = delay
+
+
+class _Deferred:
+    """延后重排的条目，按到期时间排序"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._heap = []
+        self._seq = itertools.count()
+
+    def push(self, item, delay):
+        with self._lock:
+            heapq.heappush(self._heap, (time.monotonic() + delay, next(self._seq), item))
+
+    def pop_ready(self):
+        with self._lock:
+            if self._heap and self._heap[0][0] <= time.monotonic():
+                return heapq.heappop(self._heap)[2]
+        return None
+
+    def wait_time(self, default):
+        """距下一个条目到期的秒数（不超过 default）"""
+        with self._lock:
+            if not self._heap:
+                return default
+            return min(default, max(0.01, self._heap[0][0] - time.monotonic()))
+
+
+class Stage:
+    """流水线阶段：func(item) 处理单个条目并返回该条目
+
+    条目设置 item['done'] = True 表示提前结束（如命中缓存），直接送往输出端；
+    func 抛出异常时异常记入 item['error']，同样直接送往输出端。
+
+    设置 batch_size 后为批量阶段：func(items) 接收条目列表并返回条目列表。
+    工作线程取到第一个条目后最多再等待 linger 秒凑批，批内条目数不超过
+    batch_size，weight(item) 之和不超过 max_weight（单个超重条目独立成批）。
+
+    单条阶段的 func 抛出 Requeue 时条目延后重新排回本阶段，计数的重排最多 max_requeues 次。
+    """
+    def __init__(self, name, func, workers=1, batch_size=None, weight=None, max_weight=None, linger=0.2,
+                 max_requeues=3):
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+        self.batch_size = batch_size
+        self.weight = weight
+        self.max_weight = max_weight
+        self.linger = linger
+        self.max_requeues = max_requeues
+
+
+class StagedPipeline:
+    """多阶段并发流水线
+
+    每个阶段有独立的线程数，阶段之间用有界队列连接形成背压：
+    下游处理不过来时上游自动阻塞，内存中同时在途的条目数有上限。
+    每个输入条目恰好产出一个结果，按完成顺序输出。
+    """
+    def __init__(self, stages, queue_size=16):
+        self.stages = stages
+        self.queue_size = queue_size
+
+    @staticmethod
+    def _put(stop, q, item):
+        # 消费方中途放弃时，不让工作线程永久阻塞在满队列上
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _collect_batch(self, stop, stage, in_q, first):
+        """凑一批条目，返回 (batch, 放不下留给下一批的条目或 None)"""
+        batch = [first]
+        weight = stage.weight(first) if stage.weight else 0
+        deadline = time.monotonic() + stage.linger
+        while len(batch) < stage.batch_size and not stop.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = in_q.get(timeout=remaining)
+            except queue.Empty:
+                break
+            item_weight = stage.weight(item) if stage.weight else 0
+            if stage.max_weight and weight + item_weight > stage.max_weight:
+                return batch, item
+            batch.append(item)
+            weight += item_weight
+        return batch, None
+
+    def _route(self, stop, item, next_q, out_q):
+        if item.get('error') or item.get('done') or next_q is None:
+            self._put(stop, out_q, item)
+        else:
+            self._put(stop, next_q, item)
+
+    def _worker(self, stop, stage, in_q, next_q, out_q, deferred):
+        carry = None
+        while not stop.is_set():
+            if carry is not None:
+                item, carry = carry, None
+            else:
+                item = deferred.pop_ready()
+                if item is None:
+                    try:
+                        item = in_q.get(timeout=deferred.wait_time(0.5))
+                    except queue.Empty:
+                        continue
+            if stage.batch_size:
+                batch, carry = self._collect_batch(stop, stage, in_q, item)
+                try:
+                    results = stage.func(batch)
+                except Exception as e:
+                    for failed in batch:
+                        failed['error'] = e
+                        failed['failed_stage'] = stage.name
+                    results = batch
+                for result in results:
+                    self._route(stop, result, next_q, out_q)
+                continue
+            try:
+                item = stage.func(item)
+            except Requeue as e:
+                if e.counted:
+                    item['requeues'] = item.get('requeues', 0) + 1
+                if item.get('requeues', 0) <= stage.max_requeues:
+                    deferred.push(item, e.delay)
+                    continue
+                item['error'] = e
+                item['failed_stage'] = stage.name
+            except Exception as e:
+                item['error'] = e
+                item['failed_stage'] = stage.name
+            self._route(stop, item, next_q, out_q)
+
+    def _feed(self, stop, items, first_q):
+        for item in items:
+            if not self._put(stop, first_q, item):
+                return
+
+    def run(self, items, idle_timeout=None):
+        """执行流水线，逐个产出已完成的条目
+
+        设置 idle_timeout 时，若超过该秒数没有条目完成则产出 None，
+        便于调用方在空闲时刷新批量写入。
+        """
+        items = list(items)
+        stop = threading.Event()
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+        out_q = queue.Queue()
+        for idx, stage in enumerate(self.stages):
+            next_q = queues[idx + 1] if idx + 1 < len(queues) else None
+            deferred = _Deferred()
+            for n in range(stage.workers):
+                t = threading.Thread(target=self._worker, args=(stop, stage, queues[idx], next_q, out_q, deferred),
+                                     name=f"pipeline-{stage.name}-{n}", daemon=True)
+                t.start()
+        threading.Thread(target=self._feed, args=(stop, items, queues[0]), daemon=True).start()
+
+        try:
+            finished = 0
+            while finished < len(items):
+                try:
+                    item = out_q.get(timeout=idle_timeout)
+                except queue.Empty:
+                    yield None
+                    continue
+                finished += 1
+                yield item
+        finally:
+            # 正常结束或调用方中途放弃，都通知所有工作线程退出
+            stop.set()
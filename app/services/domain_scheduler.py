@@ -0,0 +1,189 @@
+import time
+import threading
+
+from app.services.deep_pipeline import Requeue
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class DomainBusy(Requeue):
+    """该站点并发已满，稍后重试（不计入重排次数）"""
+    counted = False
+
+
+class CircuitOpen(Requeue):
+    """该站点处于熔断冷却期，冷却结束后重试"""
+
+
+class DomainBlocked(Requeue):
+    """站点返回 403 / 429，稍后重试"""
+
+
+class DomainTimeout(Requeue):
+    """请求超时或连接失败，退避后重试"""
+
+
+class _DomainState:
+    def __init__(self, limit):
+        self.limit = limit
+        self.in_flight = 0
+        self.state = CLOSED
+        self.open_until = 0.0
+        self.trips = 0
+        self.consecutive_failures = 0
+        self.successes = 0
+        self.ewma_ms = None
+        self.requests = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.blocked = 0
+        self.deferred = 0
+        self.total_ms = 0.0
+
+
+class DomainScheduler:
+    """按站点的自适应并发与熔断
+
+    - 并发上限按 AIMD 调整：连续 limit 次快速成功后上限 +1，响应慢或出错时减半；
+    - 连续 failure_threshold 次超时或 403/429 后熔断，cooldown 秒内该站点的请求直接跳过，
+      再次熔断时冷却时间翻倍（不超过 max_cooldown）；冷却结束后只放行一个试探请求，
+      成功则恢复，失败则重新熔断。
+    拿不到名额的条目抛出 DomainBusy / CircuitOpen，由流水线延后重新排队。
+    """
+    def __init__(self, initial_limit=2, min_limit=1, max_limit=8, slow_ms=5000,
+                 failure_threshold=3, cooldown=60, max_cooldown=600, busy_delay=0.2):
+        self.initial_limit = initial_limit
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.slow_ms = slow_ms
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.busy_delay = busy_delay
+        self._domains = {}
+        self._lock = threading.Lock()
+
+    def _state(self, host):
+        state = self._domains.get(host)
+        if state is None:
+            state = _DomainState(self.initial_limit)
+            self._domains[host] = state
+        return state
+
+    def acquire(self, host):
+        """占用该站点的一个并发名额，拿不到时抛出 DomainBusy / CircuitOpen"""
+        now = time.monotonic()
+        with self._lock:
+            state = self._state(host)
+            if state.state == OPEN:
+                if now < state.open_until:
+                    state.deferred += 1
+                    raise CircuitOpen(state.open_until - now, f'{host} 熔断中')
+                state.state = HALF_OPEN
+            # 半开状态只放行一个试探请求
+            limit = 1 if state.state == HALF_OPEN else state.limit
+            if state.in_flight >= limit:
+                state.deferred += 1
+                raise DomainBusy(self.busy_delay, f'{host} 并发已满')
+            state.in_flight += 1
+
+    def release(self, host, elapsed_ms, outcome='ok'):
+        """归还名额并记录结果：ok / error / timeout / blocked（403、429）"""
+        with self._lock:
+            state = self._state(host)
+            state.in_flight = max(0, state.in_flight - 1)
+            state.requests += 1
+            state.total_ms += elapsed_ms
+            state.ewma_ms = elapsed_ms if state.ewma_ms is None else state.ewma_ms * 0.8 + elapsed_ms * 0.2
+
+            if outcome in ('timeout', 'blocked'):
+                if outcome == 'timeout':
+                    state.timeouts += 1
+                else:
+                    state.blocked += 1
+                state.consecutive_failures += 1
+                state.successes = 0
+                state.limit = max(self.min_limit, state.limit // 2)
+                if state.state == HALF_OPEN or state.consecutive_failures >= self.failure_threshold:
+                    self._trip(state)
+                return
+
+            if outcome == 'error':
+                state.errors += 1
+                state.successes = 0
+                state.limit = max(self.min_limit, state.limit // 2)
+                return
+
+            state.consecutive_failures = 0
+            if state.state == HALF_OPEN:
+                state.state = CLOSED
+                state.trips = 0
+            if elapsed_ms > self.slow_ms:
+                state.successes = 0
+                state.limit = max(self.min_limit, state.limit // 2)
+                return
+            state.successes += 1
+            if state.successes >= state.limit:
+                state.successes = 0
+                state.limit = min(self.max_limit, state.limit + 1)
+
+    def _trip(self, state):
+        state.trips += 1
+        state.state = OPEN
+        state.open_until = time.monotonic() + min(self.max_cooldown, self.cooldown * 2 ** (state.trips - 1))
+        state.consecutive_failures = 0
+
+    def retry_delay(self, host, attempt=None):
+        """被拒绝的请求多久后重试：熔断中取剩余冷却时间；否则给出 attempt（已重排次数）时
+        按 2 秒起的指数退避，不给时取基础冷却时间，均不超过基础冷却时间"""
+        with self._lock:
+            state = self._state(host)
+            if state.state == OPEN:
+                return max(self.busy_delay, state.open_until - time.monotonic())
+        if attempt is not None:
+            return min(self.cooldown, 2 * 2 ** attempt)
+        return self.cooldown
+
+    def reset(self, host=None):
+        with self._lock:
+            if host is None:
+                self._domains.clear()
+            else:
+                self._domains.pop(host, None)
+
+    def stats(self):
+        """各站点统计，按累计耗时从高到低排序"""
+        now = time.monotonic()
+        with self._lock:
+            rows = [{
+                'host': host,
+                'state': state.state,
+                'limit': state.limit,
+                'in_flight': state.in_flight,
+                'requests': state.requests,
+                'errors': state.errors,
+                'timeouts': state.timeouts,
+                'blocked': state.blocked,
+                'deferred': state.deferred,
+                'total_time_s': round(state.total_ms / 1000, 2),
+                'avg_latency_ms': round(state.total_ms / state.requests, 2) if state.requests else 0,
+                'ewma_latency_ms': round(state.ewma_ms or 0, 2),
+                'cooldown_remaining_s': round(max(0.0, state.open_until - now), 1) if state.state == OPEN else 0
+            } for host, state in self._domains.items()]
+        rows.sort(key=lambda row: row['total_time_s'], reverse=True)
+        return rows
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_domain_scheduler():
+    """进程内共享的站点调度器，所有深度采集任务共用同一站点的并发名额与熔断状态"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = DomainScheduler()
+        return _scheduler
@@ -0,0 +1,248 @@
+"""全文检索（SQLite FTS5 + trigram 分词）
+
+collected_data（标题/描述/URL）与 deep_collected_data（标题/正文/摘要）各建一个
+外部内容 FTS5 索引，由触发器随原表增删改同步。trigram 按 3 字切分，中文无需分词，
+查询词整体作为短语匹配，与原先 LIKE '%关键词%' 的语义一致，但走索引并按 BM25 排序。
+不足 3 个字的查询词 trigram 无法命中，由调用方退回 LIKE。
+
+高频词（命中几十万行）的代价随命中数增长，因此：
+- 相关度排序只在最新的 RANK_WINDOW 条匹配内进行（按 rowid 倒序截取，再 ORDER BY rank）；
+- 按时间排序的列表先数出至多 probe 阈值条匹配：命中少时用 rowid IN (索引结果) 筛选，
+  命中多时改为沿时间索引扫原表、逐行用 rowid 探测索引，取满一页即停；
+- 总数直接在索引上计数，由调用方缓存或按样本估算。
+
+维护命令：
+    python -m app.services.fulltext rebuild [--table collected_data]
+    python -m app.services.fulltext optimize
+    python -m app.services.fulltext search 关键词 [--table deep_collected_data]
+"""
+import os
+import sys
+import html
+import time
+import argparse
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from app.db import get_connection
+from app.services.pagination import table_count
+
+# trigram 分词的最短可检索长度
+MIN_QUERY_CHARS = 3
+# 相关度排序的候选窗口：最新的若干条匹配
+RANK_WINDOW = 5000
+# 命中数达到全表的该比例（且不少于 PROBE_MIN_HITS）时，按时间排序的列表改为逐行探测
+PROBE_HIT_RATIO = 0.01
+PROBE_MIN_HITS = 1000
+# 高亮标记先用控制字符占位，转义 HTML 后再替换为 <mark>
+_MARK_OPEN, _MARK_CLOSE = '\x02', '\x03'
+
+
+class FullTextIndex:
+    """单张表的全文索引：建表与触发器、重建、匹配表达式与排序/摘要 SQL 片段"""
+    def __init__(self, table, columns, weights, snippet_column=-1, snippet_tokens=24):
+        self.table = table
+        self.fts_table = f'{table}_fts'
+        self.columns = columns
+        self.weights = weights
+        self.snippet_column = snippet_column
+        self.snippet_tokens = snippet_tokens
+
+    def create(self, conn):
+        """创建 FTS5 表与同步触发器（已存在则跳过）"""
+        cols = ', '.join(self.columns)
+        new_values = ', '.join(f'new.{c}' for c in self.columns)
+        old_values = ', '.join(f'old.{c}' for c in self.columns)
+        conn.execute(f'''
+            CREATE VIRTUAL TABLE IF NOT EXISTS {self.fts_table} USING fts5(
+                {cols}, content='{self.table}', content_rowid='id', tokenize='trigram'
+            )
+        ''')
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {self.fts_table}_ai AFTER INSERT ON {self.table} BEGIN
+                INSERT INTO {self.fts_table} (rowid, {cols}) VALUES (new.id, {new_values});
+            END
+        ''')
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {self.fts_table}_ad AFTER DELETE ON {self.table} BEGIN
+                INSERT INTO {self.fts_table} ({self.fts_table}, rowid, {cols}) VALUES ('delete', old.id, {old_values});
+            END
+        ''')
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {self.fts_table}_au AFTER UPDATE OF {cols} ON {self.table} BEGIN
+                INSERT INTO {self.fts_table} ({self.fts_table}, rowid, {cols}) VALUES ('delete', old.id, {old_values});
+                INSERT INTO {self.fts_table} (rowid, {cols}) VALUES (new.id, {new_values});
+            END
+        ''')
+
+    def rebuild(self, conn):
+        """按原表内容重建索引（索引损坏或批量导入时关闭过触发器后使用）"""
+        conn.execute(f"INSERT INTO {self.fts_table} ({self.fts_table}) VALUES ('rebuild')")
+
+    def optimize(self, conn):
+        """合并索引分段，减小体积、加快查询"""
+        conn.execute(f"INSERT INTO {self.fts_table} ({self.fts_table}) VALUES ('optimize')")
+
+    def exists(self, conn):
+        return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                            (self.fts_table,)).fetchone() is not None
+
+    @staticmethod
+    def usable(keyword):
+        return keyword is not None and len(keyword.strip()) >= MIN_QUERY_CHARS
+
+    @staticmethod
+    def match(keyword):
+        """查询词整体作为一个短语（双引号转义），避免用户输入被解析为 FTS5 语法"""
+        return '"' + keyword.strip().replace('"', '""') + '"'
+
+    def rank_function(self):
+        """按列加权的 BM25，作为 rank MATCH 的参数"""
+        return f"bm25({', '.join(str(float(w)) for w in self.weights)})"
+
+    def snippet_sql(self):
+        return (f"snippet({self.fts_table}, {self.snippet_column}, char(2), char(3), '…', "
+                f"{self.snippet_tokens})")
+
+    def filter_sql(self, id_column):
+        """作为普通查询的筛选条件使用，配合 match(keyword) 作为参数；先取出全部匹配，适合命中少的词"""
+        return f'{id_column} IN (SELECT rowid FROM {self.fts_table} WHERE {self.fts_table} MATCH ?)'
+
+    def probe_sql(self, id_column):
+        """逐行探测的筛选条件，配合 match(keyword) 作为参数；代价与扫过的原表行数成正比，适合命中多的词"""
+        return f'EXISTS (SELECT 1 FROM {self.fts_table} WHERE {self.fts_table} MATCH ? AND rowid = {id_column})'
+
+    def time_filter(self, conn, keyword, id_column):
+        """按时间排序的列表使用的筛选条件，返回 (where_sql, params, matched)
+
+        命中少于阈值时用 filter_sql，matched 为精确命中数；否则用 probe_sql，matched 为 None。
+        """
+        threshold = max(PROBE_MIN_HITS, int(table_count(conn, self.table) * PROBE_HIT_RATIO))
+        hits = self.count(conn, keyword, limit=threshold)
+        if hits < threshold:
+            return self.filter_sql(id_column), [self.match(keyword)], hits
+        return self.probe_sql(id_column), [self.match(keyword)], None
+
+    def ranked_ids(self, conn, keyword, limit, offset=0, matched=None):
+        """按相关度取一页 rowid
+
+        只在最新的 RANK_WINDOW 条匹配（翻页超出时扩大到覆盖所取页）内按 rank 排序，
+        高频词不必为全部命中计算 BM25；已知命中数 matched 不超过窗口时直接全部排序。
+        """
+        match = self.match(keyword)
+        window = max(RANK_WINDOW, offset + limit)
+        if matched is not None and matched <= window:
+            if not matched:
+                return []
+            bound = 0
+        else:
+            bound = conn.execute(f'''
+                SELECT MIN(rowid) FROM (
+                    SELECT rowid FROM {self.fts_table} WHERE {self.fts_table} MATCH ? ORDER BY rowid DESC LIMIT ?
+                )
+            ''', (match, window)).fetchone()[0]
+        if bound is None:
+            return []
+        rows = conn.execute(f'''
+            SELECT rowid FROM {self.fts_table}
+            WHERE {self.fts_table} MATCH ? AND rank MATCH ? AND rowid >= ?
+            ORDER BY rank LIMIT ? OFFSET ?
+        ''', (match, self.rank_function(), bound, limit, offset)).fetchall()
+        return [row[0] for row in rows]
+
+    def snippets(self, conn, keyword, rowids):
+        """取指定行的高亮摘要，返回 {rowid: snippet}"""
+        if not rowids:
+            return {}
+        placeholders = ','.join(['?'] * len(rowids))
+        rows = conn.execute(f'''
+            SELECT rowid, {self.snippet_sql()} FROM {self.fts_table}
+            WHERE {self.fts_table} MATCH ? AND rowid IN ({placeholders})
+        ''', [self.match(keyword)] + list(rowids)).fetchall()
+        return {row[0]: highlight(row[1]) for row in rows}
+
+    def count(self, conn, keyword, limit=None):
+        """索引上的匹配数；给出 limit 时数到 limit 条即停"""
+        if limit is None:
+            return conn.execute(f'SELECT COUNT(*) FROM {self.fts_table} WHERE {self.fts_table} MATCH ?',
+                                (self.match(keyword),)).fetchone()[0]
+        return conn.execute(f'''
+            SELECT COUNT(*) FROM (SELECT rowid FROM {self.fts_table} WHERE {self.fts_table} MATCH ? LIMIT ?)
+        ''', (self.match(keyword), limit)).fetchone()[0]
+
+
+def highlight(snippet):
+    """把 snippet() 的占位标记转为 <mark>，其余内容做 HTML 转义"""
+    if not snippet:
+        return snippet
+    return html.escape(snippet).replace(_MARK_OPEN, '<mark>').replace(_MARK_CLOSE, '</mark>')
+
+
+COLLECTED_INDEX = FullTextIndex('collected_data', ('title', 'description', 'url'), (10, 3, 1))
+DEEP_INDEX = FullTextIndex('deep_collected_data', ('title', 'content', 'summary'), (10, 1, 5))
+INDEXES = {index.table: index for index in (COLLECTED_INDEX, DEEP_INDEX)}
+
+
+def fts5_available(conn):
+    """当前 SQLite 是否支持 FTS5 trigram 分词（3.34 及以上）"""
+    try:
+        conn.execute("CREATE VIRTUAL TABLE temp._fts5_probe USING fts5(x, tokenize='trigram')")
+        conn.execute('DROP TABLE temp._fts5_probe')
+        return True
+    except Exception:
+        return False
+
+
+def main(argv=None):
+    from app.migrations import DEFAULT_DB_PATH, migrate
+
+    parser = argparse.ArgumentParser(description='全文索引维护')
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help='数据库文件路径')
+    sub = parser.add_subparsers(dest='command', required=True)
+    for name, help_text in (('rebuild', '按原表内容重建索引'), ('optimize', '合并索引分段')):
+        p = sub.add_parser(name, help=help_text)
+        p.add_argument('--table', choices=sorted(INDEXES), help='只处理指定表（默认全部）')
+    p = sub.add_parser('search', help='检索并输出 BM25 排名前若干条')
+    p.add_argument('keyword')
+    p.add_argument('--table', choices=sorted(INDEXES), default='collected_data')
+    p.add_argument('--limit', type=int, default=10)
+    args = parser.parse_args(argv)
+
+    migrate(args.db)
+    conn = get_connection(args.db)
+    try:
+        if not fts5_available(conn):
+            print('当前 SQLite 不支持 FTS5 trigram 分词，检索将使用 LIKE')
+            return 1
+        if args.command == 'search':
+            index = INDEXES[args.table]
+            if not index.usable(args.keyword):
+                print(f'查询词不足 {MIN_QUERY_CHARS} 个字，无法使用全文索引')
+                return 1
+            start = time.perf_counter()
+            rowids = index.ranked_ids(conn, args.keyword, args.limit)
+            rows = conn.execute(f'''
+                SELECT rowid, {index.snippet_sql()} AS snippet FROM {index.fts_table}
+                WHERE {index.fts_table} MATCH ? AND rowid IN ({','.join(['?'] * len(rowids)) or 'NULL'})
+            ''', [index.match(args.keyword)] + rowids).fetchall()
+            elapsed = (time.perf_counter() - start) * 1000
+            snippets = {row['rowid']: row['snippet'] for row in rows}
+            for rowid in rowids:
+                print(f"{rowid:>8}  {snippets[rowid].replace(_MARK_OPEN, '[').replace(_MARK_CLOSE, ']')}")
+            print(f'共 {index.count(conn, args.keyword)} 条匹配，检索耗时 {elapsed:.2f} ms')
+            return 0
+
+        for table, index in INDEXES.items():
+            if args.table and table != args.table:
+                continue
+            start = time.perf_counter()
+            index.create(conn)
+            getattr(index, args.command)(conn)
+            conn.commit()
+            print(f'{index.fts_table} {args.command} 完成，耗时 {time.perf_counter() - start:.1f}s')
+        return 0
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,256 @@
+import os
+import zlib
+import hashlib
+import threading
+
+from app.db import get_connection
+
+DEFAULT_ARCHIVE_DIR = os.environ.get("HTML_ARCHIVE_DIR") or os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..', '..', 'html_archive'))
+
+
+class HtmlArchive:
+    """原始网页归档：压缩、按内容寻址、去重
+
+    响应体按 sha256 去重，zlib 压缩后追加写入段文件（segments/seg-000001.dat ...），
+    段文件写满 segment_bytes 后换新段。归档目录下的 index.db 记录：
+    - archive_blobs: 内容哈希 -> 段文件、偏移、长度
+    - archive_entries: 每次抓取（source_id / URL / 抓取时间）-> 内容哈希
+    同一页面多次抓取或多个 URL 转载同一内容只存一份。
+    """
+    def __init__(self, archive_dir=DEFAULT_ARCHIVE_DIR, segment_bytes=64 * 1024 * 1024, level=6):
+        self.archive_dir = archive_dir
+        self.segment_dir = os.path.join(archive_dir, 'segments')
+        self.index_path = os.path.join(archive_dir, 'index.db')
+        self.segment_bytes = segment_bytes
+        self.level = level
+        self._lock = threading.Lock()
+        os.makedirs(self.segment_dir, exist_ok=True)
+        conn = self._get_connection()
+        try:
+            self._ensure_schema(conn)
+        finally:
+            conn.close()
+
+    def _get_connection(self):
+        return get_connection(self.index_path)
+
+    @staticmethod
+    def _ensure_schema(conn):
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS archive_blobs (
+                content_hash TEXT PRIMARY KEY,
+                segment INTEGER NOT NULL,
+                offset INTEGER NOT NULL,
+                length INTEGER NOT NULL,
+                raw_size INTEGER NOT NULL,
+                create_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS archive_entries (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                source_id INTEGER,
+                url TEXT,
+                content_hash TEXT NOT NULL,
+                content_type TEXT,
+                fetch_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_archive_entries_source ON archive_entries (source_id, id)')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_archive_entries_url ON archive_entries (url, id)')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_archive_entries_hash ON archive_entries (content_hash)')
+        conn.commit()
+
+    def _segment_path(self, segment):
+        return os.path.join(self.segment_dir, f'seg-{segment:06d}.dat')
+
+    def _current_segment(self, conn):
+        """当前写入的段号：最大段号未写满则继续写，否则换新段"""
+        row = conn.execute('SELECT MAX(segment) FROM archive_blobs').fetchone()
+        segment = row[0] or 1
+        path = self._segment_path(segment)
+        if os.path.exists(path) and os.path.getsize(path) >= self.segment_bytes:
+            segment += 1
+        return segment
+
+    def _append(self, conn, data):
+        segment = self._current_segment(conn)
+        with open(self._segment_path(segment), 'ab') as f:
+            offset = f.tell()
+            f.write(data)
+        return segment, offset
+
+    def put(self, body, url=None, source_id=None, content_type=None, content_hash=None):
+        """归档一次抓取结果，返回内容哈希；内容已存在时只追加抓取记录"""
+        content_hash = content_hash or hashlib.sha256(body).hexdigest()
+        # 压缩在锁外进行，多个抓取线程可以并行压缩；锁内只做段文件追加与索引写入
+        data = None if self._has_blob(content_hash) else zlib.compress(body, self.level)
+        with self._lock:
+            conn = self._get_connection()
+            try:
+                exists = conn.execute('SELECT 1 FROM archive_blobs WHERE content_hash = ?', (content_hash,)).fetchone()
+                if not exists:
+                    if data is None:
+                        # 检查之后该内容恰好被 purge 删除
+                        data = zlib.compress(body, self.level)
+                    segment, offset = self._append(conn, data)
+                    conn.execute('''
+                        INSERT INTO archive_blobs (content_hash, segment, offset, length, raw_size)
+                        VALUES (?, ?, ?, ?, ?)
+                    ''', (content_hash, segment, offset, len(data), len(body)))
+                conn.execute('''
+                    INSERT INTO archive_entries (source_id, url, content_hash, content_type)
+                    VALUES (?, ?, ?, ?)
+                ''', (source_id, url, content_hash, content_type))
+                conn.commit()
+            finally:
+                conn.close()
+        return content_hash
+
+    def _has_blob(self, content_hash):
+        conn = self._get_connection()
+        try:
+            return conn.execute('SELECT 1 FROM archive_blobs WHERE content_hash = ?', (content_hash,)).fetchone() is not None
+        finally:
+            conn.close()
+
+    def _read_blob(self, row):
+        with open(self._segment_path(row['segment']), 'rb') as f:
+            f.seek(row['offset'])
+            return zlib.decompress(f.read(row['length']))
+
+    def get_blob(self, content_hash):
+        conn = self._get_connection()
+        try:
+            row = conn.execute('SELECT * FROM archive_blobs WHERE content_hash = ?', (content_hash,)).fetchone()
+        finally:
+            conn.close()
+        return self._read_blob(row) if row else None
+
+    def latest(self, source_id=None, url=None):
+        """取某条数据（或某个 URL）最近一次归档，返回 {'body', 'content_type', 'content_hash', 'url', 'fetch_time'}"""
+        conn = self._get_connection()
+        try:
+            if source_id is not None:
+                where, param = 'e.source_id = ?', source_id
+            else:
+                where, param = 'e.url = ?', url
+            row = conn.execute(f'''
+                SELECT e.url, e.content_type, e.content_hash, e.fetch_time, b.segment, b.offset, b.length
+                FROM archive_entries e JOIN archive_blobs b ON b.content_hash = e.content_hash
+                WHERE {where} ORDER BY e.id DESC LIMIT 1
+            ''', (param,)).fetchone()
+        finally:
+            conn.close()
+        if not row:
+            return None
+        return {'body': self._read_blob(row), 'content_type': row['content_type'],
+                'content_hash': row['content_hash'], 'url': row['url'], 'fetch_time': row['fetch_time']}
+
+    def archived_source_ids(self):
+        conn = self._get_connection()
+        try:
+            return [row[0] for row in conn.execute(
+                'SELECT DISTINCT source_id FROM archive_entries WHERE source_id IS NOT NULL ORDER BY source_id')]
+        finally:
+            conn.close()
+
+    def purge(self, max_age_days, keep_latest=True):
+        """删除早于 max_age_days 天的抓取记录（默认保留每条数据最近一次），并删除不再被引用的内容
+
+        内容从索引删除后其字节仍在段文件中，调用 compact() 回收磁盘空间。
+        """
+        with self._lock:
+            conn = self._get_connection()
+            try:
+                keep = ('AND id NOT IN (SELECT MAX(id) FROM archive_entries WHERE source_id IS NOT NULL GROUP BY source_id)'
+                        if keep_latest else '')
+                removed = conn.execute(f'''
+                    DELETE FROM archive_entries WHERE fetch_time < datetime('now', ?) {keep}
+                ''', (f'-{max_age_days} days',)).rowcount
+                conn.execute('''
+                    DELETE FROM archive_blobs
+                    WHERE content_hash NOT IN (SELECT DISTINCT content_hash FROM archive_entries)
+                ''')
+                conn.commit()
+            finally:
+                conn.close()
+        return removed
+
+    def compact(self, min_garbage_ratio=0.3):
+        """重写无效字节占比超过 min_garbage_ratio 的段文件，返回回收的字节数"""
+        reclaimed = 0
+        with self._lock:
+            conn = self._get_connection()
+            try:
+                live = {row['segment']: row['live'] for row in conn.execute(
+                    'SELECT segment, SUM(length) AS live FROM archive_blobs GROUP BY segment')}
+                current = self._current_segment(conn)
+                for name in sorted(os.listdir(self.segment_dir)):
+                    if not name.startswith('seg-') or not name.endswith('.dat'):
+                        continue
+                    segment = int(name[4:-4])
+                    path = self._segment_path(segment)
+                    size = os.path.getsize(path)
+                    garbage = size - live.get(segment, 0)
+                    if not live.get(segment):
+                        # 已没有有效内容的段直接删除（包括当前写入段）
+                        os.remove(path)
+                        reclaimed += size
+                        continue
+                    if segment == current or garbage / size < min_garbage_ratio:
+                        continue
+                    # 把仍有效的内容搬到当前写入段，再删除旧段
+                    rows = conn.execute('SELECT * FROM archive_blobs WHERE segment = ?', (segment,)).fetchall()
+                    for row in rows:
+                        with open(path, 'rb') as f:
+                            f.seek(row['offset'])
+                            data = f.read(row['length'])
+                        new_segment, offset = self._append(conn, data)
+                        conn.execute('UPDATE archive_blobs SET segment = ?, offset = ? WHERE content_hash = ?',
+                                     (new_segment, offset, row['content_hash']))
+                    conn.commit()
+                    os.remove(path)
+                    reclaimed += garbage
+            finally:
+                conn.close()
+        return reclaimed
+
+    def stats(self):
+        """磁盘占用与去重、压缩效果"""
+        conn = self._get_connection()
+        try:
+            blobs = conn.execute('''
+                SELECT COUNT(*) AS blobs, IFNULL(SUM(length), 0) AS stored, IFNULL(SUM(raw_size), 0) AS raw
+                FROM archive_blobs
+            ''').fetchone()
+            entries = conn.execute('SELECT COUNT(*) FROM archive_entries').fetchone()[0]
+        finally:
+            conn.close()
+        segments = [os.path.join(self.segment_dir, name) for name in os.listdir(self.segment_dir)
+                    if name.endswith('.dat')]
+        disk_bytes = sum(os.path.getsize(path) for path in segments)
+        return {
+            'segments': len(segments),
+            'blobs': blobs['blobs'],
+            'entries': entries,
+            'raw_bytes': blobs['raw'],
+            'stored_bytes': blobs['stored'],
+            'disk_bytes': disk_bytes + os.path.getsize(self.index_path),
+            'garbage_bytes': disk_bytes - blobs['stored'],
+            'compression_ratio': round(blobs['raw'] / blobs['stored'], 2) if blobs['stored'] else 0
+        }
+
+
+_default_archive = None
+_default_lock = threading.Lock()
+
+
+def get_default_archive():
+    """应用内共享的归档实例（目录可用 HTML_ARCHIVE_DIR 指定）"""
+    global _default_archive
+    with _default_lock:
+        if _default_archive is None:
+            _default_archive = HtmlArchive()
+        return _default_archive
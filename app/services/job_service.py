@@ -0,0 +1,495 @@
+import json
+import time
+import threading
+from collections import deque
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from app.db import get_connection
+from app.migrations import migrate
+
+# 任务状态
+JOB_PENDING = 'pending'
+JOB_RUNNING = 'running'
+JOB_SUCCESS = 'success'
+JOB_FAILED = 'failed'
+FINISHED_STATES = (JOB_SUCCESS, JOB_FAILED)
+
+# 深度采集任务条目状态
+ITEM_PENDING = 'pending'
+ITEM_DONE = 'done'
+ITEM_FAILED = 'failed'
+
+
+class JobEventHub:
+    """任务事件中心：按任务保存最近的进度事件（带递增序号），供 SSE 断线重连后补发"""
+    def __init__(self, max_events=1000, max_jobs=200):
+        self.max_events = max_events
+        self.max_jobs = max_jobs
+        self._events = {}
+        self._seq = {}
+        self._cond = threading.Condition()
+
+    def publish(self, job_id, payload):
+        with self._cond:
+            if job_id not in self._events:
+                if len(self._events) >= self.max_jobs:
+                    # 丢弃最早的任务事件
+                    oldest = next(iter(self._events))
+                    self._events.pop(oldest)
+                    self._seq.pop(oldest, None)
+                self._events[job_id] = deque(maxlen=self.max_events)
+            seq = self._seq.get(job_id, 0) + 1
+            self._seq[job_id] = seq
+            self._events[job_id].append((seq, payload))
+            self._cond.notify_all()
+            return seq
+
+    def seed(self, job_id, seq):
+        """把任务的事件序号至少提到 seq（重启续跑时接上之前的序号），返回当前序号"""
+        with self._cond:
+            seq = max(seq, self._seq.get(job_id, 0))
+            self._seq[job_id] = seq
+            return seq
+
+    def has_job(self, job_id):
+        with self._cond:
+            return job_id in self._events
+
+    def events_after(self, job_id, last_seq, timeout=15):
+        """返回序号大于 last_seq 的事件；没有新事件时最多等待 timeout 秒"""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                events = [e for e in self._events.get(job_id, ()) if e[0] > last_seq]
+                remaining = deadline - time.monotonic()
+                if events or remaining <= 0:
+                    return events
+                self._cond.wait(remaining)
+
+
+def stream_events(hub, job_id, last_seq=0, id_prefix='', snapshot=None):
+    """从事件中心按序号推送 SSE 事件（带 id 行），任务结束后关闭
+
+    没有更新的事件时用 snapshot() 查询库中的任务状态：任务已结束、已不存在，或事件已不在
+    事件中心时，推送库中的最终状态后关闭，避免客户端带着已过终点的 Last-Event-ID 重连后一直挂着。
+    """
+    timeout = 0
+    while True:
+        events = hub.events_after(job_id, last_seq, timeout)
+        # 首次不等待，重连时若已没有新事件可立即判断任务是否已结束
+        timeout = 15
+        if not events:
+            if snapshot is not None:
+                state = snapshot()
+                if state is None or state['status'] in FINISHED_STATES or not hub.has_job(job_id):
+                    yield f"data: {json.dumps(state or {'job_id': job_id, 'error': '任务不存在'}, ensure_ascii=False)}\n\n"
+                    return
+            # 保持连接的心跳注释
+            yield ": keep-alive\n\n"
+            continue
+        for seq, payload in events:
+            last_seq = seq
+            yield f"id: {id_prefix}{seq}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+            if payload.get('status') in FINISHED_STATES:
+                return
+
+
+class JobService:
+    """后台采集任务：任务记录保存在 crawl_jobs 表，由有界线程池执行，不占用 Web 请求线程"""
+    def __init__(self, db_path, spider_service, max_workers=4):
+        self.db_path = db_path
+        self.spider_service = spider_service
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='crawl-job')
+        self.events = JobEventHub()
+        migrate(db_path)
+        self._fail_interrupted()
+
+    def _get_connection(self):
+        return get_connection(self.db_path)
+
+    def _fail_interrupted(self):
+        conn = self._get_connection()
+        try:
+            # 进程内线程池的任务无法跨重启继续，上次未结束的任务标记为失败
+            conn.execute('''
+                UPDATE crawl_jobs SET status = ?, error = ?, finish_time = ?
+                WHERE status IN (?, ?)
+            ''', (JOB_FAILED, '服务重启，任务中断', datetime.now(), JOB_PENDING, JOB_RUNNING))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _update_job(self, job_id, **fields):
+        conn = self._get_connection()
+        try:
+            assignments = ', '.join(f'{k} = ?' for k in fields)
+            conn.execute(f'UPDATE crawl_jobs SET {assignments} WHERE id = ?', (*fields.values(), job_id))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def submit_crawl(self, crawler_id, keyword, limit=10):
+        """提交采集任务，立即返回任务 id"""
+        conn = self._get_connection()
+        try:
+            cursor = conn.execute(
+                'INSERT INTO crawl_jobs (crawler_id, keyword, limit_count, status) VALUES (?, ?, ?, ?)',
+                (crawler_id, keyword, limit, JOB_PENDING))
+            job_id = cursor.lastrowid
+            conn.commit()
+        finally:
+            conn.close()
+        self.events.publish(job_id, {'status': JOB_PENDING, 'job_id': job_id})
+        self.executor.submit(self._run_crawl, job_id, crawler_id, keyword, limit)
+        return job_id
+
+    def _run_crawl(self, job_id, crawler_id, keyword, limit):
+        self._update_job(job_id, status=JOB_RUNNING, start_time=datetime.now())
+        self.events.publish(job_id, {'status': JOB_RUNNING, 'job_id': job_id, 'progress': 0})
+        last_progress = [0]
+
+        def on_item(count, item):
+            progress = min(99, int(count * 100 / max(limit, 1)))
+            self.events.publish(job_id, {
+                'status': JOB_RUNNING, 'job_id': job_id, 'progress': progress,
+                'count': count, 'title': item.get('title')
+            })
+            # 进度每增长 10% 落库一次，避免频繁写库
+            if progress - last_progress[0] >= 10:
+                last_progress[0] = progress
+                self._update_job(job_id, progress=progress, result_count=count)
+
+        try:
+            count = self.spider_service.run_baidu_spider(crawler_id, keyword, limit=limit, on_item=on_item)
+            self._update_job(job_id, status=JOB_SUCCESS, progress=100, result_count=count, finish_time=datetime.now())
+            self.events.publish(job_id, {'status': JOB_SUCCESS, 'job_id': job_id, 'progress': 100, 'count': count})
+        except Exception as e:
+            print(f"Crawl job {job_id} failed: {e}")
+            self._update_job(job_id, status=JOB_FAILED, error=str(e), finish_time=datetime.now())
+            self.events.publish(job_id, {'status': JOB_FAILED, 'job_id': job_id, 'error': str(e)})
+
+    def get_job(self, job_id):
+        conn = self._get_connection()
+        try:
+            row = conn.execute('SELECT * FROM crawl_jobs WHERE id = ?', (job_id,)).fetchone()
+            return dict(row) if row else None
+        finally:
+            conn.close()
+
+    def list_jobs(self, limit=20):
+        conn = self._get_connection()
+        try:
+            rows = conn.execute('SELECT * FROM crawl_jobs ORDER BY id DESC LIMIT ?', (limit,)).fetchall()
+            return [dict(row) for row in rows]
+        finally:
+            conn.close()
+
+    def _snapshot(self, job_id):
+        """库中的任务状态，任务不存在时返回 None"""
+        job = self.get_job(job_id)
+        if not job:
+            return None
+        return {'job_id': job_id, 'status': job['status'], 'progress': job['progress'],
+                'count': job['result_count'], 'error': job['error']}
+
+    def stream_job(self, job_id, last_event_id=0):
+        """SSE 进度流：从 last_event_id 之后补发，任务结束后关闭"""
+        state = self._snapshot(job_id)
+        if not state:
+            yield f"data: {json.dumps({'error': '任务不存在'})}\n\n"
+            return
+        if not self.events.has_job(job_id):
+            # 事件已不在内存（如服务重启），直接返回库中的最终状态
+            yield f"data: {json.dumps(state, ensure_ascii=False)}\n\n"
+            return
+
+        yield from stream_events(self.events, job_id, last_event_id, snapshot=lambda: self._snapshot(job_id))
+
+
+class DeepCrawlJobService:
+    """后台深度采集任务
+
+    任务与逐条状态保存在 deep_crawl_jobs / deep_crawl_job_items 表，执行与 HTTP 连接无关。
+    每条结果与其断点在同一事务内提交；服务重启后自动续跑未完成的任务，只处理尚未完成的条目。
+    """
+    def __init__(self, db_path, deep_crawl_service, max_workers=2):
+        self.db_path = db_path
+        self.deep_crawl_service = deep_crawl_service
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='deep-job')
+        self.events = JobEventHub()
+        migrate(db_path)
+        self._resume_unfinished()
+
+    def _get_connection(self):
+        return get_connection(self.db_path)
+
+    def _resume_unfinished(self):
+        """重启前未结束的任务重新排队，从断点继续"""
+        conn = self._get_connection()
+        try:
+            rows = conn.execute('SELECT id FROM deep_crawl_jobs WHERE status IN (?, ?) ORDER BY id',
+                                (JOB_PENDING, JOB_RUNNING)).fetchall()
+        finally:
+            conn.close()
+        for row in rows:
+            self.executor.submit(self._run_job, row['id'])
+
+    def _update_job(self, job_id, **fields):
+        conn = self._get_connection()
+        try:
+            assignments = ', '.join(f'{k} = ?' for k in fields)
+            conn.execute(f'UPDATE deep_crawl_jobs SET {assignments} WHERE id = ?', (*fields.values(), job_id))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def submit(self, source_ids, model_id, batch=False):
+        """提交深度采集任务，立即返回任务 id"""
+        source_ids = list(dict.fromkeys(source_ids))
+        conn = self._get_connection()
+        try:
+            cursor = conn.execute(
+                'INSERT INTO deep_crawl_jobs (model_id, batch, status, total) VALUES (?, ?, ?, ?)',
+                (model_id, 1 if batch else 0, JOB_PENDING, len(source_ids)))
+            job_id = cursor.lastrowid
+            conn.executemany('INSERT INTO deep_crawl_job_items (job_id, source_id, status) VALUES (?, ?, ?)',
+                             [(job_id, sid, ITEM_PENDING) for sid in source_ids])
+            conn.commit()
+        finally:
+            conn.close()
+        self.events.publish(job_id, {'status': JOB_PENDING, 'job_id': job_id, 'total': len(source_ids)})
+        self.executor.submit(self._run_job, job_id)
+        return job_id
+
+    def resume(self, job_id):
+        """重新执行已失败任务中未完成的条目"""
+        job = self.get_job(job_id)
+        if not job or job['status'] != JOB_FAILED:
+            return False
+        self._update_job(job_id, status=JOB_PENDING, error=None, finish_time=None)
+        self.executor.submit(self._run_job, job_id)
+        return True
+
+    def _checkpoint(self, job_id):
+        def checkpoint(conn, source_id, result):
+            conn.execute('''
+                UPDATE deep_crawl_job_items SET status = ?, result = ?, update_time = CURRENT_TIMESTAMP
+                WHERE job_id = ? AND source_id = ?
+            ''', (ITEM_FAILED if result == 'failed' else ITEM_DONE, result, job_id, source_id))
+            counter = {'failed': 'fail_count', 'unchanged': 'unchanged_count'}.get(result, 'success_count')
+            conn.execute(f'''
+                UPDATE deep_crawl_jobs SET done_count = done_count + 1, {counter} = {counter} + 1 WHERE id = ?
+            ''', (job_id,))
+        return checkpoint
+
+    def _run_job(self, job_id):
+        job = self.get_job(job_id)
+        if not job:
+            return
+        try:
+            model = self.deep_crawl_service.get_ai_model(job['model_id'])
+            if not model:
+                raise ValueError('未找到可用的 AI 模型')
+
+            conn = self._get_connection()
+            try:
+                pending = [row['source_id'] for row in conn.execute(
+                    'SELECT source_id FROM deep_crawl_job_items WHERE job_id = ? AND status = ? ORDER BY rowid',
+                    (job_id, ITEM_PENDING))]
+            finally:
+                conn.close()
+
+            # 事件序号接上重启前的序号；本次运行至多再发 len(pending) + 2 个事件，
+            # 把下次续跑的序号下限先记入库中
+            seq = self.events.seed(job_id, job['event_seq'] or 0)
+            self._update_job(job_id, status=JOB_RUNNING, start_time=job['start_time'] or datetime.now(),
+                             event_seq=seq + len(pending) + 2)
+            total = job['total']
+            counts = {'done': job['done_count'], 'success': job['success_count'],
+                      'unchanged': job['unchanged_count'], 'fail': job['fail_count']}
+            self.events.publish(job_id, {'status': JOB_RUNNING, 'job_id': job_id, 'total': total,
+                                         'current': counts['done'], 'resumed': counts['done'] > 0})
+
+            for event in self.deep_crawl_service.iter_deep_crawl(pending, model, batch=bool(job['batch']),
+                                                                 checkpoint=self._checkpoint(job_id)):
+                counts['done'] += 1
+                key = {'failed': 'fail', 'unchanged': 'unchanged'}.get(event['result'], 'success')
+                counts[key] += 1
+                self.events.publish(job_id, {
+                    'status': 'processing', 'job_id': job_id, 'current': counts['done'], 'total': total,
+                    'progress': int(counts['done'] / max(total, 1) * 100), 'title': event['title'],
+                    'result': event['result']
+                })
+
+            self._update_job(job_id, status=JOB_SUCCESS, finish_time=datetime.now())
+            self.events.publish(job_id, {'status': JOB_SUCCESS, 'job_id': job_id, 'success': counts['success'],
+                                         'unchanged': counts['unchanged'], 'fail': counts['fail'], 'total': total})
+        except Exception as e:
+            print(f"Deep crawl job {job_id} failed: {e}")
+            self._update_job(job_id, status=JOB_FAILED, error=str(e), finish_time=datetime.now())
+            self.events.publish(job_id, {'status': JOB_FAILED, 'job_id': job_id, 'error': str(e)})
+
+    def get_job(self, job_id):
+        conn = self._get_connection()
+        try:
+            row = conn.execute('SELECT * FROM deep_crawl_jobs WHERE id = ?', (job_id,)).fetchone()
+            return dict(row) if row else None
+        finally:
+            conn.close()
+
+    def list_jobs(self, limit=20):
+        conn = self._get_connection()
+        try:
+            rows = conn.execute('SELECT * FROM deep_crawl_jobs ORDER BY id DESC LIMIT ?', (limit,)).fetchall()
+            return [dict(row) for row in rows]
+        finally:
+            conn.close()
+
+    def _snapshot(self, job_id):
+        """库中的任务汇总，任务不存在时返回 None"""
+        job = self.get_job(job_id)
+        if not job:
+            return None
+        return {'job_id': job_id, 'status': job['status'], 'success': job['success_count'],
+                'unchanged': job['unchanged_count'], 'fail': job['fail_count'], 'total': job['total'],
+                'error': job['error']}
+
+    def stream_job(self, job_id, last_event_id=0):
+        """SSE 进度流：事件 id 为 "<任务id>:<序号>"，重连时从断点补发错过的进度"""
+        state = self._snapshot(job_id)
+        if not state:
+            yield f"data: {json.dumps({'error': '任务不存在'})}\n\n"
+            return
+        if not self.events.has_job(job_id):
+            # 事件已不在内存（任务早已结束），直接返回库中的汇总
+            yield f"data: {json.dumps(state, ensure_ascii=False)}\n\n"
+            return
+        yield from stream_events(self.events, job_id, last_event_id, id_prefix=f'{job_id}:',
+                                 snapshot=lambda: self._snapshot(job_id))
+
+
+class ReextractJobService:
+    """批量重新提炼任务：按主键游标分批处理，断点（最后处理的行 id）记入 reextract_jobs 表"""
+    def __init__(self, db_path, deep_crawl_service, max_workers=1):
+        self.db_path = db_path
+        self.deep_crawl_service = deep_crawl_service
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='reextract-job')
+        self.events = JobEventHub()
+        migrate(db_path)
+        self._resume_unfinished()
+
+    def _get_connection(self):
+        return get_connection(self.db_path)
+
+    def _resume_unfinished(self):
+        conn = self._get_connection()
+        try:
+            rows = conn.execute('SELECT id FROM reextract_jobs WHERE status IN (?, ?) ORDER BY id',
+                                (JOB_PENDING, JOB_RUNNING)).fetchall()
+        finally:
+            conn.close()
+        for row in rows:
+            self.executor.submit(self._run_job, row['id'])
+
+    def _update_job(self, job_id, **fields):
+        conn = self._get_connection()
+        try:
+            assignments = ', '.join(f'{k} = ?' for k in fields)
+            conn.execute(f'UPDATE reextract_jobs SET {assignments} WHERE id = ?', (*fields.values(), job_id))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def submit(self, model_id, target_version=None, batch=False, workers=4):
+        """提交重新提炼任务；提交时做一次试算，记录待处理行数与预计 token"""
+        model = self.deep_crawl_service.get_ai_model(model_id)
+        if not model:
+            raise ValueError('未找到可用的 AI 模型')
+        estimate = self.deep_crawl_service.estimate_reextract(model, target_version)
+        conn = self._get_connection()
+        try:
+            cursor = conn.execute('''
+                INSERT INTO reextract_jobs (model_id, target_version, batch, workers, status, total, estimated_tokens)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (model_id, estimate['target_version'], 1 if batch else 0, workers, JOB_PENDING,
+                  estimate['rows'], estimate['total_tokens']))
+            job_id = cursor.lastrowid
+            conn.commit()
+        finally:
+            conn.close()
+        self.events.publish(job_id, {'status': JOB_PENDING, 'job_id': job_id, 'estimate': estimate})
+        self.executor.submit(self._run_job, job_id)
+        return job_id, estimate
+
+    def _checkpoint(self, job_id):
+        def checkpoint(conn, last_id, results):
+            failed = sum(1 for r in results if r == 'failed')
+            conn.execute('''
+                UPDATE reextract_jobs SET last_id = ?, done_count = done_count + ?, fail_count = fail_count + ?
+                WHERE id = ?
+            ''', (last_id, len(results), failed, job_id))
+        return checkpoint
+
+    def _run_job(self, job_id):
+        job = self.get_job(job_id)
+        if not job:
+            return
+        try:
+            model = self.deep_crawl_service.get_ai_model(job['model_id'])
+            if not model:
+                raise ValueError('未找到可用的 AI 模型')
+            self._update_job(job_id, status=JOB_RUNNING, start_time=job['start_time'] or datetime.now())
+            total = job['total']
+            done = job['done_count']
+            self.events.publish(job_id, {'status': JOB_RUNNING, 'job_id': job_id, 'total': total, 'current': done})
+            for event in self.deep_crawl_service.iter_reextract(
+                    model, target_version=job['target_version'], after_id=job['last_id'],
+                    batch=bool(job['batch']), workers=job['workers'], checkpoint=self._checkpoint(job_id)):
+                done += 1
+                self.events.publish(job_id, {
+                    'status': 'processing', 'job_id': job_id, 'current': done, 'total': total,
+                    'progress': min(100, int(done / max(total, 1) * 100)),
+                    'title': event['title'], 'result': event['result']
+                })
+            job = self.get_job(job_id)
+            self._update_job(job_id, status=JOB_SUCCESS, finish_time=datetime.now())
+            self.events.publish(job_id, {'status': JOB_SUCCESS, 'job_id': job_id, 'done': job['done_count'],
+                                         'fail': job['fail_count'], 'total': total})
+        except Exception as e:
+            print(f"Re-extraction job {job_id} failed: {e}")
+            self._update_job(job_id, status=JOB_FAILED, error=str(e), finish_time=datetime.now())
+            self.events.publish(job_id, {'status': JOB_FAILED, 'job_id': job_id, 'error': str(e)})
+
+    def get_job(self, job_id):
+        conn = self._get_connection()
+        try:
+            row = conn.execute('SELECT * FROM reextract_jobs WHERE id = ?', (job_id,)).fetchone()
+            return dict(row) if row else None
+        finally:
+            conn.close()
+
+    def list_jobs(self, limit=20):
+        conn = self._get_connection()
+        try:
+            rows = conn.execute('SELECT * FROM reextract_jobs ORDER BY id DESC LIMIT ?', (limit,)).fetchall()
+            return [dict(row) for row in rows]
+        finally:
+            conn.close()
+
+    def _snapshot(self, job_id):
+        job = self.get_job(job_id)
+        if not job:
+            return None
+        return {'job_id': job_id, 'status': job['status'], 'done': job['done_count'], 'fail': job['fail_count'],
+                'total': job['total'], 'error': job['error']}
+
+    def stream_job(self, job_id, last_event_id=0):
+        state = self._snapshot(job_id)
+        if not state:
+            yield f"data: {json.dumps({'error': '任务不存在'})}\n\n"
+            return
+        if not self.events.has_job(job_id):
+            yield f"data: {json.dumps(state, ensure_ascii=False)}\n\n"
+            return
+        yield from stream_events(self.events, job_id, last_event_id, snapshot=lambda: self._snapshot(job_id))
@@ -0,0 +1,93 @@
+import json
+import hashlib
+
+from app.db import get_connection
+from app.migrations import migrate
+
+
+class LLMCache:
+    """大模型提炼结果缓存（持久化在 llm_cache 表）
+
+    键为 清洗后正文 + 模型 id + 模型名 + 提示词版本 的哈希，正文相同的文章
+    （重新采集、多个 URL 转载同一篇）直接复用已有结果，不再调用模型。
+    按存活时间与总大小淘汰。
+    """
+    def __init__(self, db_path, max_age_days=30, max_bytes=50 * 1024 * 1024):
+        self.db_path = db_path
+        self.max_age_days = max_age_days
+        self.max_bytes = max_bytes
+        migrate(db_path)
+
+    def _get_connection(self):
+        return get_connection(self.db_path)
+
+    @staticmethod
+    def make_key(clean_text, model, prompt_version):
+        raw = f"{model['id']}\x00{model['model_name']}\x00{prompt_version}\x00{clean_text}"
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """查询缓存，命中返回 (analysis, total_tokens)，未命中或已过期返回 None"""
+        conn = self._get_connection()
+        try:
+            row = conn.execute('''
+                SELECT result, total_tokens FROM llm_cache
+                WHERE cache_key = ? AND create_time >= datetime('now', ?)
+            ''', (key, f'-{self.max_age_days} days')).fetchone()
+        finally:
+            conn.close()
+        if not row:
+            return None
+        return json.loads(row['result']), row['total_tokens']
+
+    def put(self, conn, key, model_id, analysis, usage=None):
+        """写入缓存（使用调用方的连接，随调用方的事务一起提交）"""
+        result = json.dumps(analysis, ensure_ascii=False)
+        prompt_tokens, completion_tokens, total_tokens = usage or (0, 0, 0)
+        conn.execute('''
+            INSERT INTO llm_cache (cache_key, model_id, result, prompt_tokens, completion_tokens, total_tokens, size_bytes)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(cache_key) DO UPDATE SET
+            result=excluded.result,
+            prompt_tokens=excluded.prompt_tokens,
+            completion_tokens=excluded.completion_tokens,
+            total_tokens=excluded.total_tokens,
+            size_bytes=excluded.size_bytes,
+            create_time=CURRENT_TIMESTAMP,
+            last_hit_time=CURRENT_TIMESTAMP
+        ''', (key, model_id, result, prompt_tokens, completion_tokens, total_tokens, len(result.encode('utf-8'))))
+
+    def record_hit(self, conn, key, model_id, saved_tokens, task_type="深度采集分析(缓存命中)"):
+        """命中时更新命中统计，并在 token_usage 记一条零消耗记录"""
+        conn.execute('UPDATE llm_cache SET hit_count = hit_count + 1, last_hit_time = CURRENT_TIMESTAMP WHERE cache_key = ?', (key,))
+        conn.execute('''
+            INSERT INTO token_usage (model_id, prompt_tokens, completion_tokens, total_tokens, task_type, cache_hit, saved_tokens)
+            VALUES (?, 0, 0, 0, ?, 1, ?)
+        ''', (model_id, task_type, saved_tokens))
+
+    def evict(self, conn):
+        """删除过期条目；总大小超限时按最近命中时间从旧到新淘汰"""
+        conn.execute("DELETE FROM llm_cache WHERE create_time < datetime('now', ?)", (f'-{self.max_age_days} days',))
+        total = conn.execute('SELECT IFNULL(SUM(size_bytes), 0) FROM llm_cache').fetchone()[0]
+        if total > self.max_bytes:
+            victims = []
+            for row in conn.execute('SELECT cache_key, size_bytes FROM llm_cache ORDER BY last_hit_time ASC'):
+                if total <= self.max_bytes * 0.9:
+                    break
+                victims.append((row['cache_key'],))
+                total -= row['size_bytes']
+            conn.executemany('DELETE FROM llm_cache WHERE cache_key = ?', victims)
+        conn.commit()
+
+    def stats(self, conn):
+        row = conn.execute('''
+            SELECT COUNT(*) AS calls, IFNULL(SUM(cache_hit), 0) AS hits, IFNULL(SUM(saved_tokens), 0) AS saved_tokens
+            FROM token_usage WHERE task_type GLOB '深度采集*'
+        ''').fetchone()
+        calls, hits = row['calls'], row['hits']
+        return {
+            'calls': calls,
+            'hits': hits,
+            'hit_rate': round(hits * 100.0 / calls, 1) if calls else 0,
+            'saved_tokens': row['saved_tokens']
+        }
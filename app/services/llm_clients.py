@@ -0,0 +1,110 @@
+import os
+import threading
+
+import httpx
+from openai import OpenAI, DefaultHttpxClient
+
+from app.db import get_connection
+
+
+class LLMClientRegistry:
+    """进程内共享的大模型客户端注册表
+
+    按模型 id 缓存 ai_models 配置与对应的 OpenAI 客户端（各自带连接池），
+    同一模型的后续调用复用已建立的 HTTP/TLS 连接，也不再每次查库读配置。
+    模型配置修改或删除后调用 invalidate() 使缓存失效。
+    """
+    def __init__(self, db_path, max_connections=20, max_keepalive=10, keepalive_expiry=30,
+                 timeout=120, connect_timeout=10, max_retries=2):
+        self.db_path = db_path
+        self.max_connections = max_connections
+        self.max_keepalive = max_keepalive
+        self.keepalive_expiry = keepalive_expiry
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.max_retries = max_retries
+        self._models = {}
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    def _get_connection(self):
+        return get_connection(self.db_path)
+
+    def get_model(self, model_id):
+        """读取模型配置（带缓存），不存在返回 None"""
+        model_id = int(model_id)
+        with self._lock:
+            model = self._models.get(model_id)
+        if model is None:
+            conn = self._get_connection()
+            try:
+                row = conn.execute('SELECT * FROM ai_models WHERE id = ?', (model_id,)).fetchone()
+            finally:
+                conn.close()
+            if not row:
+                return None
+            model = dict(row)
+            with self._lock:
+                self._models[model_id] = model
+        return dict(model)
+
+    def _build_client(self, model):
+        http_client = DefaultHttpxClient(
+            limits=httpx.Limits(max_connections=self.max_connections,
+                                max_keepalive_connections=self.max_keepalive,
+                                keepalive_expiry=self.keepalive_expiry),
+            timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout)
+        )
+        return OpenAI(api_key=model['api_key'], base_url=model['api_url'],
+                      http_client=http_client, max_retries=self.max_retries)
+
+    def get_client(self, model):
+        """获取模型对应的客户端；地址或密钥变化时重建"""
+        fingerprint = (model['api_url'], model['api_key'])
+        with self._lock:
+            entry = self._clients.get(model['id'])
+            if entry is None or entry[0] != fingerprint:
+                entry = (fingerprint, self._build_client(model))
+                self._clients[model['id']] = entry
+            return entry[1]
+
+    def invalidate(self, model_id=None):
+        """丢弃指定模型（不传则全部）的缓存配置与客户端
+
+        旧客户端不主动关闭，正在进行的流式调用可以继续完成，随后由垃圾回收释放连接。
+        """
+        with self._lock:
+            if model_id is None:
+                self._models.clear()
+                self._clients.clear()
+            else:
+                self._models.pop(int(model_id), None)
+                self._clients.pop(int(model_id), None)
+
+    def stats(self):
+        with self._lock:
+            return {'models': len(self._models), 'clients': len(self._clients)}
+
+
+_registries = {}
+_registry_lock = threading.Lock()
+
+
+def get_llm_clients(db_path):
+    """按数据库文件共享的客户端注册表（同一文件的不同写法指向同一个注册表）"""
+    key = os.path.realpath(db_path)
+    with _registry_lock:
+        registry = _registries.get(key)
+        if registry is None:
+            registry = LLMClientRegistry(key)
+            _registries[key] = registry
+        return registry
+
+
+def configure_llm_clients(db_path, **kwargs):
+    """按新参数（连接数、超时、重试次数等）重建该数据库的共享注册表"""
+    key = os.path.realpath(db_path)
+    with _registry_lock:
+        registry = LLMClientRegistry(key, **kwargs)
+        _registries[key] = registry
+        return registry
@@ -0,0 +1,166 @@
+"""列表分页：按 (collect_time, id) 倒序的游标分页与总数缓存
+
+OFFSET 分页需要先扫过前面所有行，越往后翻越慢；游标分页记住上一页边界行的
+(collect_time, id)，下一页直接从索引中该位置继续读取，第 N 页与第 1 页代价相同。
+游标是不透明字符串（base64 编码的方向与边界键），调用方原样传回即可。
+
+总数同样是大表上的全量扫描，支持四种模式：
+- exact: 每次精确计数（结果写入缓存）；
+- cached: 优先用 COUNT_CACHE_TTL 秒内的精确计数，过期再重新计数；
+- estimate: 有缓存用缓存；不带筛选条件时直接精确计数（按 B 树页计数，代价很小），
+  带筛选条件时按最近 ESTIMATE_SAMPLE 行的命中比例折算到全表行数；
+- none: 不返回总数。
+"""
+import json
+import time
+import base64
+import threading
+
+COUNT_MODES = ('exact', 'cached', 'estimate', 'none')
+COUNT_CACHE_TTL = 30
+ESTIMATE_SAMPLE = 2000
+MAX_LIMIT = 200
+
+
+def encode_cursor(direction, collect_time, row_id):
+    raw = json.dumps([direction, collect_time, row_id], ensure_ascii=False, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """解析游标，返回 (direction, (collect_time, id))；格式不对时抛出 ValueError"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        direction, collect_time, row_id = json.loads(raw.decode('utf-8'))
+    except Exception:
+        raise ValueError('无效的分页游标')
+    if direction not in ('next', 'prev') or not isinstance(row_id, int):
+        raise ValueError('无效的分页游标')
+    return direction, (collect_time, row_id)
+
+
+def keyset_page(conn, select_sql, where, params, time_column, id_column, cursor=None, limit=10):
+    """按 (time_column, id_column) 倒序取一页
+
+    select_sql 为不含 WHERE / ORDER BY 的查询（SELECT ... FROM ... JOIN ...），结果行须包含
+    collect_time 与 id 两列；where 为筛选条件列表。返回 (rows, next_cursor, prev_cursor)，
+    没有下一页 / 上一页时对应游标为 None。
+    """
+    direction, key = decode_cursor(cursor) if cursor else ('next', None)
+    conditions = list(where)
+    args = list(params)
+    if key is not None:
+        conditions.append(f"({time_column}, {id_column}) {'<' if direction == 'next' else '>'} (?, ?)")
+        args.extend(key)
+    order = 'DESC' if direction == 'next' else 'ASC'
+    where_clause = f" WHERE {' AND '.join(conditions)}" if conditions else ''
+    # 多取一行判断后面是否还有数据
+    rows = conn.execute(f"{select_sql}{where_clause} ORDER BY {time_column} {order}, {id_column} {order} LIMIT ?",
+                        args + [limit + 1]).fetchall()
+    rows = [dict(row) for row in rows]
+    more = len(rows) > limit
+    rows = rows[:limit]
+    if direction == 'next':
+        has_next, has_prev = more, key is not None
+    else:
+        rows.reverse()
+        has_next, has_prev = True, more
+    if not rows:
+        return rows, None, None
+    first, last = rows[0], rows[-1]
+    next_cursor = encode_cursor('next', last['collect_time'], last['id']) if has_next else None
+    prev_cursor = encode_cursor('prev', first['collect_time'], first['id']) if has_prev else None
+    return rows, next_cursor, prev_cursor
+
+
+class CountCache:
+    """按 (表, 筛选条件) 缓存精确总数，数据增删时由服务层调用 invalidate"""
+    def __init__(self, ttl=COUNT_CACHE_TTL):
+        self.ttl = ttl
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._values.get(key)
+        if entry is None or time.monotonic() - entry[1] > self.ttl:
+            return None
+        return entry[0]
+
+    def set(self, key, value):
+        with self._lock:
+            self._values[key] = (value, time.monotonic())
+
+    def invalidate(self, table=None):
+        with self._lock:
+            if table is None:
+                self._values.clear()
+            else:
+                for key in [key for key in self._values if key[0] == table]:
+                    del self._values[key]
+
+
+_count_cache = CountCache()
+
+
+def invalidate_counts(table=None):
+    _count_cache.invalidate(table)
+
+
+def table_count(conn, table):
+    """全表行数，与筛选计数共用缓存
+
+    不带条件的 COUNT(*) 按 B 树页计数，不逐行读取，代价很小；不能用主键跨度估算，
+    AUTOINCREMENT 的 id 会因删除和冲突写入留下空洞。
+    """
+    total = _count_cache.get((table, None))
+    if total is None:
+        total = conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+        _count_cache.set((table, None), total)
+    return total
+
+
+def count_rows(conn, table, alias, where, params, mode='cached', cache_key=None, known=None, exact=None):
+    """按 mode 计算 table（别名 alias）满足 where 的行数，返回 (total, 实际采用的模式)
+
+    known 为筛选时已经数出的精确总数（如全文检索命中很少），有则直接采用；
+    exact 为精确计数的替代实现（如直接在全文索引上计数），不传时对 where 执行 COUNT(*)。
+    """
+    if mode not in COUNT_MODES:
+        raise ValueError(f'count 参数应为 {" / ".join(COUNT_MODES)} 之一')
+    if mode == 'none':
+        return None, None
+    key = (table, cache_key)
+    if known is not None:
+        _count_cache.set(key, known)
+        return known, 'exact'
+    if mode != 'exact':
+        cached = _count_cache.get(key)
+        if cached is not None:
+            return cached, 'cached'
+    where_clause = f" WHERE {' AND '.join(where)}" if where else ''
+
+    if mode == 'estimate':
+        table_total = table_count(conn, table)
+        if not where:
+            return table_total, 'exact'
+        # 最近 ESTIMATE_SAMPLE 行中的命中比例折算到全表
+        sample = conn.execute(f'''
+            SELECT COUNT(*), SUM(CASE WHEN {' AND '.join(where)} THEN 1 ELSE 0 END)
+            FROM (SELECT * FROM {table} ORDER BY id DESC LIMIT ?) {alias}
+        ''', list(params) + [ESTIMATE_SAMPLE]).fetchone()
+        if sample[0] >= table_total:
+            _count_cache.set(key, sample[1] or 0)
+            return sample[1] or 0, 'exact'
+        return round((sample[1] or 0) * table_total / sample[0]), 'estimate'
+
+    if exact is not None:
+        total = exact()
+    else:
+        total = conn.execute(f'SELECT COUNT(*) FROM {table} {alias}{where_clause}', params).fetchone()[0]
+    _count_cache.set(key, total)
+    return total, 'exact'
+
+
+def clamp_limit(limit):
+    return max(1, min(MAX_LIMIT, limit or 10))
@@ -0,0 +1,92 @@
+import re
+import hashlib
+from collections import Counter
+
+FINGERPRINT_BITS = 64
+# 分 4 段，每段 16 位：汉明距离不超过 3 的两个指纹至少有一段完全相同
+BANDS = 4
+BAND_BITS = FINGERPRINT_BITS // BANDS
+# 正文过短时指纹不可靠，不参与去重
+MIN_TEXT_CHARS = 80
+
+_NOISE_RE = re.compile(r'[\s\d０-９:：/\-.,，。、；;！!？?“”"\'‘’()（）【】\[\]《》<>|]+')
+
+
+def _shingles(text, size=3):
+    """去掉空白、数字与标点后按字符 n-gram 切片（中文无需分词）"""
+    text = _NOISE_RE.sub('', text.lower())
+    if len(text) <= size:
+        return Counter([text]) if text else Counter()
+    return Counter(text[i:i + size] for i in range(len(text) - size + 1))
+
+
+def simhash(text):
+    """计算 64 位 SimHash 指纹；文本过短返回 None"""
+    if not text or len(text) < MIN_TEXT_CHARS:
+        return None
+    weights = [0] * FINGERPRINT_BITS
+    for shingle, count in _shingles(text).items():
+        h = int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'big')
+        for bit in range(FINGERPRINT_BITS):
+            if h >> bit & 1:
+                weights[bit] += count
+            else:
+                weights[bit] -= count
+    value = 0
+    for bit, weight in enumerate(weights):
+        if weight > 0:
+            value |= 1 << bit
+    return value
+
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+
+def to_signed(value):
+    """SQLite INTEGER 为有符号 64 位，入库前转换"""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def to_unsigned(value):
+    return value + (1 << 64) if value < 0 else value
+
+
+def bands(value):
+    """切成 BANDS 段，返回 [(段号, 段值)]"""
+    mask = (1 << BAND_BITS) - 1
+    return [(i, value >> (i * BAND_BITS) & mask) for i in range(BANDS)]
+
+
+class SimHashIndex:
+    """持久化的分段 SimHash 索引（simhash_index 表），用于查找近似重复的已提炼文章
+
+    每篇文章按 4 段写入 4 行；查询时任一段相同即为候选，再按完整指纹的汉明距离过滤。
+    """
+    def __init__(self, max_distance=3):
+        self.max_distance = max_distance
+
+    def add(self, conn, source_id, fingerprint):
+        conn.executemany('INSERT OR IGNORE INTO simhash_index (band, band_value, source_id) VALUES (?, ?, ?)',
+                         [(band, value, source_id) for band, value in bands(fingerprint)])
+
+    def remove(self, conn, source_ids):
+        conn.executemany('DELETE FROM simhash_index WHERE source_id = ?', [(sid,) for sid in source_ids])
+
+    def find(self, conn, fingerprint, exclude_source_id=None):
+        """返回汉明距离最小（相同时取最早）的近似重复 (source_id, 距离)，没有返回 None"""
+        clauses = ' OR '.join(['(i.band = ? AND i.band_value = ?)'] * BANDS)
+        params = [v for pair in bands(fingerprint) for v in pair]
+        rows = conn.execute(f'''
+            SELECT DISTINCT d.source_id, d.simhash
+            FROM simhash_index i JOIN deep_collected_data d ON d.source_id = i.source_id
+            WHERE ({clauses}) AND d.simhash IS NOT NULL AND d.duplicate_of IS NULL
+        ''', params).fetchall()
+        best = None
+        for row in rows:
+            if row['source_id'] == exclude_source_id:
+                continue
+            distance = hamming(fingerprint, to_unsigned(row['simhash']))
+            if distance <= self.max_distance and (best is None or (distance, row['source_id']) < best[::-1]):
+                best = (row['source_id'], distance)
+        return best
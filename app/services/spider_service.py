@@ -1,4 +1,3 @@
-import sqlite3
 import os
 import sys
 import json
@@ -7,16 +6,17 @@ from datetime import datetime
 # Import the BaiduSpider from the dist directory
 # We need to add the project root to sys.path to import from dist
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
-from dist.baidusearch.search_cli import BaiduSpider
+from app.db import get_connection
+from app.services.fulltext import COLLECTED_INDEX
+from app.services.pagination import keyset_page, count_rows, invalidate_counts
+from dist.baidusearch.search_cli import build_spider
 
 class SpiderService:
     def __init__(self, db_path):
         self.db_path = db_path
 
     def _get_connection(self):
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        return conn
+        return get_connection(self.db_path)
 
     def get_all_crawlers(self):
         conn = self._get_connection()
@@ -39,78 +39,175 @@ class SpiderService:
         conn.commit()
         conn.close()
 
-    def run_baidu_spider(self, crawler_id, keyword, limit=10):
+    def run_baidu_spider(self, crawler_id, keyword, limit=10, on_item=None):
+        """执行采集并入库；on_item(count, item) 在每条结果到达时回调，用于上报进度"""
         # Update status to running
         conn = self._get_connection()
+        crawler = conn.execute('SELECT config FROM crawlers WHERE id = ?', (crawler_id,)).fetchone()
         conn.execute('UPDATE crawlers SET status = ?, last_run = ? WHERE id = ?', ('运行中', datetime.now(), crawler_id))
         conn.commit()
         
         try:
-            spider = BaiduSpider()
-            results = spider.search(keyword, limit=limit)
+            # 限速等参数取自爬虫的 config 列
+            spider = build_spider('baidu', crawler['config'] if crawler else None)
+            # 先完成网络采集再统一写库，避免采集期间长时间占用写锁
+            results = []
+            for item in spider.search(keyword, limit=limit):
+                results.append(item)
+                if on_item:
+                    on_item(len(results), item)
             
-            # Save results to collected_data
-            for item in results:
-                conn.execute('''
-                    INSERT INTO collected_data (title, url, description, source)
-                    VALUES (?, ?, ?, ?)
-                ''', (item['title'], item['url'], item['description'], item['source']))
+            # 批量写入（URL 已存在则更新），与爬虫状态、统计量在同一事务内提交
+            conn.execute('BEGIN IMMEDIATE')
+            self._upsert_items(conn, results)
             
             # Update status back to idle
             conn.execute('UPDATE crawlers SET status = ? WHERE id = ?', ('可用', crawler_id))
-            
-            # Update system stats (increment total data)
-            current_stats = conn.execute('SELECT metric_value FROM system_stats WHERE metric_name = ?', ('total_data',)).fetchone()
-            if current_stats:
-                try:
-                    # Remove commas for calculation
-                    current_val = int(current_stats['metric_value'].replace(',', ''))
-                    new_val = current_val + len(results)
-                    # Format back with commas
-                    formatted_val = "{:,}".format(new_val)
-                    conn.execute('UPDATE system_stats SET metric_value = ? WHERE metric_name = ?', (formatted_val, 'total_data'))
-                except:
-                    pass
 
             conn.commit()
+            invalidate_counts('collected_data')
             return len(results)
         except Exception as e:
+            # 写入失败时整批回滚，只记录爬虫异常状态
+            conn.rollback()
             conn.execute('UPDATE crawlers SET status = ? WHERE id = ?', ('异常', crawler_id))
             conn.commit()
             raise e
         finally:
             conn.close()
 
-    def get_collected_data(self, keyword=None, page=1, per_page=10):
+    def save_items(self, items):
+        """批量保存采集结果：URL 已存在的更新标题、描述与采集时间，其余新增
+
+        整批在一个事务内完成，返回 (新增条数, 更新条数)；同一批内重复的 URL 只计一次。
+        """
         conn = self._get_connection()
-        query_base = """
-            FROM collected_data c 
-            LEFT JOIN deep_collected_data d ON c.id = d.source_id
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            added, updated = self._upsert_items(conn, items)
+            conn.commit()
+        finally:
+            conn.close()
+        invalidate_counts('collected_data')
+        return added, updated
+
+    @staticmethod
+    def _upsert_items(conn, items):
+        """在调用方已开启的写事务内批量写入，并累加 total_data 统计量
+
+        先按 URL 批量 UPDATE 已有行，再只插入库中还没有的 URL，新增 / 更新条数分别取自 INSERT 与
+        UPDATE 的 rowcount。不用 INSERT ... ON CONFLICT 或 INSERT OR IGNORE：两者遇到冲突时也会消耗
+        AUTOINCREMENT 序号，反复采集同一批 URL 会让 id 留下越来越多空洞。
+        同一批内重复的 URL 先合并为一行（标题、描述取最后一次，来源取第一次），只计一次。
         """
-        where_clause = ""
-        params = []
-        
-        if keyword:
-            where_clause = " WHERE c.title LIKE ? OR c.description LIKE ? OR c.url LIKE ?"
-            like_val = f"%{keyword}%"
-            params.extend([like_val, like_val, like_val])
-            
-        # Get total count
-        count_query = f"SELECT COUNT(*) {query_base} {where_clause}"
-        total_count = conn.execute(count_query, params).fetchone()[0]
-        
-        query = f"SELECT c.*, d.id as deep_data_id {query_base} {where_clause} ORDER BY c.collect_time DESC LIMIT ? OFFSET ?"
-        params.extend([per_page, (page - 1) * per_page])
-        
-        data = conn.execute(query, params).fetchall()
-        conn.close()
-        return [dict(row) for row in data], total_count
+        if not items:
+            return 0, 0
+        merged = {}
+        for item in items:
+            row = merged.get(item['url'])
+            if row is None:
+                merged[item['url']] = [item['title'], item['url'], item.get('description'), item.get('source')]
+            else:
+                row[0], row[2] = item['title'], item.get('description')
+        rows = list(merged.values())
+        updated = conn.executemany('''
+            UPDATE collected_data SET title = ?, description = ?, collect_time = CURRENT_TIMESTAMP
+            WHERE url = ?
+        ''', [(title, description, url) for title, url, description, _ in rows]).rowcount
+        added = conn.executemany('''
+            INSERT INTO collected_data (title, url, description, source)
+            SELECT ?, ?, ?, ? WHERE NOT EXISTS (SELECT 1 FROM collected_data WHERE url = ?)
+        ''', [(title, url, description, source, url) for title, url, description, source in rows]).rowcount
+
+        # 仅针对新增条数更新系统统计量
+        if added:
+            current_stats = conn.execute('SELECT metric_value FROM system_stats WHERE metric_name = ?', ('total_data',)).fetchone()
+            if current_stats:
+                try:
+                    current_val = int(current_stats['metric_value'].replace(',', ''))
+                    formatted_val = "{:,}".format(current_val + added)
+                    conn.execute('UPDATE system_stats SET metric_value = ? WHERE metric_name = ?', (formatted_val, 'total_data'))
+                except (AttributeError, ValueError):
+                    pass
+        return added, updated
+
+    @staticmethod
+    def _collected_filter(conn, keyword, fulltext):
+        """返回 (where, params, matched, exact)：筛选条件、全文检索命中少时已数出的总数与索引计数函数"""
+        if not keyword:
+            return [], [], None, None
+        if fulltext:
+            where, params, matched = COLLECTED_INDEX.time_filter(conn, keyword, 'c.id')
+            return [where], params, matched, lambda: COLLECTED_INDEX.count(conn, keyword)
+        like_val = f"%{keyword}%"
+        return ["(c.title LIKE ? OR c.description LIKE ? OR c.url LIKE ?)"], [like_val, like_val, like_val], None, None
+
+    def get_collected_data(self, keyword=None, page=1, per_page=10, count='cached'):
+        """按页码分页（兼容接口）；关键词可走全文索引时按相关度排序并附带高亮摘要"""
+        conn = self._get_connection()
+        try:
+            fulltext = COLLECTED_INDEX.usable(keyword) and COLLECTED_INDEX.exists(conn)
+            where, params, matched, exact = self._collected_filter(conn, keyword, fulltext)
+            total_count, _ = count_rows(conn, 'collected_data', 'c', where, params, count,
+                                        cache_key=keyword or None, known=matched, exact=exact)
+            if fulltext:
+                ids = COLLECTED_INDEX.ranked_ids(conn, keyword, per_page, (page - 1) * per_page, matched)
+                if not ids:
+                    return [], total_count
+                rows = conn.execute(f"""
+                    SELECT c.*, d.id as deep_data_id
+                    FROM collected_data c
+                    LEFT JOIN deep_collected_data d ON c.id = d.source_id
+                    WHERE c.id IN ({','.join(['?'] * len(ids))})
+                """, ids).fetchall()
+                by_id = {row['id']: dict(row) for row in rows}
+                snippets = COLLECTED_INDEX.snippets(conn, keyword, ids)
+                return [dict(by_id[i], snippet=snippets.get(i)) for i in ids if i in by_id], total_count
+
+            where_clause = f" WHERE {where[0]}" if where else ""
+            query = f"""
+                SELECT c.*, d.id as deep_data_id
+                FROM collected_data c
+                LEFT JOIN deep_collected_data d ON c.id = d.source_id
+                {where_clause} ORDER BY c.collect_time DESC, c.id DESC LIMIT ? OFFSET ?
+            """
+            data = conn.execute(query, params + [per_page, (page - 1) * per_page]).fetchall()
+            return [dict(row) for row in data], total_count
+        finally:
+            conn.close()
+
+    def get_collected_data_by_cursor(self, keyword=None, cursor=None, limit=10, count='estimate'):
+        """游标分页：按 (采集时间, id) 倒序，翻到第几页代价都相同
+
+        关键词可走全文索引时用索引筛选（仍按时间排序）并附带高亮摘要。
+        返回 {"data", "next_cursor", "prev_cursor", "total", "total_mode"}，cursor 无效时抛出 ValueError。
+        """
+        conn = self._get_connection()
+        try:
+            fulltext = COLLECTED_INDEX.usable(keyword) and COLLECTED_INDEX.exists(conn)
+            where, params, matched, exact = self._collected_filter(conn, keyword, fulltext)
+            data, next_cursor, prev_cursor = keyset_page(conn, """
+                SELECT c.*, d.id as deep_data_id
+                FROM collected_data c
+                LEFT JOIN deep_collected_data d ON c.id = d.source_id
+            """, where, params, 'c.collect_time', 'c.id', cursor, limit)
+            if fulltext:
+                snippets = COLLECTED_INDEX.snippets(conn, keyword, [row['id'] for row in data])
+                for row in data:
+                    row['snippet'] = snippets.get(row['id'])
+            total, total_mode = count_rows(conn, 'collected_data', 'c', where, params, count,
+                                           cache_key=keyword or None, known=matched, exact=exact)
+        finally:
+            conn.close()
+        return {"data": data, "next_cursor": next_cursor, "prev_cursor": prev_cursor,
+                "total": total, "total_mode": total_mode}
 
     def delete_data(self, data_id):
         conn = self._get_connection()
         conn.execute('DELETE FROM collected_data WHERE id = ?', (data_id,))
         conn.commit()
         conn.close()
+        invalidate_counts('collected_data')
 
     def batch_delete_data(self, data_ids):
         if not data_ids:
@@ -120,3 +217,4 @@ class SpiderService:
         conn.execute(f'DELETE FROM collected_data WHERE id IN ({placeholders})', data_ids)
         conn.commit()
         conn.close()
+        invalidate_counts('collected_data')
@@ -0,0 +1,76 @@
+import re
+import math
+
+# 中日韩文字及全角标点
+_CJK_RE = re.compile(r'[　-〿㐀-䶿一-鿿＀-￯]')
+# 句末标点，超长段落按句切分
+_SENTENCE_RE = re.compile(r'(?<=[。！？；!?;])')
+
+# 经验系数：常见中文模型约 0.6 token/汉字，英文约 4 字符/token
+CJK_TOKENS_PER_CHAR = 0.6
+CHARS_PER_TOKEN = 4.0
+# 单次调用送入的正文 token 上限（ai_models.max_input_tokens 未设置时使用）
+DEFAULT_MAX_INPUT_TOKENS = 3000
+
+
+def estimate_tokens(text, cjk_ratio=CJK_TOKENS_PER_CHAR):
+    """本地估算文本 token 数（不依赖具体分词器，误差在一成左右）"""
+    if not text:
+        return 0
+    cjk = len(_CJK_RE.findall(text))
+    other = len(text) - cjk
+    return int(math.ceil(cjk * cjk_ratio + other / CHARS_PER_TOKEN))
+
+
+class TokenBudget:
+    """按模型配置的 token 预算：估算正文长度，超出预算时按段落/句子切块"""
+    def __init__(self, max_input_tokens=DEFAULT_MAX_INPUT_TOKENS, cjk_ratio=CJK_TOKENS_PER_CHAR):
+        self.max_input_tokens = max_input_tokens or DEFAULT_MAX_INPUT_TOKENS
+        self.cjk_ratio = cjk_ratio or CJK_TOKENS_PER_CHAR
+
+    @classmethod
+    def from_model(cls, model):
+        """从 ai_models 行读取 max_input_tokens / cjk_token_ratio，缺省时用默认值"""
+        return cls(model.get('max_input_tokens'), model.get('cjk_token_ratio'))
+
+    def estimate(self, text):
+        return estimate_tokens(text, self.cjk_ratio)
+
+    def fits(self, text):
+        return self.estimate(text) <= self.max_input_tokens
+
+    def _pieces(self, text):
+        """拆成不超过预算的最小片段：先按行，超长的行按句，超长的句子硬切"""
+        for line in text.split('\n'):
+            line = line.strip()
+            if not line:
+                continue
+            if self.fits(line):
+                yield line
+                continue
+            for sentence in _SENTENCE_RE.split(line):
+                if not sentence:
+                    continue
+                while not self.fits(sentence):
+                    # 按估算比例硬切，保证每段都在预算内
+                    cut = max(1, int(len(sentence) * self.max_input_tokens / self.estimate(sentence)))
+                    yield sentence[:cut]
+                    sentence = sentence[cut:]
+                if sentence:
+                    yield sentence
+
+    def split(self, text):
+        """把正文切成若干块，每块估算 token 数不超过 max_input_tokens"""
+        chunks = []
+        current = []
+        used = 0
+        for piece in self._pieces(text):
+            cost = self.estimate(piece) + 1
+            if current and used + cost > self.max_input_tokens:
+                chunks.append('\n'.join(current))
+                current, used = [], 0
+            current.append(piece)
+            used += cost
+        if current:
+            chunks.append('\n'.join(current))
+        return chunks
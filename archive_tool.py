@@ -0,0 +1,73 @@
+"""原始网页归档维护工具
+
+用法:
+  python archive_tool.py stats                          查看归档磁盘占用
+  python archive_tool.py purge --days 90 [--all]        删除 90 天前的抓取记录（默认保留每条数据最近一次）
+  python archive_tool.py compact                        回收已删除内容占用的段文件空间
+  python archive_tool.py reprocess --model-id 1 [--ids 1,2,3] [--workers 4] [--batch]
+                                                        从归档离线重新清洗、提炼，不访问网络
+"""
+import argparse
+import json
+import os
+
+from app.services.html_archive import get_default_archive
+
+DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data.db')
+
+
+def reprocess(args):
+    from app.services.deep_crawl_service import DeepCrawlService
+
+    service = DeepCrawlService(DB_PATH)
+    service.PARSE_WORKERS = args.workers
+    service.LLM_WORKERS = args.workers
+    model = service.get_ai_model(args.model_id)
+    if not model:
+        print("未找到可用的 AI 模型")
+        return
+
+    if args.ids:
+        source_ids = [int(sid) for sid in args.ids.split(',') if sid]
+    else:
+        source_ids = service.archive.archived_source_ids()
+    total = len(source_ids)
+    print(f"重新处理 {total} 条（模型: {model['name']}，并发: {args.workers}）")
+
+    counts = {}
+    for done, event in enumerate(service.iter_deep_crawl(source_ids, model, batch=args.batch, offline=True), 1):
+        counts[event['result']] = counts.get(event['result'], 0) + 1
+        print(f"[{done}/{total}] {event['result']:<9} {event['title'] or event['source_id']}")
+    print(json.dumps(counts, ensure_ascii=False))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="原始网页归档维护工具")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("stats")
+    purge = sub.add_parser("purge")
+    purge.add_argument("--days", type=int, required=True)
+    purge.add_argument("--all", action="store_true", help="连同每条数据最近一次抓取也一并删除")
+    compact = sub.add_parser("compact")
+    compact.add_argument("--min-garbage", type=float, default=0.3)
+    rep = sub.add_parser("reprocess")
+    rep.add_argument("--model-id", type=int, default=None)
+    rep.add_argument("--ids", type=str, default=None)
+    rep.add_argument("--workers", type=int, default=4)
+    rep.add_argument("--batch", action="store_true", help="短文章合并提炼")
+    args = parser.parse_args()
+
+    archive = get_default_archive()
+    if args.command == "stats":
+        print(json.dumps(archive.stats(), ensure_ascii=False, indent=2))
+    elif args.command == "purge":
+        removed = archive.purge(args.days, keep_latest=not args.all)
+        print(f"删除抓取记录 {removed} 条，执行 compact 回收空间")
+    elif args.command == "compact":
+        print(f"回收 {archive.compact(args.min_garbage) / 1024 / 1024:.2f} MB")
+    elif args.command == "reprocess":
+        reprocess(args)
+
+
+if __name__ == '__main__':
+    main()
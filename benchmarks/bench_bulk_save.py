@@ -0,0 +1,104 @@
+"""采集结果批量保存基准测试
+
+在临时数据库中分别用逐条保存（先 SELECT 再 INSERT / UPDATE，原 /data/save 的写法）与
+SpiderService.save_items（executemany 批量 UPDATE 后只插入新 URL，单事务）保存 --items 条
+结果，先全部新增、再全部更新，输出耗时并校验两种方式的新增 / 更新条数与统计量一致。
+
+用法: python benchmarks/bench_bulk_save.py [--items 10000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app.db import get_connection
+from app.migrations import migrate
+from app.services.spider_service import SpiderService
+
+
+def make_items(count, round_no):
+    return [{'title': f'新闻标题 {i} 第{round_no}轮', 'url': f'https://news.example.com/{i}.html',
+             'description': f'摘要 {i}', 'source': '百度搜索爬虫'} for i in range(count)]
+
+
+def legacy_save(db_path, items):
+    """逐条保存：每条一次 SELECT 加一次 INSERT / UPDATE"""
+    conn = get_connection(db_path)
+    added = updated = 0
+    try:
+        for item in items:
+            existing = conn.execute('SELECT id FROM collected_data WHERE url = ?', (item['url'],)).fetchone()
+            if existing:
+                conn.execute('''
+                    UPDATE collected_data SET title = ?, description = ?, collect_time = CURRENT_TIMESTAMP
+                    WHERE id = ?
+                ''', (item['title'], item['description'], existing['id']))
+                updated += 1
+            else:
+                conn.execute('INSERT INTO collected_data (title, url, description, source) VALUES (?, ?, ?, ?)',
+                             (item['title'], item['url'], item['description'], item['source']))
+                added += 1
+        if added:
+            row = conn.execute("SELECT metric_value FROM system_stats WHERE metric_name = 'total_data'").fetchone()
+            conn.execute("UPDATE system_stats SET metric_value = ? WHERE metric_name = 'total_data'",
+                         ("{:,}".format(int(row['metric_value'].replace(',', '')) + added),))
+        conn.commit()
+    finally:
+        conn.close()
+    return added, updated
+
+
+def total_data(db_path):
+    conn = get_connection(db_path)
+    try:
+        return conn.execute("SELECT metric_value FROM system_stats WHERE metric_name = 'total_data'").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def new_db(tmpdir, name):
+    db_path = os.path.join(tmpdir, name)
+    migrate(db_path)
+    conn = get_connection(db_path)
+    conn.execute("INSERT INTO system_stats (metric_name, metric_value) VALUES ('total_data', '0')")
+    conn.commit()
+    conn.close()
+    return db_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="采集结果批量保存基准测试")
+    parser.add_argument("--items", type=int, default=10000)
+    args = parser.parse_args()
+
+    failed = False
+    with tempfile.TemporaryDirectory() as tmpdir:
+        legacy_db = new_db(tmpdir, 'legacy.db')
+        bulk_db = new_db(tmpdir, 'bulk.db')
+        service = SpiderService(bulk_db)
+
+        print(f"{'场景':<8}{'逐条保存':>12}{'批量写入':>14}{'加速':>8}")
+        for round_no, label in ((1, '全部新增'), (2, '全部更新')):
+            items = make_items(args.items, round_no)
+            start = time.perf_counter()
+            legacy_result = legacy_save(legacy_db, items)
+            legacy_s = time.perf_counter() - start
+            start = time.perf_counter()
+            bulk_result = service.save_items(items)
+            bulk_s = time.perf_counter() - start
+            print(f"{label:<8}{legacy_s:10.3f}s{bulk_s:12.3f}s{legacy_s / bulk_s:7.1f}x")
+            if legacy_result != bulk_result:
+                failed = True
+                print(f"  [不一致] 逐条保存 新增/更新 {legacy_result}，批量写入 {bulk_result}")
+
+        if total_data(legacy_db) != total_data(bulk_db):
+            failed = True
+            print(f"  [不一致] total_data 统计量 {total_data(legacy_db)} / {total_data(bulk_db)}")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+"""全文检索基准测试
+
+在临时数据库中生成 --rows 条合成的中文采集数据（默认 100 万条），经迁移建好 FTS5
+索引后批量写入（由触发器同步索引），再对每个查询词分别测量“计数 + 取第一页”的 p50 / p95 延迟：
+- 相关度：SpiderService.get_collected_data（BM25 排序 + 摘要，精确计数）；
+- 时间序：SpiderService.get_collected_data_by_cursor（按采集时间倒序 + 摘要，估算计数）；
+- LIKE：原先的 LIKE '%关键词%'（精确计数 + 按时间倒序取一页）。
+每轮都清掉总数缓存，计入计数本身的代价；并校验全文检索与 LIKE 的命中条数一致。
+
+用法: python benchmarks/bench_fulltext.py [--rows 1000000] [--rounds 20] [--db PATH]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app.db import get_connection
+from app.migrations import migrate
+from app.services.fulltext import COLLECTED_INDEX, fts5_available
+from app.services.pagination import invalidate_counts
+from app.services.spider_service import SpiderService
+
+TOPICS = ['人工智能', '新能源汽车', '半导体', '数据安全', '云计算', '大模型', '低空经济',
+          '跨境电商', '光伏储能', '生物医药', '智能制造', '数字政务', '量子计算', '卫星互联网']
+WORDS = ['发布', '报告', '政策', '市场', '企业', '研究', '增长', '技术', '行业', '投资', '合作',
+         '项目', '平台', '应用', '标准', '监管', '创新', '产业链', '趋势', '分析', '会议', '专家']
+# 前几个为高频词（命中约三成），项目编号为低频词（命中个位数），最后两个无命中
+QUERIES = ['人工智能', '产业链', '量子计算', '项目编号01234', '项目编号4242', '数字政务 报告', '不存在的关键词']
+PAGE_SIZE = 10
+
+
+def fake_row(rng, i):
+    topic = rng.choice(TOPICS)
+    title = topic + ''.join(rng.choice(WORDS) for _ in range(4))
+    description = '，'.join(rng.choice(TOPICS) + ''.join(rng.choice(WORDS) for _ in range(3))
+                           for _ in range(4)) + f'，项目编号{rng.randrange(100000):05d}'
+    return (title, f'https://news.example.com/{i}.html', description, '百度搜索爬虫')
+
+
+def populate(conn, rows, batch=20000):
+    rng = random.Random(42)
+    start = time.perf_counter()
+    for offset in range(0, rows, batch):
+        conn.executemany('INSERT INTO collected_data (title, url, description, source) VALUES (?, ?, ?, ?)',
+                         [fake_row(rng, i) for i in range(offset, min(rows, offset + batch))])
+        conn.commit()
+    return time.perf_counter() - start
+
+
+def percentile(samples, p):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * p))]
+
+
+def run_ranked(service, keyword):
+    return service.get_collected_data(keyword, per_page=PAGE_SIZE, count='exact')[1]
+
+
+def run_cursor(service, keyword):
+    return service.get_collected_data_by_cursor(keyword, limit=PAGE_SIZE, count='estimate')['total']
+
+
+def run_like(service, keyword):
+    pattern = f'%{keyword}%'
+    where = 'title LIKE ? OR description LIKE ? OR url LIKE ?'
+    conn = get_connection(service.db_path)
+    try:
+        total = conn.execute(f'SELECT COUNT(*) FROM collected_data WHERE {where}', (pattern,) * 3).fetchone()[0]
+        conn.execute(f'SELECT id FROM collected_data WHERE {where} ORDER BY collect_time DESC LIMIT ?',
+                     (pattern,) * 3 + (PAGE_SIZE,)).fetchall()
+    finally:
+        conn.close()
+    return total
+
+
+def bench(func, service, keyword, rounds):
+    samples = []
+    for _ in range(rounds):
+        invalidate_counts()
+        start = time.perf_counter()
+        total = func(service, keyword)
+        samples.append((time.perf_counter() - start) * 1000)
+    return total, percentile(samples, 0.5), percentile(samples, 0.95)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="全文检索基准测试")
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--like-rounds", type=int, default=3, help="LIKE 全表扫描较慢，单独指定轮数")
+    parser.add_argument("--db", type=str, default=None, help="数据库路径（默认使用临时文件并在结束后删除）")
+    args = parser.parse_args()
+
+    tmpdir = None
+    db_path = args.db
+    if db_path is None:
+        tmpdir = tempfile.TemporaryDirectory()
+        db_path = os.path.join(tmpdir.name, 'bench.db')
+
+    migrate(db_path)
+    conn = get_connection(db_path)
+    try:
+        if not fts5_available(conn):
+            print("当前 SQLite 不支持 FTS5 trigram 分词，跳过")
+            return 0
+
+        existing = conn.execute('SELECT COUNT(*) FROM collected_data').fetchone()[0]
+        if existing < args.rows:
+            elapsed = populate(conn, args.rows - existing)
+            print(f"写入 {args.rows - existing} 条（含索引同步）耗时 {elapsed:.1f}s")
+            start = time.perf_counter()
+            COLLECTED_INDEX.rebuild(conn)
+            conn.commit()
+            print(f"重建索引耗时 {time.perf_counter() - start:.1f}s")
+            start = time.perf_counter()
+            COLLECTED_INDEX.optimize(conn)
+            conn.commit()
+            print(f"合并索引分段耗时 {time.perf_counter() - start:.1f}s")
+
+        service = SpiderService(db_path)
+        failed = False
+        print(f"{'查询词':<14}{'命中':>9}  {'相关度 p50':>10} {'p95':>9}  {'时间序 p50':>10} {'p95':>9}  "
+              f"{'LIKE p50':>10} {'p95':>10}")
+        for keyword in QUERIES:
+            fts_total, ranked_p50, ranked_p95 = bench(run_ranked, service, keyword, args.rounds)
+            _, cursor_p50, cursor_p95 = bench(run_cursor, service, keyword, args.rounds)
+            like_total, like_p50, like_p95 = bench(run_like, service, keyword, args.like_rounds)
+            print(f"{keyword:<14}{fts_total:>9}  {ranked_p50:8.2f}ms {ranked_p95:7.2f}ms  "
+                  f"{cursor_p50:8.2f}ms {cursor_p95:7.2f}ms  {like_p50:8.2f}ms {like_p95:8.2f}ms")
+            if fts_total != like_total:
+                failed = True
+                print(f"  [不一致] FTS 命中 {fts_total} 条，LIKE 命中 {like_total} 条")
+    finally:
+        conn.close()
+        if tmpdir is not None:
+            tmpdir.cleanup()
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
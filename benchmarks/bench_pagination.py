@@ -0,0 +1,90 @@
+"""列表分页基准测试
+
+在临时数据库中生成 --rows 条采集数据，分别用页码分页（LIMIT/OFFSET + 精确计数）与
+游标分页（(collect_time, id) 键集 + 估算计数）读取第 1 页和越来越深的页，输出每页耗时，
+并校验两种方式取到的行一致。
+
+用法: python benchmarks/bench_pagination.py [--rows 500000] [--per-page 20] [--rounds 5]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app.db import get_connection
+from app.migrations import migrate
+from app.services.pagination import invalidate_counts
+from app.services.spider_service import SpiderService
+
+
+def populate(conn, rows, batch=50000):
+    for offset in range(0, rows, batch):
+        conn.executemany('''
+            INSERT INTO collected_data (title, url, description, source, collect_time)
+            VALUES (?, ?, ?, ?, datetime('2026-01-01', ? || ' seconds'))
+        ''', [(f'新闻标题 {i}', f'https://news.example.com/{i}.html', '摘要', '百度搜索爬虫', i // 3)
+              for i in range(offset, min(rows, offset + batch))])
+        conn.commit()
+
+
+def timed(func, rounds):
+    best = None
+    for _ in range(rounds):
+        # 每轮清掉总数缓存，计入计数本身的代价
+        invalidate_counts()
+        start = time.perf_counter()
+        result = func()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="列表分页基准测试")
+    parser.add_argument("--rows", type=int, default=500000)
+    parser.add_argument("--per-page", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db_path = os.path.join(tmpdir, 'bench.db')
+        migrate(db_path)
+        conn = get_connection(db_path)
+        try:
+            start = time.perf_counter()
+            populate(conn, args.rows)
+            print(f"写入 {args.rows} 条耗时 {time.perf_counter() - start:.1f}s")
+        finally:
+            conn.close()
+
+        service = SpiderService(db_path)
+        last_page = max(1, args.rows // args.per_page)
+        depths = sorted({1, 10, 100, last_page // 10, last_page // 2, last_page} - {0})
+
+        # 顺着游标翻页，记下各目标页的起始游标
+        cursors, cursor = {}, None
+        for page in range(1, last_page + 1):
+            if page in depths:
+                cursors[page] = cursor
+            cursor = service.get_collected_data_by_cursor(cursor=cursor, limit=args.per_page, count='none')['next_cursor']
+
+        failed = False
+        print(f"{'页码':>8}  {'OFFSET+COUNT':>13}  {'游标+估算':>10}")
+        for page in depths:
+            (offset_rows, _), offset_ms = timed(
+                lambda: service.get_collected_data(page=page, per_page=args.per_page, count='exact'), args.rounds)
+            cursor_result, cursor_ms = timed(
+                lambda: service.get_collected_data_by_cursor(cursor=cursors[page], limit=args.per_page,
+                                                             count='estimate'), args.rounds)
+            print(f"{page:>8}  {offset_ms:11.2f}ms  {cursor_ms:8.2f}ms")
+            if [row['id'] for row in offset_rows] != [row['id'] for row in cursor_result['data']]:
+                failed = True
+                print(f"  [不一致] 第 {page} 页两种分页取到的行不同")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,62 @@
+"""结果页解析基准测试
+
+读取 benchmarks/fixtures/<engine>.html 中保存的各引擎结果页，分别用 BeautifulSoup
+与 lxml 两种解析后端重复解析，输出吞吐并校验两者提取的条目完全一致。
+
+用法: python benchmarks/bench_parsers.py [--rounds 200] [--fixtures DIR]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from dist.baidusearch.parsers import ENGINE_SELECTORS, PARSERS, get_parser
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def bench(parser, html, engine, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        items = parser.parse_items(html, engine)
+    return items, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="结果页解析基准测试")
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--fixtures", type=str, default=FIXTURE_DIR)
+    args = parser.parse_args()
+
+    backends = [get_parser(name) for name in ("bs4", "lxml") if name in PARSERS]
+    failed = False
+    for engine in ENGINE_SELECTORS:
+        path = os.path.join(args.fixtures, f"{engine}.html")
+        if not os.path.exists(path):
+            print(f"[跳过] 缺少样例文件 {path}")
+            continue
+        with open(path, encoding="utf-8") as f:
+            html = f.read()
+
+        results = {}
+        print(f"== {engine} ({len(html) / 1024:.1f} KB, {args.rounds} 轮)")
+        for backend in backends:
+            items, elapsed = bench(backend, html, engine, args.rounds)
+            results[backend.name] = items
+            print(f"  {backend.name:<5} {len(items):3d} 条  耗时 {elapsed:7.3f}s  "
+                  f"{args.rounds / elapsed:8.1f} 页/秒  {elapsed / args.rounds * 1000:6.2f} ms/页")
+
+        baseline = results.get("bs4")
+        for name, items in results.items():
+            if baseline is not None and items != baseline:
+                failed = True
+                print(f"  [不一致] {name} 与 bs4 的提取结果不同")
+        if "bs4" in results and "lxml" in results and not failed:
+            print("  两种后端提取结果一致")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
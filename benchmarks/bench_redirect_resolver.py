@@ -0,0 +1,82 @@
+"""跳转链接解析基准测试
+
+在本地启动一个模拟 www.baidu.com/link?url=... 的 302 跳转桩服务，
+对比逐条 HEAD 解析与 RedirectResolver 并发批量解析（冷缓存 / 热缓存）的吞吐。
+
+用法: python benchmarks/bench_redirect_resolver.py [--links 50] [--delay 0.1] [--workers 8]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import requests
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from dist.baidusearch.redirect_resolver import RedirectResolver, TTLCache
+
+
+def make_handler(delay):
+    class RedirectHandler(BaseHTTPRequestHandler):
+        def do_HEAD(self):
+            # 模拟百度跳转服务的网络往返耗时
+            time.sleep(delay)
+            target = parse_qs(urlparse(self.path).query).get('url', ['https://example.com/'])[0]
+            self.send_response(302)
+            self.send_header('Location', target)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+        def log_message(self, format, *args):
+            pass
+    return RedirectHandler
+
+
+def sequential_resolve(links):
+    results = []
+    for link in links:
+        res = requests.head(link, allow_redirects=False, timeout=5)
+        results.append(res.headers.get('Location', link))
+    return results
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="跳转链接解析基准测试")
+    parser.add_argument("--links", type=int, default=50)
+    parser.add_argument("--delay", type=float, default=0.1, help="桩服务每次跳转的模拟耗时(秒)")
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(args.delay))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}/link?url="
+    links = [f"{base}https://example.com/article/{i}" for i in range(args.links)]
+
+    try:
+        expected, seq_time = timed(sequential_resolve, links)
+
+        resolver = RedirectResolver(max_workers=args.workers, cache=TTLCache())
+        cold, cold_time = timed(resolver.resolve_batch, links)
+        warm, warm_time = timed(resolver.resolve_batch, links)
+    finally:
+        server.shutdown()
+
+    assert cold == expected and warm == expected, "批量解析结果与逐条解析不一致"
+
+    print(f"链接数: {args.links}, 单次跳转耗时: {args.delay * 1000:.0f}ms, 并发数: {args.workers}")
+    for name, elapsed in [("逐条解析", seq_time), ("并发批量(冷缓存)", cold_time), ("并发批量(热缓存)", warm_time)]:
+        rate = args.links / elapsed if elapsed > 0 else float('inf')
+        print(f"{name:<16} 耗时 {elapsed:8.3f}s  吞吐 {rate:10.1f} 条/秒  加速比 {seq_time / max(elapsed, 1e-9):8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
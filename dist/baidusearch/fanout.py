@@ -0,0 +1,85 @@
+# dist/baidusearch/fanout.py
+import queue
+import threading
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# 归一化时丢弃的跟踪参数
+TRACKING_PARAMS = {"from", "spm", "share_token", "wfr", "for", "fr"}
+
+_DONE = object()
+
+
+def canonical_url(url):
+    """URL 归一化：小写协议与主机、去掉默认端口、锚点、跟踪参数与末尾斜杠，查询参数排序"""
+    if not url:
+        return url
+    try:
+        parts = urlsplit(url.strip())
+    except ValueError:
+        return url
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and not ((scheme == "http" and parts.port == 80) or (scheme == "https" and parts.port == 443)):
+        host = f"{host}:{parts.port}"
+    path = parts.path or "/"
+    if len(path) > 1 and path.endswith("/"):
+        path = path.rstrip("/")
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+             if not k.lower().startswith("utm_") and k.lower() not in TRACKING_PARAMS]
+    # http/https 视为同一资源
+    return urlunsplit(("https" if scheme in ("http", "https") else scheme, host, path, urlencode(sorted(query)), ""))
+
+
+def fanout_search(spiders, keyword, limit=10, queue_size=100):
+    """多引擎并发检索，按到达顺序合并输出并按归一化 URL 实时去重
+
+    spiders: {引擎名: 爬虫实例}，每条结果附带 engine 字段。
+    引擎出错时输出 {"engine": ..., "error": ...} 后继续等待其余引擎。
+    """
+    results = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+
+    def put(entry):
+        # 消费方提前断开时不再阻塞工作线程
+        while not stop.is_set():
+            try:
+                results.put(entry, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def worker(engine, spider):
+        try:
+            for item in spider.search(keyword, limit=limit):
+                if not put((engine, item)):
+                    return
+        except Exception as e:
+            put((engine, e))
+        finally:
+            put((engine, _DONE))
+
+    threads = [threading.Thread(target=worker, args=(engine, spider), daemon=True)
+               for engine, spider in spiders.items()]
+    for t in threads:
+        t.start()
+
+    seen = set()
+    remaining = len(threads)
+    try:
+        while remaining:
+            engine, item = results.get()
+            if item is _DONE:
+                remaining -= 1
+                continue
+            if isinstance(item, Exception):
+                yield {"engine": engine, "error": str(item)}
+                continue
+            key = canonical_url(item.get("url"))
+            if key in seen:
+                continue
+            seen.add(key)
+            item["engine"] = engine
+            yield item
+    finally:
+        stop.set()
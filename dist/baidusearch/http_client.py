@@ -0,0 +1,231 @@
+# dist/baidusearch/http_client.py
+import time
+import threading
+from bisect import bisect_left
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# 各采集引擎的默认请求头
+ENGINE_HEADERS = {
+    "baidu": {
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36",
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
+        "Connection": "keep-alive",
+        "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8"
+    },
+    "baidu_news": {
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36"
+    },
+    "360": {
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36"
+    },
+    "deep": {
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+    }
+}
+
+# 延迟直方图分桶上界（毫秒），最后一档为溢出桶
+LATENCY_BUCKETS_MS = [50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+
+class HttpStats:
+    """HTTP 请求计数器：请求数、错误数、字节数与延迟直方图"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.bytes = 0
+        self.latency_total_ms = 0.0
+        self.histogram = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def record(self, latency_ms, nbytes=0, error=False):
+        with self._lock:
+            self.requests += 1
+            self.bytes += nbytes
+            self.latency_total_ms += latency_ms
+            self.histogram[bisect_left(LATENCY_BUCKETS_MS, latency_ms)] += 1
+            if error:
+                self.errors += 1
+
+    def add_bytes(self, nbytes):
+        """流式读取的响应在读完后补记字节数"""
+        with self._lock:
+            self.bytes += nbytes
+
+    def snapshot(self):
+        with self._lock:
+            labels = [f"<={b}ms" for b in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}ms"]
+            return {
+                "requests": self.requests,
+                "errors": self.errors,
+                "bytes": self.bytes,
+                "avg_latency_ms": round(self.latency_total_ms / self.requests, 2) if self.requests else 0,
+                "latency_histogram": dict(zip(labels, self.histogram))
+            }
+
+
+class HttpClient:
+    """共享 HTTP 客户端
+
+    按 host 维护带连接池的 requests.Session，同一站点的请求复用 TCP/TLS 连接
+    （也就省去了重复的 DNS 解析与握手），并统一处理重试退避与各引擎默认请求头。
+    单次请求可用 retries 覆盖默认重试次数（如深度采集传 0，由站点调度器负责退避），
+    不同重试策略使用各自的会话。会话数超过 max_hosts 时只关闭没有进行中请求的会话，
+    全部忙碌时暂时超出上限，等请求结束后再回收。
+    """
+    def __init__(self, pool_maxsize=20, max_hosts=200, retries=2, backoff_factor=0.3,
+                 status_forcelist=(500, 502, 503, 504)):
+        self.pool_maxsize = pool_maxsize
+        self.max_hosts = max_hosts
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.status_forcelist = status_forcelist
+        self.stats = HttpStats()
+        self._sessions = {}
+        self._inflight = {}
+        # 已关闭会话累计的连接计数，保证统计值不因回收会话而回退
+        self._closed_counts = [0, 0]
+        self._lock = threading.Lock()
+
+    def _build_session(self, retries):
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=self.backoff_factor,
+            status_forcelist=self.status_forcelist,
+            allowed_methods=frozenset(["GET", "HEAD"]),
+            raise_on_status=False,
+            respect_retry_after_header=True
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_maxsize, max_retries=retry)
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    @staticmethod
+    def _pool_counts(session):
+        """会话连接池的 (新建连接数, 复用已有连接发出的请求数)，取自 urllib3 连接池自身的计数"""
+        created = requests_sent = 0
+        pools = session.get_adapter("https://").poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is not None:
+                created += pool.num_connections
+                requests_sent += pool.num_requests
+        return created, requests_sent - created
+
+    def _close_session(self, key):
+        """关闭并移除会话，累计其连接计数（调用方持有锁）"""
+        session = self._sessions.pop(key)
+        self._inflight.pop(key, None)
+        created, reused = self._pool_counts(session)
+        self._closed_counts[0] += created
+        self._closed_counts[1] += reused
+        session.close()
+
+    def _evict_idle(self):
+        """会话数超过上限时按创建顺序关闭空闲会话（调用方持有锁）"""
+        for key in list(self._sessions):
+            if len(self._sessions) <= self.max_hosts:
+                return
+            if not self._inflight.get(key):
+                self._close_session(key)
+
+    def _checkout(self, url, retries=None):
+        """取出（必要时新建）站点会话并登记一个进行中的请求，返回 (key, session)"""
+        if retries is None:
+            retries = self.retries
+        parts = urlsplit(url)
+        key = (f"{parts.scheme}://{parts.netloc}".lower(), retries)
+        with self._lock:
+            session = self._sessions.get(key)
+            self._inflight[key] = self._inflight.get(key, 0) + 1
+            if session is None:
+                session = self._build_session(retries)
+                self._sessions[key] = session
+                self._evict_idle()
+            return key, session
+
+    def _checkin(self, key):
+        with self._lock:
+            if key in self._inflight:
+                self._inflight[key] -= 1
+            self._evict_idle()
+
+    def request(self, method, url, engine=None, headers=None, retries=None, **kwargs):
+        merged = dict(ENGINE_HEADERS.get(engine, {}))
+        if headers:
+            merged.update(headers)
+        key, session = self._checkout(url, retries)
+        start = time.perf_counter()
+        try:
+            resp = session.request(method, url, headers=merged, **kwargs)
+            nbytes = 0 if kwargs.get("stream") else len(resp.content)
+        except Exception:
+            self.stats.record((time.perf_counter() - start) * 1000, error=True)
+            raise
+        finally:
+            self._checkin(key)
+        self.stats.record((time.perf_counter() - start) * 1000, nbytes)
+        return resp
+
+    def get(self, url, engine=None, **kwargs):
+        return self.request("GET", url, engine=engine, **kwargs)
+
+    def head(self, url, engine=None, **kwargs):
+        return self.request("HEAD", url, engine=engine, **kwargs)
+
+    def _connection_counts(self):
+        """所有站点连接池累计的 (新建连接数, 复用连接发出的请求数)，含已回收的会话"""
+        with self._lock:
+            sessions = list(self._sessions.values())
+            created, reused = self._closed_counts
+        for session in sessions:
+            counts = self._pool_counts(session)
+            created += counts[0]
+            reused += counts[1]
+        return created, reused
+
+    def get_stats(self):
+        data = self.stats.snapshot()
+        new_connections, reused_connections = self._connection_counts()
+        with self._lock:
+            data["hosts"] = len({key[0] for key in self._sessions})
+        data["new_connections"] = new_connections
+        # 在已有连接上发出的请求数（含 urllib3 内部重试与重定向），由连接池计数得出
+        data["reused_connections"] = reused_connections
+        return data
+
+    def close(self):
+        with self._lock:
+            for key in list(self._sessions):
+                self._close_session(key)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_http_client():
+    """进程内共享的 HTTP 客户端"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HttpClient()
+        return _client
+
+
+def configure_http_client(**kwargs):
+    """按新参数（连接池大小、重试次数等）重建共享客户端"""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+        _client = HttpClient(**kwargs)
+        return _client
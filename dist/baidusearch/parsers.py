@@ -0,0 +1,192 @@
+# dist/baidusearch/parsers.py
+import os
+import re
+import threading
+
+from bs4 import BeautifulSoup
+
+try:
+    from lxml import etree
+except ImportError:
+    etree = None
+
+# 各引擎结果页的选择器（CSS 写法）。列表表示按顺序回退，取第一个命中的节点。
+ENGINE_SELECTORS = {
+    "baidu": {
+        "items": "div.c-container",
+        "title": "h3 a",
+        "img": ["img.c-img", ".c-span6 img", ".c-span3 img"],
+        "desc": ["div.c-abstract", ".content-right_8Zs40"]
+    },
+    "baidu_news": {
+        "items": ".result-op.news",
+        "title": "h3 a",
+        "img": [".c-img img"],
+        "desc": [".c-font-normal.c-color-text"],
+        "source_name": [".c-color-gray.c-font-normal"]
+    },
+    "360": {
+        "items": ".res-list",
+        "title": "h3 a",
+        "img": [".res-img img", "img"],
+        "desc": [".res-desc", ".res-rich"]
+    }
+}
+
+_COMPOUND_RE = re.compile(r'^([a-zA-Z0-9]*)((?:\.[\w-]+)*)$')
+
+
+def css_to_xpath(selector, relative=True):
+    """把仅由标签、类名和后代组合符构成的简单 CSS 选择器转换为 XPath"""
+    steps = []
+    for compound in selector.split():
+        m = _COMPOUND_RE.match(compound)
+        if not m:
+            raise ValueError(f"不支持的选择器: {selector}")
+        tag, classes = m.group(1) or "*", m.group(2)
+        preds = "".join(
+            f"[contains(concat(' ', normalize-space(@class), ' '), ' {c} ')]"
+            for c in classes.split(".") if c
+        )
+        steps.append(f"{tag}{preds}")
+    return (".//" if relative else "//") + "//".join(steps)
+
+
+def _normalize_img(url):
+    url = url or ""
+    if url.startswith("//"):
+        url = "https:" + url
+    return url
+
+
+class SoupParser:
+    """BeautifulSoup 解析后端（html.parser），作为兼容兜底"""
+    name = "bs4"
+
+    def _first(self, node, selectors):
+        for sel in selectors:
+            found = node.select_one(sel)
+            if found:
+                return found
+        return None
+
+    def parse_items(self, html, engine):
+        spec = ENGINE_SELECTORS[engine]
+        soup = BeautifulSoup(html, "html.parser")
+        results = []
+        for item in soup.select(spec["items"]):
+            title_tag = item.select_one(spec["title"])
+            if not title_tag:
+                continue
+            img_tag = self._first(item, spec["img"])
+            desc_tag = self._first(item, spec["desc"])
+            parsed = {
+                "title": title_tag.get_text().strip(),
+                "link": title_tag.get("href"),
+                "img": _normalize_img((img_tag.get("src") or img_tag.get("data-src")) if img_tag else ""),
+                "description": desc_tag.get_text().strip() if desc_tag else None
+            }
+            if "source_name" in spec:
+                source_tag = self._first(item, spec["source_name"])
+                parsed["source_name"] = source_tag.get_text().strip() if source_tag else None
+            results.append(parsed)
+        return results
+
+    def extract_text(self, html):
+        soup = BeautifulSoup(html, "html.parser")
+        for s in soup(['script', 'style']): s.decompose()
+        return soup.get_text(separator='\n', strip=True)
+
+
+class LxmlParser:
+    """lxml 解析后端：选择器预编译为 XPath，只对命中的节点取文本，不构建 soup 对象树"""
+    name = "lxml"
+
+    def __init__(self):
+        options = dict(remove_comments=True, remove_pis=True, collect_ids=False, no_network=True)
+        # str 输入统一按 UTF-8 编码交给 lxml，避免被页面 meta 中的 charset 误导
+        self._text_parser = etree.HTMLParser(encoding="utf-8", **options)
+        self._bytes_parser = etree.HTMLParser(**options)
+        self._compiled = {}
+        for engine, spec in ENGINE_SELECTORS.items():
+            compiled = {"items": etree.XPath(css_to_xpath(spec["items"], relative=False))}
+            for field, sels in spec.items():
+                if field == "items":
+                    continue
+                sels = [sels] if isinstance(sels, str) else sels
+                compiled[field] = [etree.XPath(css_to_xpath(sel)) for sel in sels]
+            self._compiled[engine] = compiled
+        self._strip_xpath = etree.XPath("//script | //style")
+
+    def _parse(self, html):
+        parser = self._bytes_parser
+        if isinstance(html, str):
+            html = html.encode("utf-8")
+            parser = self._text_parser
+        return etree.fromstring(html, parser) if html.strip() else None
+
+    def _first(self, node, xpaths):
+        for xp in xpaths:
+            found = xp(node)
+            if found:
+                return found[0]
+        return None
+
+    @staticmethod
+    def _text(node):
+        return "".join(node.itertext()).strip()
+
+    def parse_items(self, html, engine):
+        compiled = self._compiled[engine]
+        root = self._parse(html)
+        if root is None:
+            return []
+        results = []
+        for item in compiled["items"](root):
+            title_tag = self._first(item, compiled["title"])
+            if title_tag is None:
+                continue
+            img_tag = self._first(item, compiled["img"])
+            desc_tag = self._first(item, compiled["desc"])
+            parsed = {
+                "title": self._text(title_tag),
+                "link": title_tag.get("href"),
+                "img": _normalize_img((img_tag.get("src") or img_tag.get("data-src")) if img_tag is not None else ""),
+                "description": self._text(desc_tag) if desc_tag is not None else None
+            }
+            if "source_name" in compiled:
+                source_tag = self._first(item, compiled["source_name"])
+                parsed["source_name"] = self._text(source_tag) if source_tag is not None else None
+            results.append(parsed)
+        return results
+
+    def extract_text(self, html):
+        root = self._parse(html)
+        if root is None:
+            return ""
+        for node in self._strip_xpath(root):
+            # 清空脚本/样式节点但保留其后的尾随文本，与 decompose 后 get_text 的结果一致
+            node.clear(keep_tail=True)
+        lines = (t.strip() for t in root.itertext())
+        return "\n".join(t for t in lines if t)
+
+
+PARSERS = {"bs4": SoupParser}
+if etree is not None:
+    PARSERS["lxml"] = LxmlParser
+
+# 解析器与预编译 XPath 按线程各持一份，多引擎并发时互不干扰
+_local = threading.local()
+
+
+def get_parser(name=None):
+    """获取解析后端，默认 lxml（可用 SPIDER_PARSER=bs4 切回 BeautifulSoup）"""
+    name = name or os.environ.get("SPIDER_PARSER") or ("lxml" if "lxml" in PARSERS else "bs4")
+    if name not in PARSERS:
+        name = "bs4"
+    instances = getattr(_local, "instances", None)
+    if instances is None:
+        instances = _local.instances = {}
+    if name not in instances:
+        instances[name] = PARSERS[name]()
+    return instances[name]
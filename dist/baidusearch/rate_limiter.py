@@ -0,0 +1,64 @@
+# dist/baidusearch/rate_limiter.py
+import time
+import threading
+
+# 默认每站点每秒 1.5 个请求，与原先 0.5~1.0 秒随机间隔的平均速率相当
+DEFAULT_RATE = 1.5
+DEFAULT_BURST = 2
+
+
+class TokenBucket:
+    """令牌桶限速器（线程安全）"""
+    def __init__(self, rate=DEFAULT_RATE, capacity=DEFAULT_BURST):
+        self._lock = threading.Lock()
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def configure(self, rate=None, capacity=None):
+        with self._lock:
+            self._refill()
+            if rate:
+                self.rate = float(rate)
+            if capacity:
+                self.capacity = float(capacity)
+                self._tokens = min(self._tokens, self.capacity)
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, tokens=1):
+        """阻塞直到取得令牌，返回等待的秒数"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                delay = (tokens - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+def get_host_bucket(host, rate=None, capacity=None):
+    """按站点共享的令牌桶，进程内所有采集任务共用同一站点的配额
+
+    传入 rate/capacity 时会更新该站点的限速配置。
+    """
+    with _buckets_lock:
+        bucket = _buckets.get(host)
+        if bucket is None:
+            bucket = TokenBucket(rate or DEFAULT_RATE, capacity or DEFAULT_BURST)
+            _buckets[host] = bucket
+            return bucket
+    if rate or capacity:
+        bucket.configure(rate, capacity)
+    return bucket
@@ -0,0 +1,102 @@
+# dist/baidusearch/redirect_resolver.py
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from .http_client import get_http_client
+except ImportError:
+    from http_client import get_http_client
+
+
+class TTLCache:
+    """带过期时间的 LRU 缓存（线程安全）"""
+    def __init__(self, maxsize=2048, ttl=3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expire_at = entry
+            if expire_at < time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class RedirectResolver:
+    """批量解析百度 www.baidu.com/link?url=... 跳转链接
+
+    一整页链接使用有界线程池并发发起 HEAD 请求，结果按原始链接缓存，
+    返回顺序与输入顺序一致。
+    """
+    def __init__(self, headers=None, max_workers=8, timeout=5, cache=None, engine="baidu", http=None):
+        self.headers = headers or {}
+        self.engine = engine
+        self.http = http or get_http_client()
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.cache = cache if cache is not None else TTLCache()
+
+    def _head(self, raw_url):
+        return self.http.head(raw_url, engine=self.engine, headers=self.headers, allow_redirects=False, timeout=self.timeout)
+
+    def _resolve_one(self, raw_url):
+        """解析单个链接，网络异常时返回 None（不写入缓存，下次重试）"""
+        try:
+            res = self._head(raw_url)
+        except Exception:
+            return None
+        if res.status_code in [301, 302]:
+            return res.headers.get("Location", raw_url)
+        return raw_url
+
+    def resolve(self, raw_url):
+        return self.resolve_batch([raw_url])[0]
+
+    def resolve_batch(self, raw_urls):
+        results = list(raw_urls)
+        pending = {}
+        for idx, raw_url in enumerate(raw_urls):
+            if not raw_url or not raw_url.startswith("http"):
+                continue
+            cached = self.cache.get(raw_url)
+            if cached is not None:
+                results[idx] = cached
+            else:
+                # 同一页中重复的链接只请求一次
+                pending.setdefault(raw_url, []).append(idx)
+
+        if pending:
+            workers = max(1, min(self.max_workers, len(pending)))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                resolved = dict(zip(pending, executor.map(self._resolve_one, pending)))
+            for raw_url, real_url in resolved.items():
+                if real_url is None:
+                    continue
+                self.cache.set(raw_url, real_url)
+                for idx in pending[raw_url]:
+                    results[idx] = real_url
+        return results
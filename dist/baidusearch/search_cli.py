@@ -1,110 +1,151 @@
 # dist/baidusearch/search_cli.py
-import requests
-from bs4 import BeautifulSoup
 import argparse
 import time
-import random
 import json
 import sys
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
-class BaiduSpider:
+try:
+    from .http_client import ENGINE_HEADERS, get_http_client
+    from .redirect_resolver import RedirectResolver, TTLCache
+    from .fanout import fanout_search
+    from .rate_limiter import get_host_bucket
+    from .parsers import get_parser
+    from .serp_cache import SerpCache, DEFAULT_CACHE_DIR, get_default_cache
+except ImportError:
+    from http_client import ENGINE_HEADERS, get_http_client
+    from redirect_resolver import RedirectResolver, TTLCache
+    from fanout import fanout_search
+    from rate_limiter import get_host_bucket
+    from parsers import get_parser
+    from serp_cache import SerpCache, DEFAULT_CACHE_DIR, get_default_cache
+
+# 跳转链接解析缓存在进程内共享，重复采集同一关键词时直接命中
+_redirect_cache = TTLCache(maxsize=4096, ttl=3600)
+
+class SearchSpider:
+    """搜索引擎爬虫基类：共享 HTTP 客户端、站点令牌桶、解析后端与结果页缓存"""
+    base_url = None
+    engine = None
+    host = None
+
+    def __init__(self, rate=None, burst=None, parser=None, cache=None, cache_ttl=None, replay=False):
+        self.headers = ENGINE_HEADERS[self.engine]
+        self.http = get_http_client()
+        # 同一站点的所有采集任务共享令牌桶，礼貌抓取在进程内全局生效
+        self.limiter = get_host_bucket(self.host, rate, burst)
+        self.parser_name = parser
+        self.cache = cache
+        self.cache_ttl = cache_ttl
+        # 回放模式只读缓存，不发起任何网络请求
+        self.replay = replay
+        self.errors = 0
+
+    def fetch_html(self, keyword, params, page=1):
+        """获取结果页 HTML，失败或回放未命中时返回 None"""
+        if self.cache is not None:
+            html = self.cache.get(self.engine, keyword, page, params, allow_expired=self.replay, ttl=self.cache_ttl)
+            if html is not None:
+                return html
+        if self.replay:
+            return None
+        self.limiter.acquire()
+        res = self.http.get(self.base_url, engine=self.engine, params=params, timeout=10)
+        if res.status_code != 200:
+            self.errors += 1
+            return None
+        if self.cache is not None:
+            self.cache.set(self.engine, keyword, page, params, res.text)
+        return res.text
+
+class BaiduSpider(SearchSpider):
     """百度网页搜索爬虫"""
-    def __init__(self):
-        self.base_url = "https://www.baidu.com/s"
-        self.headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36",
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
-            "Connection": "keep-alive",
-            "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8"
-        }
+    base_url = "https://www.baidu.com/s"
+    engine = "baidu"
+    host = "www.baidu.com"
+
+    def __init__(self, resolve_workers=8, **kwargs):
+        super().__init__(**kwargs)
+        self.resolver = RedirectResolver(max_workers=resolve_workers, cache=_redirect_cache, engine=self.engine, http=self.http)
 
     def get_real_url(self, raw_url):
-        if not raw_url.startswith("http"):
+        if not raw_url or not raw_url.startswith("http"):
             return raw_url
-        try:
-            res = requests.head(raw_url, headers=self.headers, allow_redirects=False, timeout=5)
-            if res.status_code in [301, 302]:
-                return res.headers.get("Location", raw_url)
-        except Exception:
-            pass
-        return raw_url
+        return self.resolver.resolve(raw_url)
+
+    def _fetch_page(self, keyword, page):
+        params = {"wd": keyword, "pn": (page - 1) * 10}
+        return self.fetch_html(keyword, params, page)
 
     def search(self, keyword, start_page=1, limit=5):
         page = start_page
         count = 0
-        while count < limit:
-            pn = (page - 1) * 10
-            params = {"wd": keyword, "pn": pn}
-            try:
-                response = requests.get(self.base_url, params=params, headers=self.headers, timeout=10)
-                if response.status_code != 200:
-                    break
-                soup = BeautifulSoup(response.text, "html.parser")
-                items = soup.select("div.c-container")
-                if not items:
+        # 流水线翻页：解析完第 N 页后立即预取第 N+1 页，与跳转解析及下游消费并行
+        prefetcher = ThreadPoolExecutor(max_workers=1)
+        future = prefetcher.submit(self._fetch_page, keyword, page)
+        try:
+            while count < limit:
+                try:
+                    html = future.result()
+                    if html is None:
+                        break
+                    items = get_parser(self.parser_name).parse_items(html, self.engine)
+                    if not items:
+                        break
+                    page_items = []
+                    for item in items:
+                        if count + len(page_items) >= limit: break
+                        description = item["description"] or "暂无简介"
+                        page_items.append((item["title"], item["link"], item["img"], description))
+
+                    page += 1
+                    if count + len(page_items) < limit:
+                        future = prefetcher.submit(self._fetch_page, keyword, page)
+
+                    # 整页跳转链接并发解析，结果仍按排名顺序输出（回放模式保留原始链接）
+                    links = [link for _, link, _, _ in page_items]
+                    real_urls = links if self.replay else self.resolver.resolve_batch(links)
+                    for (title, link, img_url, description), real_url in zip(page_items, real_urls):
+                        yield {
+                            "rank": count + 1,
+                            "title": title,
+                            "url": real_url,
+                            "img": img_url,
+                            "description": description,
+                            "source": "baidu_search",
+                            "time": time.strftime("%Y-%m-%d %H:%M:%S")
+                        }
+                        count += 1
+                except Exception as e:
+                    self.errors += 1
+                    print(f"[Error] Baidu Search Error: {e}", file=sys.stderr)
                     break
-                for item in items:
-                    if count >= limit: break
-                    title_tag = item.select_one("h3 a")
-                    if not title_tag: continue
-                    title = title_tag.get_text().strip()
-                    link = title_tag.get("href")
-                    img_url = ""
-                    img_tag = item.select_one("img.c-img") or item.select_one(".c-span6 img") or item.select_one(".c-span3 img")
-                    if img_tag:
-                        img_url = img_tag.get("src") or img_tag.get("data-src") or ""
-                        if img_url.startswith("//"): img_url = "https:" + img_url
-                    desc_tag = item.select_one("div.c-abstract") or item.select_one(".content-right_8Zs40")
-                    description = desc_tag.get_text().strip() if desc_tag else "暂无简介"
-                    real_url = self.get_real_url(link)
-                    yield {
-                        "rank": count + 1,
-                        "title": title,
-                        "url": real_url,
-                        "img": img_url,
-                        "description": description,
-                        "source": "baidu_search",
-                        "time": time.strftime("%Y-%m-%d %H:%M:%S")
-                    }
-                    count += 1
-                page += 1
-                time.sleep(random.uniform(0.5, 1.0))
-            except Exception as e:
-                print(f"[Error] Baidu Search Error: {e}", file=sys.stderr)
-                break
-
-class BaiduNewsSpider:
+        finally:
+            prefetcher.shutdown(wait=False)
+
+class BaiduNewsSpider(SearchSpider):
     """百度新闻爬虫"""
-    def __init__(self):
-        self.base_url = "https://www.baidu.com/s"
-        self.headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36"
-        }
+    base_url = "https://www.baidu.com/s"
+    engine = "baidu_news"
+    host = "www.baidu.com"
 
     def search(self, keyword, limit=10):
         # rtt=1: 按时间排序, rtt=4: 按相关性排序
         params = {"tn": "news", "wd": keyword, "rtt": 1}
         count = 0
         try:
-            res = requests.get(self.base_url, params=params, headers=self.headers, timeout=10)
-            if res.status_code != 200: return
-            soup = BeautifulSoup(res.text, "html.parser")
-            items = soup.select(".result-op.news")
+            html = self.fetch_html(keyword, params)
+            if html is None: return
+            items = get_parser(self.parser_name).parse_items(html, self.engine)
             for item in items:
                 if count >= limit: break
-                title_tag = item.select_one("h3 a")
-                if not title_tag: continue
-                title = title_tag.get_text().strip()
-                url = title_tag.get("href")
-                source_tag = item.select_one(".c-color-gray.c-font-normal")
-                source_name = source_tag.get_text().strip() if source_tag else "百度新闻"
-                desc_tag = item.select_one(".c-font-normal.c-color-text")
-                description = desc_tag.get_text().strip() if desc_tag else "点击查看详情"
-                img_tag = item.select_one(".c-img img")
-                img_url = ""
-                if img_tag:
-                    img_url = img_tag.get("src") or img_tag.get("data-src") or ""
-                    if img_url.startswith("//"): img_url = "https:" + img_url
+                title = item["title"]
+                url = item["link"]
+                source_name = item["source_name"] or "百度新闻"
+                description = item["description"] or "点击查看详情"
+                img_url = item["img"]
                 
                 yield {
                     "rank": count + 1,
@@ -117,37 +158,28 @@ class BaiduNewsSpider:
                 }
                 count += 1
         except Exception as e:
+            self.errors += 1
             print(f"[Error] Baidu News Error: {e}", file=sys.stderr)
 
-class SoSpider:
+class SoSpider(SearchSpider):
     """360搜索爬虫"""
-    def __init__(self):
-        self.base_url = "https://www.so.com/s"
-        self.headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36"
-        }
+    base_url = "https://www.so.com/s"
+    engine = "360"
+    host = "www.so.com"
 
     def search(self, keyword, limit=10):
         params = {"q": keyword}
         try:
-            res = requests.get(self.base_url, params=params, headers=self.headers, timeout=10)
-            if res.status_code != 200: return
-            soup = BeautifulSoup(res.text, "html.parser")
-            items = soup.select(".res-list")
+            html = self.fetch_html(keyword, params)
+            if html is None: return
+            items = get_parser(self.parser_name).parse_items(html, self.engine)
             count = 0
             for item in items:
                 if count >= limit: break
-                title_tag = item.select_one("h3 a")
-                if not title_tag: continue
-                title = title_tag.get_text().strip()
-                url = title_tag.get("href")
-                desc_tag = item.select_one(".res-desc") or item.select_one(".res-rich")
-                description = desc_tag.get_text().strip() if desc_tag else "查看更多内容..."
-                img_tag = item.select_one(".res-img img") or item.select_one("img")
-                img_url = ""
-                if img_tag:
-                    img_url = img_tag.get("src") or img_tag.get("data-src") or ""
-                    if img_url.startswith("//"): img_url = "https:" + img_url
+                title = item["title"]
+                url = item["link"]
+                description = item["description"] or "查看更多内容..."
+                img_url = item["img"]
                 yield {
                     "rank": count + 1,
                     "title": title,
@@ -159,23 +191,176 @@ class SoSpider:
                 }
                 count += 1
         except Exception as e:
+            self.errors += 1
             print(f"[Error] 360 Search Error: {e}", file=sys.stderr)
 
+SPIDER_CLASSES = {
+    "baidu": BaiduSpider,
+    "baidu_news": BaiduNewsSpider,
+    "360": SoSpider
+}
+
+def parse_crawler_config(config):
+    """解析 crawlers.config 列（JSON），如 {"rate": 2, "burst": 3}；非法内容按空配置处理"""
+    if isinstance(config, dict):
+        return config
+    if not config:
+        return {}
+    try:
+        data = json.loads(config)
+        return data if isinstance(data, dict) else {}
+    except (TypeError, ValueError):
+        return {}
+
+def build_spider(spider_type, config=None, cache=None, replay=False):
+    """按引擎类型创建爬虫
+
+    config 中 rate/burst 设置该站点的令牌桶速率，parser 选择解析后端，
+    cache_ttl（秒）启用共享的结果页磁盘缓存。
+    """
+    cfg = parse_crawler_config(config)
+    if cache is None and cfg.get("cache_ttl"):
+        cache = get_default_cache()
+    return SPIDER_CLASSES.get(spider_type, BaiduSpider)(
+        rate=cfg.get("rate"), burst=cfg.get("burst"), parser=cfg.get("parser"),
+        cache=cache, cache_ttl=cfg.get("cache_ttl"), replay=replay)
+
+def read_keywords(path):
+    """逐行读取关键词文件（- 表示标准输入），忽略空行与 # 注释
+
+    文件在调用时立即打开，路径不存在或无法读取时在调用方线程抛出 OSError；
+    返回的生成器逐行产出关键词。
+    """
+    f = sys.stdin if path == "-" else open(path, encoding="utf-8")
+
+    def lines():
+        try:
+            for line in f:
+                keyword = line.strip()
+                if keyword and not keyword.startswith("#"):
+                    yield keyword
+        finally:
+            if f is not sys.stdin:
+                f.close()
+    return lines()
+
+def run_batch(keywords, make_search, limit=10, workers=4, out=sys.stdout):
+    """批量关键词并发采集，结果以 JSONL 逐条流式输出
+
+    make_search() 为每个关键词返回 (search 函数, 取错误数函数)。每个关键词完成后
+    输出一行 {"type": "summary", ...}，包含条数、耗时与错误数。
+    工作线程与输出之间使用有界队列，关键词按需提交，内存占用不随关键词数量增长。
+    """
+    lines = queue.Queue(maxsize=workers * 50)
+    slots = threading.Semaphore(workers)
+    totals = {"keywords": 0, "items": 0, "errors": 0}
+
+    def task(keyword):
+        start = time.perf_counter()
+        count, errors = 0, 0
+        try:
+            search, get_errors = make_search()
+            for item in search(keyword, limit=limit):
+                if "error" in item:
+                    errors += 1
+                    continue
+                item["keyword"] = keyword
+                lines.put(("item", item))
+                count += 1
+            errors += get_errors()
+        except Exception as e:
+            print(f"[Error] {keyword}: {e}", file=sys.stderr)
+            errors += 1
+        finally:
+            # 无论成败都要输出 summary，主循环按 summary 行数判断何时结束
+            lines.put(("summary", {
+                "type": "summary",
+                "keyword": keyword,
+                "count": count,
+                "errors": errors,
+                "elapsed": round(time.perf_counter() - start, 3)
+            }))
+            slots.release()
+
+    def feed(executor):
+        submitted, error = 0, None
+        try:
+            for keyword in keywords:
+                slots.acquire()
+                try:
+                    executor.submit(task, keyword)
+                except BaseException:
+                    slots.release()
+                    raise
+                submitted += 1
+        except Exception as e:
+            error = e
+        finally:
+            # 无论关键词读取是否出错都要告知主循环已提交的数量，否则主循环会一直等待
+            lines.put(("fed", (submitted, error)))
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        threading.Thread(target=feed, args=(executor,), daemon=True).start()
+        expected, finished, feed_error = None, 0, None
+        while expected is None or finished < expected:
+            kind, payload = lines.get()
+            if kind == "fed":
+                expected, feed_error = payload
+                continue
+            if kind == "summary":
+                finished += 1
+                totals["keywords"] += 1
+                totals["errors"] += payload["errors"]
+            else:
+                totals["items"] += 1
+            out.write(json.dumps(payload, ensure_ascii=False) + "\n")
+            out.flush()
+    if feed_error is not None:
+        # 已提交的关键词照常输出完毕，再把读取关键词时的异常交给调用方
+        raise feed_error
+    return totals
+
 def main():
     parser = argparse.ArgumentParser(description="政企信息采集器")
-    parser.add_argument("--wd", type=str, required=True)
-    parser.add_argument("--type", type=str, default="baidu", choices=["baidu", "baidu_news", "360"])
+    parser.add_argument("--wd", type=str, default=None)
+    parser.add_argument("--batch", type=str, default=None, help="批量模式：关键词文件（每行一个，- 表示标准输入），结果按 JSONL 流式输出")
+    parser.add_argument("--workers", type=int, default=4, help="批量模式并发关键词数")
+    parser.add_argument("--type", type=str, default="baidu", choices=list(SPIDER_CLASSES))
+    parser.add_argument("--engines", type=str, default=None, help="逗号分隔的多个引擎，并发检索并合并去重，如 baidu,baidu_news,360")
     parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--rate", type=float, default=None, help="每站点每秒请求数上限（进程内所有并发任务共享）")
+    parser.add_argument("--cache-dir", type=str, default=None, help="结果页磁盘缓存目录")
+    parser.add_argument("--cache-ttl", type=int, default=3600, help="缓存有效期(秒)")
+    parser.add_argument("--cache-max-mb", type=int, default=200, help="缓存占用上限(MB)，超出按 LRU 淘汰")
+    parser.add_argument("--replay", action="store_true", help="只从缓存读取结果页，不访问网络")
     args = parser.parse_args()
-    
-    if args.type == "baidu":
-        spider = BaiduSpider()
-    elif args.type == "baidu_news":
-        spider = BaiduNewsSpider()
-    else:
-        spider = SoSpider()
-        
-    results = list(spider.search(args.wd, limit=args.limit))
+    if not args.wd and not args.batch:
+        parser.error("需要提供 --wd 或 --batch")
+    config = {"rate": args.rate} if args.rate else None
+    cache = None
+    if args.cache_dir or args.replay:
+        cache = SerpCache(args.cache_dir or DEFAULT_CACHE_DIR, ttl=args.cache_ttl, max_bytes=args.cache_max_mb * 1024 * 1024)
+    engines = [e.strip() for e in args.engines.split(",") if e.strip() in SPIDER_CLASSES] if args.engines else None
+
+    def make_search():
+        if engines:
+            spiders = {e: build_spider(e, config, cache, args.replay) for e in engines}
+            search = lambda keyword, limit: fanout_search(spiders, keyword, limit=limit)
+            return search, lambda: sum(sp.errors for sp in spiders.values())
+        spider = build_spider(args.type, config, cache, args.replay)
+        return spider.search, lambda: spider.errors
+
+    if args.batch:
+        try:
+            keywords = read_keywords(args.batch)
+        except OSError as e:
+            parser.error(f"无法读取关键词文件 {args.batch}: {e}")
+        totals = run_batch(keywords, make_search, limit=args.limit, workers=args.workers)
+        print(f"[Batch] 关键词 {totals['keywords']} 个, 结果 {totals['items']} 条, 错误 {totals['errors']} 次", file=sys.stderr)
+        return
+
+    search, _ = make_search()
+    results = list(search(args.wd, limit=args.limit))
     print(json.dumps(results, ensure_ascii=False, indent=4))
 
 if __name__ == "__main__":
@@ -0,0 +1,133 @@
+# dist/baidusearch/serp_cache.py
+import os
+import gzip
+import json
+import time
+import hashlib
+import threading
+
+DEFAULT_CACHE_DIR = os.environ.get("SERP_CACHE_DIR") or os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..', '..', 'serp_cache'))
+
+
+class SerpCache:
+    """搜索结果页磁盘缓存
+
+    以 (引擎, 关键词, 页码, 请求参数) 为键，gzip 压缩保存 HTML。
+    文件 mtime 记录写入时间（用于 TTL），atime 记录最近命中时间（用于 LRU 淘汰）。
+    """
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, ttl=3600, max_bytes=200 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._total_bytes = None
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(engine, keyword, page, params):
+        raw = json.dumps([engine, keyword, page, params or {}], ensure_ascii=False, sort_keys=True)
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.html.gz")
+
+    def get(self, engine, keyword, page, params=None, allow_expired=False, ttl=None):
+        path = self._path(self.make_key(engine, keyword, page, params))
+        ttl = self.ttl if ttl is None else ttl
+        try:
+            stat = os.stat(path)
+            if not allow_expired and time.time() - stat.st_mtime > ttl:
+                self.misses += 1
+                return None
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                html = f.read()
+            # 刷新访问时间，保留写入时间
+            os.utime(path, (time.time(), stat.st_mtime))
+        except (OSError, EOFError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return html
+
+    def set(self, engine, keyword, page, params, html):
+        path = self._path(self.make_key(engine, keyword, page, params))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            f.write(html)
+        old_size = os.path.getsize(path) if os.path.exists(path) else 0
+        os.replace(tmp, path)
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = self._scan_size()
+            else:
+                self._total_bytes += os.path.getsize(path) - old_size
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _entries(self):
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith(".html.gz"):
+                    path = os.path.join(root, name)
+                    try:
+                        yield path, os.stat(path)
+                    except OSError:
+                        continue
+
+    def _scan_size(self):
+        return sum(stat.st_size for _, stat in self._entries())
+
+    def _evict(self):
+        """按最近访问时间淘汰，直到占用降到上限的 90%"""
+        target = self.max_bytes * 0.9
+        entries = sorted(self._entries(), key=lambda e: e[1].st_atime)
+        total = sum(stat.st_size for _, stat in entries)
+        for path, stat in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= stat.st_size
+            except OSError:
+                pass
+        self._total_bytes = total
+
+    def purge_expired(self):
+        now = time.time()
+        removed = 0
+        for path, stat in list(self._entries()):
+            if now - stat.st_mtime > self.ttl:
+                try:
+                    os.remove(path)
+                    removed += 1
+                except OSError:
+                    pass
+        with self._lock:
+            self._total_bytes = None
+        return removed
+
+    def stats(self):
+        entries = list(self._entries())
+        return {
+            "entries": len(entries),
+            "bytes": sum(stat.st_size for _, stat in entries),
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def get_default_cache():
+    """应用内共享的缓存实例（目录可用 SERP_CACHE_DIR 指定）"""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = SerpCache()
+        return _default_cache
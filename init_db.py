@@ -1,150 +1,17 @@
 import sqlite3
 import os
 
+from app.migrations import migrate
+
 DB_PATH = 'data.db'
 
 def init_db():
+    # 表结构与索引由版本化迁移维护
+    migrate(DB_PATH, verbose=True)
+
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
-    
-    # Create users table
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS users (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        username TEXT UNIQUE NOT NULL,
-        password TEXT NOT NULL
-    )
-    ''')
-    
-    # Create system_stats table for dashboard
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS system_stats (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        metric_name TEXT UNIQUE NOT NULL,
-        metric_value TEXT NOT NULL,
-        update_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-    )
-    ''')
-    
-    # Create chart_acquisition table
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS chart_acquisition (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        day TEXT NOT NULL,
-        value INTEGER NOT NULL
-    )
-    ''')
-
-    # Create chart_sentiment table
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS chart_sentiment (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT NOT NULL,
-        value INTEGER NOT NULL,
-        color TEXT NOT NULL
-    )
-    ''')
-
-    # Create crawlers table
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS crawlers (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT NOT NULL,
-        type TEXT NOT NULL,
-        script_path TEXT,
-        config TEXT,
-        description TEXT,
-        status TEXT DEFAULT '可用',
-        last_run TIMESTAMP,
-        create_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-    )
-    ''')
-
-    # Create collected_data table # 爬虫数据表
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS collected_data (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        title TEXT NOT NULL,
-        url TEXT NOT NULL UNIQUE,
-        description TEXT,
-        source TEXT,
-        collect_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        deep_status INTEGER DEFAULT 0 -- 0: 未采集, 1: 正在采集, 2: 采集成功, 3: 采集失败
-    )
-    ''')
 
-    # Create deep_collected_data table # 深度采集数据表
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS deep_collected_data (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        source_id INTEGER UNIQUE,
-        url TEXT NOT NULL,
-        title TEXT,
-        content TEXT,
-        summary TEXT,
-        structured_data TEXT, -- JSON format
-        collect_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        FOREIGN KEY (source_id) REFERENCES collected_data (id)
-    )
-    ''')
-
-    # AI 模型管理表
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS ai_models (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT NOT NULL,
-        api_url TEXT NOT NULL,
-        api_key TEXT NOT NULL,
-        model_name TEXT NOT NULL,
-        system_prompt TEXT DEFAULT '你是一个专业的政企信息分析助手。',
-        is_active INTEGER DEFAULT 1,
-        create_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-    )
-    ''')
-
-    # Token 消耗记录表
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS token_usage (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        model_id INTEGER,
-        prompt_tokens INTEGER DEFAULT 0,
-        completion_tokens INTEGER DEFAULT 0,
-        total_tokens INTEGER DEFAULT 0,
-        task_type TEXT,
-        log_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        FOREIGN KEY (model_id) REFERENCES ai_models (id)
-    )
-    ''')
-
-    # AI 分析会话表
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS analysis_conversations (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        title TEXT DEFAULT '新会话',
-        model_id INTEGER,
-        create_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        FOREIGN KEY (model_id) REFERENCES ai_models (id)
-    )
-    ''')
-
-    # AI 分析消息明细表
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS analysis_messages (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        conversation_id INTEGER,
-        role TEXT NOT NULL, -- 'user' or 'assistant'
-        content TEXT NOT NULL,
-        raw_content TEXT, -- 存储带标签的原始文本以便重新渲染
-        create_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        FOREIGN KEY (conversation_id) REFERENCES analysis_conversations (id) ON DELETE CASCADE
-    )
-    ''')
-
-    # Seed initial crawler
-    cursor.execute('SELECT * FROM crawlers WHERE name = ?', ('百度搜索爬虫',))
-    if not cursor.fetchone():
-        cursor.execute('INSERT INTO crawlers (name, type, status) VALUES (?, ?, ?)', ('百度搜索爬虫', 'baidu', '可用'))
-    
     # Seed admin user if not exists
     cursor.execute('SELECT * FROM users WHERE username = ?', ('admin',))
     if not cursor.fetchone():